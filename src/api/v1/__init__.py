@@ -6,6 +6,7 @@ from src.api.v1.auth import router as auth_router
 from src.api.v1.subscriptions import router as subscriptions_router
 from src.api.v1.samples import router as samples_router
 from src.api.v1.ml import router as ml_router
+from src.api.v1.ml import predict_router as ml_predict_router
 
 router = APIRouter(prefix="/v1")
 router.include_router(news_router)
@@ -14,4 +15,5 @@ router.include_router(auth_router)
 router.include_router(subscriptions_router)
 router.include_router(samples_router)
 router.include_router(ml_router)
+router.include_router(ml_predict_router)
 __all__ = ["router"]
@@ -1,24 +1,106 @@
-from fastapi import APIRouter, status
+import asyncio
+
+from fastapi import APIRouter, Query, status
 from fastapi.responses import ORJSONResponse
 
 from src.api.v1.dependencies.auth import AdminAllowedDep
 from src.api.v1.dependencies.db import DBDep
-from src.schemas.ml import TrainConfig, TrainingDTO
+from src.config import settings
+from src.ml.batching import get_micro_batcher
+from src.ml.bulk import BulkFormat, stream_predictions
+from src.ml.resident import get_resident_predictor
+from src.schemas.ml import (
+    PredictionInput,
+    PredictionResult,
+    PredictTextRequest,
+    TrainConfig,
+    TrainingDTO,
+)
 from src.services.training import TrainingService
 from src.utils.exceptions import (
     BrokerUnavailableError,
     BrokerUnavailableHTTPError,
+    EmptyPredictionInputHTTPError,
+    InferenceOverloadedError,
+    InferenceOverloadedHTTPError,
     ModelAlreadyTrainingError,
     ModelAlreadyTrainingHTTPError,
+    ModelNotReadyError,
+    ModelNotReadyHTTPError,
     TrainingNotFoundError,
     TrainingNotFoundHTTPError,
     ValueOutOfRangeError,
     ValueOutOfRangeHTTPError,
 )
+from src.utils.streaming import BodyStreamingResponse
 
 router = APIRouter(
     prefix="/trainings", tags=["Тренировка ML модели"]
 )
+predict_router = APIRouter(
+    prefix="/ml", tags=["Классификация новостей"]
+)
+
+
+@predict_router.post(
+    "/predict",
+    summary="Определить категорию произвольного текста",
+)
+async def predict_category(
+    payload: PredictTextRequest,
+) -> PredictionResult:
+    try:
+        return await get_micro_batcher().predict(
+            payload=PredictionInput(
+                news_id=0,
+                title=payload.title,
+                summary=payload.summary,
+            ),
+            top_k=payload.top_k,
+            min_confidence=payload.min_confidence,
+            include_probabilities=payload.include_probabilities,
+        )
+    except ModelNotReadyError as exc:
+        raise ModelNotReadyHTTPError from exc
+    except InferenceOverloadedError as exc:
+        raise InferenceOverloadedHTTPError from exc
+    except ValueError as exc:
+        raise EmptyPredictionInputHTTPError from exc
+
+
+@predict_router.post(
+    "/predict/batch",
+    summary="Определить категории набора текстов (NDJSON/CSV)",
+)
+async def predict_categories_batch(
+    _: AdminAllowedDep,
+    fmt: BulkFormat = Query(default="ndjson", alias="format"),
+    top_k: int = Query(default=3, ge=1, le=10),
+    min_confidence: float | None = Query(default=None, ge=0, le=1),
+) -> BodyStreamingResponse:
+    """
+    Тело запроса: NDJSON с полями title, summary и необязательным
+    id, либо CSV с такими же колонками. Ответ приходит построчно
+    в NDJSON по мере обработки батчей.
+    """
+    predictor = get_resident_predictor()
+    try:
+        await asyncio.to_thread(predictor.refresh)
+    except FileNotFoundError as exc:
+        raise ModelNotReadyHTTPError from exc
+    # тело читает сам ответ: request.stream() внутри
+    # StreamingResponse теряет чанки, см. BodyStreamingResponse
+    return BodyStreamingResponse(
+        lambda chunks: stream_predictions(
+            chunks,
+            predictor=predictor,
+            fmt=fmt,
+            batch_size=settings.ML_BULK_PREDICT_BATCH_SIZE,
+            top_k=top_k,
+            min_confidence=min_confidence,
+        ),
+        media_type="application/x-ndjson",
+    )
 
 
 @router.post(
@@ -1,4 +1,5 @@
 import math
+from datetime import datetime
 
 from fastapi import APIRouter, Query
 from fastapi_cache.decorator import cache
@@ -8,6 +9,7 @@ from src.api.v1.dependencies.pagination import PaginationDep
 from src.api.v1.responses.news import NEWS_RESPONSES
 from src.schemas.news import (
     NewsResponse,
+    NewsSuggestResponse,
     PagingInfo,
 )
 from src.schemas.enums import NewsCategory
@@ -24,6 +26,28 @@ from src.utils.exceptions import (
 router = APIRouter(prefix="/news", tags=["Новости"])
 
 
+@router.get(
+    "/suggest",
+    summary="Подсказки заголовков новостей по префиксу",
+)
+async def suggest_news(
+    db: DBDep,
+    q: str = Query(
+        ...,
+        min_length=2,
+        max_length=64,
+        description="Начало поискового запроса",
+    ),
+    limit: int = Query(
+        5, ge=1, le=10, description="Количество подсказок"
+    ),
+) -> NewsSuggestResponse:
+    suggestions = await NewsService(db).suggest(
+        prefix=q, limit=limit
+    )
+    return NewsSuggestResponse(query=q, suggestions=suggestions)
+
+
 @router.get(
     "/{news_id}",
     summary="Получить конкретную новость",
@@ -45,7 +69,6 @@ async def get_news(
     summary="Получить все новости",
     responses=NEWS_RESPONSES,
 )
-@cache(expire=60)
 async def get_all_news(
     db: DBDep,
     pagination: PaginationDep,
@@ -63,6 +86,12 @@ async def get_all_news(
     ),
     query: str | None = Query(None, description="Поисковый запрос"),
     recent_first: bool = Query(True, description="Сначала новые"),
+    published_from: datetime | None = Query(
+        None, description="Опубликованы не раньше"
+    ),
+    published_to: datetime | None = Query(
+        None, description="Опубликованы не позже"
+    ),
 ) -> NewsResponse:
     """
     ## 🗞️ Получить список всех новостей
@@ -79,6 +108,8 @@ async def get_all_news(
             channel_ids=channel_ids,
             search_after=search_after,
             recent_first=recent_first,
+            published_from=published_from,
+            published_to=published_to,
         )
     except ValueOutOfRangeError as exc:
         raise ValueOutOfRangeHTTPError(detail=exc.detail) from exc
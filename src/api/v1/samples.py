@@ -10,8 +10,6 @@ from src.services.news import NewsService
 from src.utils.exceptions import (
     ValueOutOfRangeError,
     ValueOutOfRangeHTTPError,
-    DenormalizedNewsAlreadyExistsError,
-    DenormalizedNewsAlreadyExistsHTTPError,
     AlreadyAssignedCategoryError,
     NewsNotFoundHTTPError,
     NewsNotFoundError,
@@ -110,8 +108,6 @@ async def add_denormalized_news(
         return await NewsService(db).add_denormalized_news(
             news_id, category
         )
-    except DenormalizedNewsAlreadyExistsError as exc:
-        raise DenormalizedNewsAlreadyExistsHTTPError from exc
     except AlreadyAssignedCategoryError as exc:
         raise AlreadyAssignedCategoryHTTPError from exc
     except NewsNotFoundError as exc:
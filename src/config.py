@@ -8,6 +8,8 @@ from src.schemas.ml import TrainConfig
 
 BASE_DIR = Path(__file__).parent.parent
 
+ESMappingProfile = Literal["full", "slim"]
+
 
 class Settings(BaseSettings):
     TITLE: str = "Feed Fusion"
@@ -32,6 +34,42 @@ class Settings(BaseSettings):
     ML_MIN_NEW_SAMPLES_FOR_TRAIN: int = 50
     ML_REPLAY_RATIO: float = 0.3
     ML_MAX_REPLAY_SAMPLES: int = 500
+    ML_MODEL_RELOAD_CHECK_SEC: float = 30.0
+    # int8-копия меньше, но у каждого процесса своя; без неё веса
+    # берутся из mmap и делятся между процессами
+    ML_PREFER_QUANTIZED_MODEL: bool = True
+    # dict token -> id поверх vocab.bin: батч кодируется в 1.5-2
+    # раза быстрее, чем пробами хэш-таблицы в mmap, но dict стоит
+    # ~150 байт на токен в каждом процессе (7.5 МБ на 50k токенов)
+    ML_VOCAB_IN_MEMORY_INDEX: bool = False
+    ML_BATCH_MAX_SIZE: int = 64
+    ML_BATCH_MAX_WAIT_SEC: float = 0.005
+    ML_BATCH_MAX_QUEUE: int = 1024
+    ML_BULK_PREDICT_BATCH_SIZE: int = 256
+    ML_CLASSIFY_BATCH_SIZE: int = 256
+    ML_CLASSIFY_PARALLEL_TASKS: int = 2
+    ML_CLASSIFY_MAX_BATCHES_PER_TASK: int = 20
+    ML_CLASSIFY_LEASE_SEC: int = 300
+    ML_CLASSIFY_MAX_ATTEMPTS: int = 3
+    # ниже этой (калиброванной) уверенности категория не ставится,
+    # новость ждёт следующей версии модели; 0 = без отказов
+    ML_ABSTAIN_CONFIDENCE: float = 0.0
+    # пересмотр категорий от модели после переобучения
+    ML_RECLASSIFY_AFTER_TRAIN: bool = True
+    ML_RECLASSIFY_BATCH_SIZE: int = 1000
+    ML_RECLASSIFY_MAX_BATCHES_PER_TASK: int = 50
+    ML_RECLASSIFY_MAX_ROWS_PER_SEC: float = 2000.0  # 0 = без лимита
+    # процесс обучения: ядра CPU (пусто = все), потоки BLAS/OpenMP
+    # (0 = по умолчанию) и лимит времени в секундах (0 = без него)
+    ML_TRAIN_CPU_AFFINITY: list[int] = []
+    ML_TRAIN_NUM_THREADS: int = 0
+    ML_TRAIN_TIMEOUT_SEC: float = 6 * 3600
+    # очередь retrain_model: её слушает отдельный воркер, чтобы
+    # обучение не занимало слоты парсинга и классификации
+    ML_TRAIN_QUEUE: str = "training"
+    # категория ставится при сохранении новостей, до индексации в
+    # ES; ежеминутный обход очереди тогда только подбирает хвосты
+    ML_CLASSIFY_ON_INGEST: bool = False
 
     ADMIN_USERNAME: str
     ADMIN_PASSWORD: str
@@ -100,6 +138,16 @@ class Settings(BaseSettings):
     ES_PORT: int
     ES_INDEX_NAME: str = "news"
     ES_RESET_INDEX: bool = False
+    ES_MAPPING_PROFILE: ESMappingProfile = "slim"
+    ES_MONTHLY_INDICES: bool = False
+    ES_RETENTION_MONTHS: int = 0
+    ES_HYBRID_SEARCH: bool = False
+
+    NEWS_SUGGEST_TIMEOUT_SEC: float = 0.15
+    NEWS_SUGGEST_CACHE_SIZE: int = 2048
+    NEWS_SUGGEST_CACHE_TTL_SEC: float = 30.0
+    NEWS_SEARCH_CACHE_SIZE: int = 512
+    NEWS_SEARCH_CACHE_TTL_SEC: float = 60.0
     USE_ELASTICSEARCH: bool = False
 
     @property
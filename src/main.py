@@ -18,12 +18,14 @@ from src.api.docs import router as docs_router
 from src.bot.bot import bot
 from src.config import settings
 from src.db import engine, sessionmaker
+from src.ml.batching import close_micro_batchers
 from src.ml.io_utils import load_samples_from_csv
 from src.ml.service import NewsClassifierService
 from src.schemas.auth import UserRegisterDTO
 from src.services.auth import AuthService
 from src.tasks.ml import retrain_model
 from src.utils.db_tools import DBHealthChecker, DBManager
+from src.utils.es_manager import ESManager
 from src.utils.exceptions import UserExistsError
 from src.utils.log_config import configurate_logging, get_logger
 from src.utils.redis_manager import redis_manager
@@ -85,10 +87,16 @@ async def lifespan(_: FastAPI) -> AsyncGenerator[None, None]:
                     samples = load_samples_from_csv(
                         settings.TRAIN_DATASET_LOCATION
                     )
-                    await db.denorm_news.add_bulk(samples)
+                    repo = db.denorm_news
+                    inserted = await repo.add_bulk_skip_duplicates(
+                        samples
+                    )
                     await db.commit()
                     logger.info(
-                        "Successfully uploaded bootstrap dataset..."
+                        "Successfully uploaded bootstrap dataset: "
+                        "%d samples, %d duplicates skipped",
+                        inserted,
+                        len(samples) - inserted,
                     )
                 else:
                     logger.info(
@@ -123,6 +131,9 @@ async def lifespan(_: FastAPI) -> AsyncGenerator[None, None]:
     logger.info("All checks passed!")
     yield
 
+    await close_micro_batchers()
+    await ESManager.close_shared()
+
     if settings.USE_REDIS_CACHE:
         await redis_manager.close()
         logger.info("Connection to Redis has been closed")
@@ -0,0 +1,40 @@
+"""trigram index for news title suggest
+
+Revision ID: 5d2e8a41c7b3
+Revises: 1e8c7506651e
+Create Date: 2026-10-19 10:10:42.118530
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5d2e8a41c7b3"
+down_revision: Union[str, Sequence[str], None] = "1e8c7506651e"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        "ix_news_title_trgm",
+        "news",
+        ["title"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"title": "gin_trgm_ops"},
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        "ix_news_title_trgm",
+        table_name="news",
+        postgresql_using="gin",
+        postgresql_ops={"title": "gin_trgm_ops"},
+    )
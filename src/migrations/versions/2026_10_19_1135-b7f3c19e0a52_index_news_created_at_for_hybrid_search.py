@@ -0,0 +1,32 @@
+"""index news created_at for hybrid search
+
+Revision ID: b7f3c19e0a52
+Revises: 5d2e8a41c7b3
+Create Date: 2026-10-19 11:35:08.402117
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b7f3c19e0a52"
+down_revision: Union[str, Sequence[str], None] = "5d2e8a41c7b3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_news_created_at",
+        "news",
+        ["created_at"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_news_created_at", table_name="news")
@@ -0,0 +1,58 @@
+"""news classification queue
+
+Revision ID: 9a4c2d7f1e36
+Revises: b7f3c19e0a52
+Create Date: 2026-10-19 14:20:41.118305
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "9a4c2d7f1e36"
+down_revision: Union[str, Sequence[str], None] = "b7f3c19e0a52"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "news",
+        sa.Column(
+            "classify_attempts",
+            sa.Integer(),
+            server_default=sa.text("0"),
+            nullable=False,
+        ),
+    )
+    op.add_column(
+        "news",
+        sa.Column(
+            "classified_with", sa.String(length=64), nullable=True
+        ),
+    )
+    op.add_column(
+        "news",
+        sa.Column(
+            "classify_claimed_at", sa.DateTime(), nullable=True
+        ),
+    )
+    op.create_index(
+        "ix_news_uncategorized",
+        "news",
+        ["id"],
+        unique=False,
+        postgresql_where=sa.text("category IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_news_uncategorized", table_name="news")
+    op.drop_column("news", "classify_claimed_at")
+    op.drop_column("news", "classified_with")
+    op.drop_column("news", "classify_attempts")
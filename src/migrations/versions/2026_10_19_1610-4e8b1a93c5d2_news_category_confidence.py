@@ -0,0 +1,31 @@
+"""news category confidence
+
+Revision ID: 4e8b1a93c5d2
+Revises: 9a4c2d7f1e36
+Create Date: 2026-10-19 16:10:27.503214
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "4e8b1a93c5d2"
+down_revision: Union[str, Sequence[str], None] = "9a4c2d7f1e36"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "news",
+        sa.Column("category_confidence", sa.Float(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("news", "category_confidence")
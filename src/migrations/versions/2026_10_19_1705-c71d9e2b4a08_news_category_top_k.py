@@ -0,0 +1,34 @@
+"""news category top k
+
+Revision ID: c71d9e2b4a08
+Revises: 4e8b1a93c5d2
+Create Date: 2026-10-19 17:05:12.840917
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "c71d9e2b4a08"
+down_revision: Union[str, Sequence[str], None] = "4e8b1a93c5d2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "news",
+        sa.Column(
+            "category_top_k", postgresql.JSON(), nullable=True
+        ),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("news", "category_top_k")
@@ -0,0 +1,37 @@
+"""denormalized used category index
+
+Revision ID: 5d2f8c6a1b93
+Revises: c71d9e2b4a08
+Create Date: 2026-10-19 17:50:03.271846
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5d2f8c6a1b93"
+down_revision: Union[str, Sequence[str], None] = "c71d9e2b4a08"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_news_denormalized_used_category",
+        "news_denormalized",
+        ["category"],
+        unique=False,
+        postgresql_where=sa.text("used_in_training"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        "ix_news_denormalized_used_category",
+        table_name="news_denormalized",
+    )
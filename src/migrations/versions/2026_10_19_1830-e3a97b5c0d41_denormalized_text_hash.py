@@ -0,0 +1,97 @@
+"""denormalized text hash
+
+Revision ID: e3a97b5c0d41
+Revises: 5d2f8c6a1b93
+Create Date: 2026-10-19 18:30:46.905127
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e3a97b5c0d41"
+down_revision: Union[str, Sequence[str], None] = "5d2f8c6a1b93"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TEXT_HASH_SQL = (
+    "md5(lower(regexp_replace("
+    "trim(title || ' ' || coalesce(summary, '')), "
+    "'\\s+', ' ', 'g')))"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "dataset_uploads",
+        sa.Column(
+            "duplicates",
+            sa.Integer(),
+            server_default=sa.text("0"),
+            nullable=False,
+        ),
+    )
+    op.create_check_constraint(
+        op.f(
+            "ck_dataset_uploads_chk_dataset_uploads_positive_duplicates"
+        ),
+        "dataset_uploads",
+        "duplicates >= 0",
+    )
+    op.add_column(
+        "news_denormalized",
+        sa.Column(
+            "text_hash",
+            sa.String(length=32),
+            sa.Computed(TEXT_HASH_SQL, persisted=True),
+            nullable=False,
+        ),
+    )
+    # из дубликатов остаётся самая ранняя строка; если хоть одна
+    # копия уже была в обучении, остаётся помеченной
+    op.execute(
+        """
+        UPDATE news_denormalized AS keep
+        SET used_in_training = true
+        FROM news_denormalized AS dup
+        WHERE dup.text_hash = keep.text_hash
+          AND dup.id > keep.id
+          AND dup.used_in_training
+          AND NOT keep.used_in_training
+        """
+    )
+    op.execute(
+        """
+        DELETE FROM news_denormalized AS dup
+        USING news_denormalized AS keep
+        WHERE dup.text_hash = keep.text_hash
+          AND dup.id > keep.id
+        """
+    )
+    op.create_unique_constraint(
+        op.f("uq_news_denormalized_text_hash"),
+        "news_denormalized",
+        ["text_hash"],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint(
+        op.f("uq_news_denormalized_text_hash"),
+        "news_denormalized",
+        type_="unique",
+    )
+    op.drop_column("news_denormalized", "text_hash")
+    op.drop_constraint(
+        op.f(
+            "ck_dataset_uploads_chk_dataset_uploads_positive_duplicates"
+        ),
+        "dataset_uploads",
+        type_="check",
+    )
+    op.drop_column("dataset_uploads", "duplicates")
@@ -0,0 +1,47 @@
+"""news title prefix index
+
+Revision ID: 8b1f4c2e7a95
+Revises: e3a97b5c0d41
+Create Date: 2026-10-20 09:30:12.604718
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8b1f4c2e7a95"
+down_revision: Union[str, Sequence[str], None] = "e3a97b5c0d41"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.drop_index(
+        "ix_news_title_trgm",
+        table_name="news",
+        postgresql_using="gin",
+        postgresql_ops={"title": "gin_trgm_ops"},
+    )
+    op.create_index(
+        "ix_news_title_prefix",
+        "news",
+        [sa.text("lower(title) text_pattern_ops")],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_news_title_prefix", table_name="news")
+    op.create_index(
+        "ix_news_title_trgm",
+        "news",
+        ["title"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"title": "gin_trgm_ops"},
+    )
@@ -0,0 +1,35 @@
+"""news classify attempted with
+
+Revision ID: a4d6e9f21c57
+Revises: 8b1f4c2e7a95
+Create Date: 2026-10-20 10:00:37.915204
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a4d6e9f21c57"
+down_revision: Union[str, Sequence[str], None] = "8b1f4c2e7a95"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "news",
+        sa.Column(
+            "classify_attempted_with",
+            sa.String(length=64),
+            nullable=True,
+        ),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("news", "classify_attempted_with")
@@ -1,4 +1,10 @@
+from src.ml.batching import (
+    MicroBatcher,
+    close_micro_batchers,
+    get_micro_batcher,
+)
 from src.ml.prediction import ModelPredictor
+from src.ml.resident import ResidentPredictor, get_resident_predictor
 from src.schemas.ml import (
     PredictionInput,
     PredictionResult,
@@ -10,12 +16,17 @@ from src.ml.service import NewsClassifierService
 from src.ml.training import ModelTrainer
 
 __all__ = [
+    "MicroBatcher",
     "ModelPredictor",
     "ModelTrainer",
     "NewsClassifierService",
     "PredictionInput",
     "PredictionResult",
+    "ResidentPredictor",
     "TopPrediction",
     "TrainConfig",
     "TrainingSample",
+    "close_micro_batchers",
+    "get_micro_batcher",
+    "get_resident_predictor",
 ]
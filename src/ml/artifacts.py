@@ -1,3 +1,10 @@
+import os
+import shutil
+import uuid
+import warnings
+from datetime import datetime, timezone
+
+import numpy as np
 import torch
 
 from src.ml.io_utils import (
@@ -8,32 +15,169 @@ from src.ml.io_utils import (
 )
 from src.ml.network import TextClassifier
 from src.schemas.ml import TrainConfig
-from src.ml.vocab import Vocab
+from src.ml.vocab import BinaryVocab, Vocab, write_binary_vocab
+
+
+def _load_mapped(path: str) -> np.ndarray:
+    return np.load(path, mmap_mode="r")
 
 
 class ArtifactStore:
+    """
+    Каждое обучение пишет артефакты в свой каталог
+    versions/<версия>, а публикует их замена manifest.json. Пока
+    манифест не сменился, читатели видят прежнюю полную версию.
+    Каталог без манифеста с path читается по старой плоской
+    раскладке прямо из model_dir.
+    """
+
     def __init__(self, model_dir: str = "artifacts"):
         self.model_dir = model_dir
+        self._pinned_dir: str | None = None
+        self._pinned_version: str | None = None
+
+    def _at(
+        self, version: str | None, artifact_dir: str
+    ) -> "ArtifactStore":
+        store = ArtifactStore(model_dir=self.model_dir)
+        store._pinned_dir = artifact_dir
+        store._pinned_version = version
+        return store
+
+    def _published_dir(self, manifest: dict | None) -> str:
+        if manifest and manifest.get("path"):
+            return f"{self.model_dir}/{manifest['path']}"
+        return self.model_dir
+
+    def resolve(self) -> "ArtifactStore":
+        """
+        Store, закреплённый за опубликованной сейчас версией: все
+        файлы одной загрузки читаются из одного каталога, даже если
+        посреди неё опубликуют новую.
+        """
+        if self._pinned_dir is not None:
+            return self
+        manifest = self.load_manifest()
+        version = manifest.get("version") if manifest else None
+        return self._at(
+            str(version) if version else None,
+            self._published_dir(manifest),
+        )
+
+    @property
+    def artifact_dir(self) -> str:
+        if self._pinned_dir is not None:
+            return self._pinned_dir
+        return self._published_dir(self.load_manifest())
+
+    @property
+    def versions_dir(self) -> str:
+        return f"{self.model_dir}/versions"
 
     @property
     def model_path(self) -> str:
-        return f"{self.model_dir}/model.pt"
+        return f"{self.artifact_dir}/model.pt"
 
     @property
     def vocab_path(self) -> str:
-        return f"{self.model_dir}/vocab.json"
+        # JSON остаётся только для чтения старых артефактов
+        return f"{self.artifact_dir}/vocab.json"
+
+    @property
+    def vocab_bin_path(self) -> str:
+        return f"{self.artifact_dir}/vocab.bin"
 
     @property
     def labels_path(self) -> str:
-        return f"{self.model_dir}/labels.json"
+        return f"{self.artifact_dir}/labels.json"
 
     @property
     def config_path(self) -> str:
-        return f"{self.model_dir}/config.json"
+        return f"{self.artifact_dir}/config.json"
 
     @property
     def metrics_path(self) -> str:
-        return f"{self.model_dir}/metrics.json"
+        return f"{self.artifact_dir}/metrics.json"
+
+    @property
+    def validation_path(self) -> str:
+        return f"{self.artifact_dir}/validation.json"
+
+    @property
+    def quantized_model_path(self) -> str:
+        return f"{self.artifact_dir}/model.int8.pt"
+
+    @property
+    def mmap_dir(self) -> str:
+        return f"{self.artifact_dir}/mmap"
+
+    @property
+    def corpus_cache_dir(self) -> str:
+        return f"{self.model_dir}/corpus_cache"
+
+    @property
+    def manifest_path(self) -> str:
+        return f"{self.model_dir}/manifest.json"
+
+    def stage(self) -> "ArtifactStore":
+        """Store для записи новой версии в её пустой каталог."""
+        version = (
+            datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+            + "-"
+            + uuid.uuid4().hex[:8]
+        )
+        staged = self._at(version, f"{self.versions_dir}/{version}")
+        ensure_dir(staged.artifact_dir)
+        return staged
+
+    def publish(self, staged: "ArtifactStore") -> str:
+        """
+        Переключает читателей на записанную версию одной атомарной
+        заменой манифеста. Предыдущая версия остаётся: процессы
+        могут ещё дочитывать её, остальные каталоги удаляются.
+        """
+        version = staged.artifact_version()
+        if staged._pinned_dir is None or version is None:
+            raise ValueError("Only a staged store can be published")
+        previous = self.load_manifest() or {}
+        created_at = datetime.now(timezone.utc)
+        save_json(
+            {
+                "version": version,
+                "created_at": created_at.isoformat(),
+                "path": os.path.relpath(
+                    staged.artifact_dir, self.model_dir
+                ),
+            },
+            self.manifest_path,
+        )
+        keep = {version, previous.get("version")}
+        for name in os.listdir(self.versions_dir):
+            if name not in keep:
+                shutil.rmtree(
+                    f"{self.versions_dir}/{name}",
+                    ignore_errors=True,
+                )
+        return version
+
+    def load_manifest(self) -> dict | None:
+        try:
+            return load_json(self.manifest_path)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def artifact_version(self) -> str | None:
+        if self._pinned_version is not None:
+            return self._pinned_version
+        manifest = self.load_manifest()
+        if manifest and manifest.get("version"):
+            return str(manifest["version"])
+        # артефакты, сохранённые до появления манифеста
+        try:
+            mtime = os.stat(self.model_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        return f"mtime-{mtime}"
 
     def save_metadata(
         self,
@@ -42,37 +186,158 @@ class ArtifactStore:
         config: TrainConfig,
         metrics: dict,
     ) -> None:
-        ensure_dir(self.model_dir)
-        save_json(vocab.to_dict(), self.vocab_path)
+        ensure_dir(self.artifact_dir)
+        write_binary_vocab(vocab, self.vocab_bin_path)
         save_json(labels, self.labels_path)
         save_json(config.model_dump(), self.config_path)
         save_json(metrics, self.metrics_path)
 
     def save_model_state(self, model: TextClassifier) -> None:
-        ensure_dir(self.model_dir)
+        ensure_dir(self.artifact_dir)
         torch.save(model.state_dict(), self.model_path)
 
-    def load_predictor_bundle(self, device: str):
+    def load_model_state(self, device_obj: torch.device) -> dict:
+        return torch.load(self.model_path, map_location=device_obj)
+
+    def load_vocab(self) -> Vocab:
+        if os.path.exists(self.vocab_bin_path):
+            return BinaryVocab.open(self.vocab_bin_path).to_vocab()
+        return Vocab.from_dict(load_json(self.vocab_path))
+
+    def save_validation(
+        self, samples: list[tuple[str, str]]
+    ) -> None:
+        """
+        Отложенная выборка обучения (текст, метка): по ней, а не по
+        пересобранному из CSV сплиту, сравниваются версии модели.
+        """
+        if not samples:
+            return
+        ensure_dir(self.artifact_dir)
+        save_json(
+            [[text, label] for text, label in samples],
+            self.validation_path,
+        )
+
+    def load_validation(self) -> list[tuple[str, str]]:
+        try:
+            payload = load_json(self.validation_path)
+        except FileNotFoundError:
+            return []
+        return [(text, label) for text, label in payload]
+
+    def load_temperature(self) -> float:
+        try:
+            metrics = load_json(self.metrics_path)
+        except FileNotFoundError:
+            return 1.0
+        return float(metrics.get("temperature", 1.0))
+
+    def load_inference_vocab(
+        self, in_memory_index: bool = False
+    ) -> BinaryVocab | Vocab:
+        if os.path.exists(self.vocab_bin_path):
+            return BinaryVocab.open(
+                self.vocab_bin_path, in_memory_index=in_memory_index
+            )
+        return Vocab.from_dict(load_json(self.vocab_path))
+
+    def save_mmap_bundle(self, model: TextClassifier) -> None:
+        """
+        Веса в отдельных .npy: процессы отображают их в память и
+        делят одну копию страниц.
+        """
+        ensure_dir(self.mmap_dir)
+        arrays = {
+            f"{name}.npy": tensor.detach().cpu().numpy()
+            for name, tensor in model.state_dict().items()
+        }
+        for name, array in arrays.items():
+            np.save(f"{self.mmap_dir}/{name}", array)
+
+    def has_mmap_bundle(self) -> bool:
+        return os.path.exists(
+            f"{self.mmap_dir}/embedding.weight.npy"
+        )
+
+    def load_mapped_model(
+        self, labels: list[str], config: dict
+    ) -> TextClassifier:
+        state: dict[str, torch.Tensor] = {}
+        with warnings.catch_warnings():
+            # память только для чтения, модель её не изменяет
+            warnings.simplefilter("ignore", UserWarning)
+            for name in os.listdir(self.mmap_dir):
+                if not name.endswith(".npy") or name.endswith(
+                    ".tmp.npy"
+                ):
+                    continue
+                state[name[: -len(".npy")]] = torch.from_numpy(
+                    _load_mapped(f"{self.mmap_dir}/{name}")
+                )
+
+        with torch.device("meta"):
+            model = TextClassifier(
+                vocab_size=state["embedding.weight"].shape[0],
+                embed_dim=int(config["embed_dim"]),
+                num_classes=len(labels),
+                dropout=float(config["dropout"]),
+            )
+        model.load_state_dict(state, assign=True)
+        model.eval()
+        return model
+
+    def load_predictor_bundle(
+        self,
+        device: str,
+        prefer_quantized: bool = True,
+        vocab_index: bool = False,
+    ):
+        if self._pinned_dir is None:
+            return self.resolve().load_predictor_bundle(
+                device,
+                prefer_quantized=prefer_quantized,
+                vocab_index=vocab_index,
+            )
         device_obj = resolve_device(device)
-        vocab = Vocab.from_dict(load_json(self.vocab_path))
         labels = load_json(self.labels_path)
         config = load_json(self.config_path)
+        vocab = self.load_inference_vocab(
+            in_memory_index=vocab_index
+        )
+
+        # квантованные ядра есть только для CPU
+        if (
+            prefer_quantized
+            and device_obj.type == "cpu"
+            and os.path.exists(self.quantized_model_path)
+        ):
+            model = torch.jit.load(
+                self.quantized_model_path, map_location=device_obj
+            )
+            model.eval()
+            return model, vocab, labels, config, device_obj
+
+        if device_obj.type == "cpu" and self.has_mmap_bundle():
+            model = self.load_mapped_model(labels, config)
+            return model, vocab, labels, config, device_obj
 
         model = TextClassifier(
-            vocab_size=len(vocab.token_to_idx),
+            vocab_size=len(vocab),
             embed_dim=int(config["embed_dim"]),
             num_classes=len(labels),
             dropout=float(config["dropout"]),
         )
-        state = torch.load(self.model_path, map_location=device_obj)
-        model.load_state_dict(state)
+        model.load_state_dict(self.load_model_state(device_obj))
         model.to(device_obj)
         model.eval()
         return model, vocab, labels, config, device_obj
 
     def load_resume_bundle(self, device: str):
+        if self._pinned_dir is None:
+            return self.resolve().load_resume_bundle(device)
         device_obj = resolve_device(device)
-        vocab = Vocab.from_dict(load_json(self.vocab_path))
+        vocab = self.load_vocab()
         labels = load_json(self.labels_path)
         config = load_json(self.config_path)
         state = torch.load(self.model_path, map_location=device_obj)
@@ -0,0 +1,296 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+
+from src.config import settings
+from src.ml.resident import (
+    ResidentPredictor,
+    get_resident_predictor,
+)
+from src.ml.text import normalize_prediction_input
+from src.schemas.ml import PredictionInput, PredictionResult
+from src.utils.exceptions import (
+    InferenceOverloadedError,
+    ModelNotReadyError,
+)
+
+logger = logging.getLogger("src.ml.batching")
+
+# параметры постобработки, которые должны совпадать внутри группы
+_Options = tuple[int, float | None, frozenset[str] | None, bool]
+
+
+@dataclass(slots=True)
+class _PendingPrediction:
+    payload: PredictionInput
+    options: _Options
+    future: asyncio.Future
+
+
+class MicroBatcher:
+    """
+    Собирает одновременные запросы на предсказание в один батч:
+    батч уходит в модель, когда набралось max_batch_size запросов
+    или с момента первого прошло max_wait секунд.
+
+    На батч выполняется один прямой проход EmbeddingBag в отдельном
+    потоке, постобработка группируется по параметрам запроса.
+    Очередь привязана к event loop, в котором создан батчер.
+    """
+
+    def __init__(
+        self,
+        predictor: ResidentPredictor,
+        max_batch_size: int = 64,
+        max_wait: float = 0.005,
+        max_queue: int = 1024,
+    ):
+        self.predictor = predictor
+        self.max_batch_size = max(int(max_batch_size), 1)
+        self.max_wait = max(float(max_wait), 0.0)
+        self._queue: asyncio.Queue[_PendingPrediction] = (
+            asyncio.Queue(maxsize=max(int(max_queue), 1))
+        )
+        self._worker: asyncio.Task | None = None
+
+    async def predict(
+        self,
+        payload: PredictionInput,
+        top_k: int = 3,
+        min_confidence: float | None = None,
+        allowed_labels: set[str] | None = None,
+        include_probabilities: bool = False,
+    ) -> PredictionResult:
+        _validate(payload)
+        options = _make_options(
+            top_k=top_k,
+            min_confidence=min_confidence,
+            allowed_labels=allowed_labels,
+            include_probabilities=include_probabilities,
+        )
+        future = self._submit(payload, options)
+        try:
+            return await future
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+
+    async def predict_many(
+        self,
+        payloads: list[PredictionInput],
+        top_k: int = 3,
+        min_confidence: float | None = None,
+        allowed_labels: set[str] | None = None,
+        include_probabilities: bool = False,
+    ) -> list[PredictionResult]:
+        """
+        Ставит payloads в очередь порциями не больше её размера.
+        Если очередь переполнена или ожидание прервано, уже
+        поставленные запросы порции отменяются и воркер их
+        пропускает.
+        """
+        for payload in payloads:
+            _validate(payload)
+        options = _make_options(
+            top_k=top_k,
+            min_confidence=min_confidence,
+            allowed_labels=allowed_labels,
+            include_probabilities=include_probabilities,
+        )
+
+        results: list[PredictionResult] = []
+        chunk_size = self._queue.maxsize
+        for start in range(0, len(payloads), chunk_size):
+            futures: list[asyncio.Future] = []
+            try:
+                for payload in payloads[start : start + chunk_size]:
+                    futures.append(self._submit(payload, options))
+                results.extend(await asyncio.gather(*futures))
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+        return results
+
+    async def close(self) -> None:
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+    def _submit(
+        self, payload: PredictionInput, options: _Options
+    ) -> asyncio.Future:
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait(
+                _PendingPrediction(
+                    payload=payload, options=options, future=future
+                )
+            )
+        except asyncio.QueueFull as exc:
+            raise InferenceOverloadedError from exc
+        return future
+
+    def _ensure_worker(self) -> asyncio.Task:
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+        return self._worker
+
+    async def _collect(self) -> list[_PendingPrediction]:
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            # всё, что уже лежит в очереди, забираем без ожидания
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(
+                    await asyncio.wait_for(
+                        self._queue.get(), timeout=timeout
+                    )
+                )
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            # отменённые запросы в модель не отправляем
+            batch = [
+                pending
+                for pending in await self._collect()
+                if not pending.future.done()
+            ]
+            if not batch:
+                continue
+            try:
+                results = await asyncio.to_thread(
+                    self._forward, batch
+                )
+            except Exception as exc:
+                for pending in batch:
+                    if not pending.future.done():
+                        pending.future.set_exception(exc)
+                continue
+
+            for pending, result in zip(batch, results):
+                if not pending.future.done():
+                    pending.future.set_result(result)
+
+    def _forward(
+        self,
+        batch: list[_PendingPrediction],
+    ) -> list[PredictionResult]:
+        try:
+            predictor = self.predictor.get()
+        except FileNotFoundError as exc:
+            raise ModelNotReadyError from exc
+
+        probs = predictor.predict_probabilities(
+            [pending.payload for pending in batch]
+        )
+
+        groups: dict[_Options, list[int]] = {}
+        for index, pending in enumerate(batch):
+            groups.setdefault(pending.options, []).append(index)
+
+        results: list[PredictionResult | None] = [None] * len(batch)
+        for options, indices in groups.items():
+            top_k, min_confidence, allowed_labels, include = options
+            filtered = predictor.filter_batch(
+                probs=probs[indices],
+                allowed_labels=set(allowed_labels)
+                if allowed_labels is not None
+                else None,
+                top_k=top_k,
+                min_confidence=min_confidence,
+                include_probabilities=include,
+            )
+            for index, result in zip(indices, filtered):
+                results[index] = result
+
+        logger.debug(
+            "Predicted batch of %d in %d group(s)",
+            len(batch),
+            len(groups),
+        )
+        return results  # type: ignore[return-value]
+
+
+def _validate(payload: PredictionInput) -> None:
+    # пустой текст отсекаем до очереди, иначе упадёт весь батч
+    if not normalize_prediction_input(payload):
+        raise ValueError("Input is empty after normalization.")
+
+
+def _make_options(
+    top_k: int,
+    min_confidence: float | None,
+    allowed_labels: set[str] | None,
+    include_probabilities: bool,
+) -> _Options:
+    return (
+        top_k,
+        min_confidence,
+        frozenset(allowed_labels)
+        if allowed_labels is not None
+        else None,
+        include_probabilities,
+    )
+
+
+# батчеры по id(loop). Задача воркера держит loop, поэтому слабые
+# ссылки не помогают: запись удаляется, когда воркер остановлен
+# (close или отмена задач в конце asyncio.run)
+_batchers: dict[
+    int, tuple[asyncio.AbstractEventLoop, MicroBatcher]
+] = {}
+
+
+def get_micro_batcher() -> MicroBatcher:
+    """
+    Батчер текущего event loop. В API это один общий батчер, в
+    Celery каждый asyncio.run получает свой, а модель остаётся
+    общей через ResidentPredictor.
+    """
+    loop = asyncio.get_running_loop()
+    key = id(loop)
+    entry = _batchers.get(key)
+    if entry is not None and entry[0] is loop:
+        return entry[1]
+
+    batcher = MicroBatcher(
+        predictor=get_resident_predictor(),
+        max_batch_size=settings.ML_BATCH_MAX_SIZE,
+        max_wait=settings.ML_BATCH_MAX_WAIT_SEC,
+        max_queue=settings.ML_BATCH_MAX_QUEUE,
+    )
+    _batchers[key] = (loop, batcher)
+
+    def forget(_: asyncio.Task) -> None:
+        if _batchers.get(key, (None, None))[1] is batcher:
+            del _batchers[key]
+
+    batcher._ensure_worker().add_done_callback(forget)
+    return batcher
+
+
+async def close_micro_batchers() -> None:
+    """Закрывает батчеры текущего loop, новых не создаёт."""
+    loop = asyncio.get_running_loop()
+    for owner, batcher in list(_batchers.values()):
+        if owner is loop:
+            await batcher.close()
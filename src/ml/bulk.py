@@ -0,0 +1,166 @@
+import asyncio
+import csv
+import logging
+from typing import Any, AsyncIterator, Literal
+
+import orjson
+
+from src.ml.resident import ResidentPredictor
+from src.ml.text import normalize_prediction_input
+from src.schemas.ml import PredictionInput
+
+logger = logging.getLogger("src.ml.bulk")
+
+BulkFormat = Literal["ndjson", "csv"]
+
+# строка длиннее считается ошибкой ввода, буфер не растёт
+MAX_LINE_BYTES = 64 * 1024
+
+
+async def iter_lines(
+    chunks: AsyncIterator[bytes],
+    max_line_bytes: int = MAX_LINE_BYTES,
+) -> AsyncIterator[bytes | None]:
+    """
+    Режет поток байтов на строки. Вместо слишком длинной строки
+    отдаёт None, её остаток пропускается до перевода строки.
+    """
+    buffer = b""
+    skipping = False
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if skipping:
+                skipping = False
+                continue
+            if len(line) > max_line_bytes:
+                yield None
+            else:
+                yield line.rstrip(b"\r")
+        if len(buffer) > max_line_bytes:
+            if not skipping:
+                yield None
+            skipping = True
+            buffer = b""
+    if buffer and not skipping:
+        yield buffer.rstrip(b"\r")
+
+
+def _row_from_ndjson(line: bytes) -> dict[str, Any]:
+    row = orjson.loads(line)
+    if not isinstance(row, dict):
+        raise ValueError("row must be a JSON object")
+    return row
+
+
+def _row_from_csv(line: bytes, header: list[str]) -> dict[str, Any]:
+    # строки читаются по одной, переводы строк внутри кавычек
+    # не поддерживаются
+    values = next(csv.reader([line.decode("utf-8")]))
+    return dict(zip(header, values))
+
+
+def _to_input(row: dict[str, Any]) -> PredictionInput:
+    title = row.get("title")
+    summary = row.get("summary") or ""
+    if not isinstance(title, str) or not title.strip():
+        raise ValueError("title is required")
+    if not isinstance(summary, str):
+        raise ValueError("summary must be a string")
+    payload = PredictionInput(
+        news_id=0, title=title, summary=summary
+    )
+    # пустой после нормализации текст уронил бы весь батч
+    if not normalize_prediction_input(payload):
+        raise ValueError("text is empty after normalization")
+    return payload
+
+
+def _dump(item: dict[str, Any]) -> bytes:
+    return orjson.dumps(item) + b"\n"
+
+
+async def stream_predictions(
+    chunks: AsyncIterator[bytes],
+    predictor: ResidentPredictor,
+    fmt: BulkFormat,
+    batch_size: int,
+    top_k: int = 3,
+    min_confidence: float | None = None,
+) -> AsyncIterator[bytes]:
+    """
+    Классифицирует строки NDJSON/CSV из потока запроса батчами по
+    batch_size и сразу отдаёт NDJSON с ответами. В памяти только
+    текущий батч, размер входа не важен. Ошибка в строке не
+    прерывает поток: для неё отдаётся {"line": n, "error": ...}.
+    """
+    header: list[str] | None = None
+    batch: list[tuple[int, Any, PredictionInput]] = []
+    line_no = 0
+
+    async def flush() -> bytes:
+        results = await asyncio.to_thread(
+            predictor.predict_many,
+            [item for _, _, item in batch],
+            top_k=top_k,
+            min_confidence=min_confidence,
+        )
+        payload = b"".join(
+            _dump(
+                {
+                    "line": number,
+                    "id": row_id,
+                    **result.model_dump(exclude_none=True),
+                }
+            )
+            for (number, row_id, _), result in zip(batch, results)
+        )
+        batch.clear()
+        return payload
+
+    async for line in iter_lines(chunks):
+        line_no += 1
+        if line is None:
+            yield _dump(
+                {"line": line_no, "error": "line is too long"}
+            )
+            continue
+        if not line.strip():
+            continue
+        if fmt == "csv" and header is None:
+            try:
+                header = [
+                    name.strip()
+                    for name in next(
+                        csv.reader([line.decode("utf-8-sig")])
+                    )
+                ]
+            except UnicodeDecodeError:
+                header = []
+            if "title" not in header:
+                yield _dump(
+                    {
+                        "line": line_no,
+                        "error": "title column is missing",
+                    }
+                )
+                return
+            continue
+
+        try:
+            row = (
+                _row_from_csv(line, header or [])
+                if fmt == "csv"
+                else _row_from_ndjson(line)
+            )
+            batch.append((line_no, row.get("id"), _to_input(row)))
+        except (ValueError, UnicodeDecodeError) as exc:
+            yield _dump({"line": line_no, "error": str(exc)})
+            continue
+
+        if len(batch) >= batch_size:
+            yield await flush()
+
+    if batch:
+        yield await flush()
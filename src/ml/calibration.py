@@ -0,0 +1,69 @@
+import logging
+
+import torch
+from torch import nn
+from torch.nn import functional as F
+
+logger = logging.getLogger("src.ml.calibration")
+
+# рамки температуры, за ними подбор считаем неудачным
+MIN_TEMPERATURE = 0.05
+MAX_TEMPERATURE = 20.0
+
+
+@torch.no_grad()
+def collect_logits(
+    model: nn.Module, loader, device: torch.device
+) -> tuple[torch.Tensor, torch.Tensor]:
+    """Логиты и метки всей выборки, собранные по батчам на CPU."""
+    model.eval()
+    all_logits: list[torch.Tensor] = []
+    all_labels: list[torch.Tensor] = []
+    for input_ids, offsets, labels in loader:
+        logits = model(input_ids.to(device), offsets.to(device))
+        all_logits.append(logits.float().cpu())
+        all_labels.append(labels.cpu())
+    if not all_logits:
+        return torch.empty(0), torch.empty(0, dtype=torch.long)
+    return torch.cat(all_logits), torch.cat(all_labels)
+
+
+def fit_temperature(
+    logits: torch.Tensor,
+    labels: torch.Tensor,
+    max_iter: int = 50,
+) -> tuple[float, float, float]:
+    """
+    Temperature scaling: подбирает T, минимизируя NLL на
+    валидационной выборке. argmax от T не зависит, меняются только
+    вероятности. Возвращает (T, nll до, nll после).
+    """
+    if logits.numel() == 0:
+        return 1.0, 0.0, 0.0
+
+    nll_before = F.cross_entropy(logits, labels).item()
+    # оптимизируем log T, чтобы T оставалась положительной
+    log_t = torch.zeros(1, requires_grad=True)
+    optimizer = torch.optim.LBFGS(
+        [log_t], lr=0.1, max_iter=max_iter
+    )
+
+    def closure() -> torch.Tensor:
+        optimizer.zero_grad()
+        loss = F.cross_entropy(logits / log_t.exp(), labels)
+        loss.backward()
+        return loss
+
+    optimizer.step(closure)
+    temperature = float(log_t.detach().exp())
+    if not MIN_TEMPERATURE <= temperature <= MAX_TEMPERATURE:
+        logger.warning(
+            "Temperature %.3f is out of range, calibration skipped",
+            temperature,
+        )
+        return 1.0, nll_before, nll_before
+
+    nll_after = F.cross_entropy(logits / temperature, labels).item()
+    if nll_after > nll_before:
+        return 1.0, nll_before, nll_before
+    return temperature, nll_before, nll_after
@@ -0,0 +1,157 @@
+import hashlib
+import logging
+import os
+from typing import Sequence
+
+import numpy as np
+
+from src.ml.encoding import FastEncoder
+from src.ml.io_utils import ensure_dir
+from src.ml.vocab import Vocab
+
+logger = logging.getLogger("src.ml.corpus")
+
+
+def corpus_digest(samples: Sequence[tuple[str, str]]) -> str:
+    digest = hashlib.sha1()
+    for text, label in samples:
+        digest.update(text.encode("utf-8"))
+        digest.update(b"\x1f")
+        digest.update(label.encode("utf-8"))
+        digest.update(b"\x1e")
+    return digest.hexdigest()
+
+
+class EncodedCorpus:
+    """
+    Весь корпус, один раз переведённый в id токенов: плоский int32
+    массив ids, границы текстов offsets (len + 1) и метки классов.
+
+    Эпоха обучения только выбирает строки по индексам, без работы
+    со строками на Python.
+    """
+
+    def __init__(
+        self,
+        ids: np.ndarray,
+        offsets: np.ndarray,
+        labels: np.ndarray,
+    ):
+        self.ids = ids
+        self.offsets = offsets
+        self.labels = labels
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    @classmethod
+    def build(
+        cls,
+        samples: Sequence[tuple[str, str]],
+        vocab: Vocab,
+        label_to_idx: dict[str, int],
+    ) -> "EncodedCorpus":
+        encoder = FastEncoder(vocab, cache_size=0)
+        arrays = [encoder.encode_text(text) for text, _ in samples]
+        lengths = np.fromiter(
+            map(len, arrays), dtype=np.int64, count=len(arrays)
+        )
+        offsets = np.zeros(len(arrays) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        ids = np.empty(int(offsets[-1]), dtype=np.int32)
+        if arrays:
+            np.concatenate(arrays, out=ids, casting="same_kind")
+        labels = np.fromiter(
+            (label_to_idx[label] for _, label in samples),
+            dtype=np.int64,
+            count=len(samples),
+        )
+        return cls(ids=ids, offsets=offsets, labels=labels)
+
+    def gather(
+        self, indices: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Собирает батч (ids, offsets, labels) по номерам строк."""
+        starts = self.offsets[indices]
+        lengths = self.offsets[indices + 1] - starts
+        batch_offsets = np.zeros(len(indices), dtype=np.int64)
+        np.cumsum(lengths[:-1], out=batch_offsets[1:])
+        # позиция каждого токена батча в плоском массиве корпуса
+        positions = np.repeat(starts - batch_offsets, lengths)
+        positions += np.arange(len(positions), dtype=np.int64)
+        return (
+            self.ids[positions].astype(np.int64),
+            batch_offsets,
+            self.labels[indices],
+        )
+
+    def save(self, path: str) -> None:
+        ensure_dir(os.path.dirname(path))
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(
+            tmp_path,
+            ids=self.ids,
+            offsets=self.offsets,
+            labels=self.labels,
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "EncodedCorpus":
+        with np.load(path) as payload:
+            return cls(
+                ids=payload["ids"],
+                offsets=payload["offsets"],
+                labels=payload["labels"],
+            )
+
+
+def load_or_build_corpus(
+    cache_dir: str,
+    samples: Sequence[tuple[str, str]],
+    vocab: Vocab,
+    label_to_idx: dict[str, int],
+) -> EncodedCorpus:
+    """
+    Берёт закодированный корпус из кэша рядом с артефактами. Ключ
+    кэша: хэш словаря, меток и текстов, так что смена любого из них
+    даёт промах и перекодирование.
+    """
+    key = hashlib.sha1(
+        "|".join(
+            (
+                vocab.digest(),
+                ",".join(label_to_idx),
+                corpus_digest(samples),
+            )
+        ).encode("utf-8")
+    ).hexdigest()[:16]
+    path = os.path.join(cache_dir, f"{key}.npz")
+
+    if os.path.exists(path):
+        try:
+            corpus = EncodedCorpus.load(path)
+            if len(corpus) == len(samples):
+                logger.info("Loaded encoded corpus %s", key)
+                return corpus
+        except (OSError, ValueError, KeyError) as exc:
+            logger.warning(
+                "Broken corpus cache %s, rebuilding: %s", path, exc
+            )
+
+    corpus = EncodedCorpus.build(samples, vocab, label_to_idx)
+    try:
+        corpus.save(path)
+        # держим только актуальный кэш, старые корпуса не нужны
+        for name in os.listdir(cache_dir):
+            if name.endswith(".npz") and name != f"{key}.npz":
+                os.remove(os.path.join(cache_dir, name))
+    except OSError as exc:
+        logger.warning("Failed to save corpus cache: %s", exc)
+    logger.info(
+        "Encoded corpus %s: %d samples, %d tokens",
+        key,
+        len(corpus),
+        len(corpus.ids),
+    )
+    return corpus
@@ -0,0 +1,116 @@
+import threading
+from collections import OrderedDict
+from itertools import chain
+from typing import Sequence
+
+import numpy as np
+import torch
+
+from src.ml.text import TOKEN_RE
+from src.ml.vocab import BinaryVocab, Vocab
+
+_EMPTY = np.empty(0, dtype=np.int64)
+
+
+class FastEncoder:
+    """
+    Кодирует тексты сразу в массивы id без промежуточных списков.
+
+    Токены всех новых текстов батча ищутся в словаре одним вызовом
+    encode_array, батч собирается в заранее выделенный плоский
+    буфер ids + offsets, который отдаётся в torch без копирования.
+    Повторяющиеся тексты берутся из LRU-кэша.
+    """
+
+    def __init__(
+        self,
+        vocab: Vocab | BinaryVocab,
+        cache_size: int = 4096,
+    ):
+        self.vocab = vocab
+        self.cache_size = cache_size
+        self._unk = np.array([vocab.unk_idx], dtype=np.int64)
+        self._unk.flags.writeable = False
+        self._cache: OrderedDict[str, np.ndarray] = OrderedDict()
+        # кодирование идёт из потоков asyncio.to_thread
+        self._lock = threading.Lock()
+
+    def encode_text(self, text: str) -> np.ndarray:
+        return self.encode_texts([text])[0]
+
+    def encode_texts(
+        self, texts: Sequence[str]
+    ) -> list[np.ndarray]:
+        arrays: list[np.ndarray] = [self._unk] * len(texts)
+        missing: dict[str, list[int]] = {}
+        with self._lock:
+            for position, text in enumerate(texts):
+                ids = self._cache.get(text)
+                if ids is None:
+                    missing.setdefault(text, []).append(position)
+                else:
+                    self._cache.move_to_end(text)
+                    arrays[position] = ids
+        if not missing:
+            return arrays
+
+        tokens = [
+            TOKEN_RE.findall(text.lower()) if text else []
+            for text in missing
+        ]
+        lengths = np.fromiter(
+            map(len, tokens), dtype=np.int64, count=len(tokens)
+        )
+        ids = self.vocab.encode_array(
+            list(chain.from_iterable(tokens))
+        )
+        parts = np.split(ids, np.cumsum(lengths[:-1]))
+
+        with self._lock:
+            for (text, positions), part in zip(
+                missing.items(), parts
+            ):
+                if not part.size:
+                    part = self._unk
+                elif self.cache_size > 0:
+                    # копия: срез держал бы в кэше массив всего
+                    # батча; от изменений массив в кэше защищён
+                    part = part.copy()
+                    part.flags.writeable = False
+                    self._cache[text] = part
+                for position in positions:
+                    arrays[position] = part
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return arrays
+
+    def encode_arrays(
+        self, texts: Sequence[str]
+    ) -> tuple[np.ndarray, np.ndarray]:
+        return pack_arrays(self.encode_texts(texts))
+
+    def encode_batch(
+        self, texts: Sequence[str]
+    ) -> tuple[torch.Tensor, torch.Tensor]:
+        input_ids, offsets = self.encode_arrays(texts)
+        return (
+            torch.from_numpy(input_ids),
+            torch.from_numpy(offsets),
+        )
+
+
+def pack_arrays(
+    arrays: Sequence[np.ndarray],
+) -> tuple[np.ndarray, np.ndarray]:
+    """Склеивает id текстов в плоский буфер и считает offsets."""
+    if not arrays:
+        return _EMPTY.copy(), _EMPTY.copy()
+
+    lengths = np.fromiter(
+        map(len, arrays), dtype=np.int64, count=len(arrays)
+    )
+    offsets = np.zeros(len(arrays), dtype=np.int64)
+    np.cumsum(lengths[:-1], out=offsets[1:])
+    input_ids = np.empty(int(lengths.sum()), dtype=np.int64)
+    np.concatenate(arrays, out=input_ids)
+    return input_ids, offsets
@@ -0,0 +1,77 @@
+import copy
+import logging
+import os
+
+import torch
+from torch import nn
+from torch.ao.quantization import (
+    default_dynamic_qconfig,
+    float_qparams_weight_only_qconfig,
+    quantize_dynamic,
+)
+
+from src.ml.network import TextClassifier
+
+logger = logging.getLogger("src.ml.export")
+
+# доля совпадений argmax с исходной моделью, ниже которой
+# квантованный артефакт не сохраняется
+MIN_PROBE_AGREEMENT = 0.98
+
+
+def quantize_classifier(model: TextClassifier) -> nn.Module:
+    """
+    Динамическая квантизация: int8 веса Linear и построчно
+    квантованная int8 таблица EmbeddingBag. Только для CPU.
+    """
+    float_model = copy.deepcopy(model).cpu().eval()
+    return quantize_dynamic(
+        float_model,
+        qconfig_spec={
+            nn.Linear: default_dynamic_qconfig,
+            nn.EmbeddingBag: float_qparams_weight_only_qconfig,
+        },
+        dtype=torch.qint8,
+    )
+
+
+def export_quantized(
+    model: TextClassifier,
+    path: str,
+    probe: tuple[torch.Tensor, torch.Tensor] | None = None,
+) -> bool:
+    """
+    Сохраняет квантованную TorchScript-копию модели в path. Если
+    передан probe, копия сверяется с исходной моделью по argmax.
+    """
+    try:
+        scripted = torch.jit.script(quantize_classifier(model))
+        if probe is not None:
+            agreement = _probe_agreement(model, scripted, probe)
+            if agreement < MIN_PROBE_AGREEMENT:
+                logger.warning(
+                    "Quantized model agrees with float model on "
+                    "%.3f of probe samples, skipping export",
+                    agreement,
+                )
+                return False
+        tmp_path = f"{path}.tmp"
+        torch.jit.save(scripted, tmp_path)
+        os.replace(tmp_path, path)
+    except Exception as exc:
+        logger.warning("Failed to export quantized model: %s", exc)
+        return False
+    return True
+
+
+@torch.inference_mode()
+def _probe_agreement(
+    model: TextClassifier,
+    quantized: nn.Module,
+    probe: tuple[torch.Tensor, torch.Tensor],
+) -> float:
+    input_ids, offsets = (tensor.cpu() for tensor in probe)
+    float_model = copy.deepcopy(model).cpu().eval()
+    expected = float_model(input_ids, offsets).argmax(dim=-1)
+    actual = quantized(input_ids, offsets).argmax(dim=-1)
+    return (expected == actual).float().mean().item()
@@ -30,8 +30,14 @@ def ensure_dir(path: str) -> None:
 
 
 def save_json(payload: Any, path: str) -> None:
-    with open(path, "w", encoding="utf-8") as file:
-        json.dump(payload, file, ensure_ascii=False, indent=2)
+    # компактно и через временный файл: читатель не увидит
+    # наполовину записанный JSON
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(
+            payload, file, ensure_ascii=False, separators=(",", ":")
+        )
+    os.replace(tmp_path, path)
 
 
 def load_json(path: str) -> Any:
@@ -1,36 +1,16 @@
-from typing import Any, Iterable
+from typing import Any
 
 import torch
 
 from src.ml.artifacts import ArtifactStore
+from src.ml.encoding import FastEncoder
 from src.ml.network import TextClassifier
 from src.schemas.ml import (
     PredictionInput,
     PredictionResult,
     TopPrediction,
 )
-from src.ml.text import normalize_prediction_input, tokenize
-
-
-def _encode_texts(
-    texts: Iterable[str],
-    vocab,
-) -> tuple[torch.Tensor, torch.Tensor]:
-    input_ids: list[int] = []
-    offsets: list[int] = []
-    offset = 0
-    for text in texts:
-        token_ids = vocab.encode(tokenize(text))
-        if not token_ids:
-            token_ids = [vocab.unk_idx]
-        offsets.append(offset)
-        input_ids.extend(token_ids)
-        offset += len(token_ids)
-
-    return (
-        torch.tensor(input_ids, dtype=torch.long),
-        torch.tensor(offsets, dtype=torch.long),
-    )
+from src.ml.text import normalize_prediction_input
 
 
 class ModelPredictor:
@@ -39,44 +19,62 @@ class ModelPredictor:
         model_dir: str,
         device: str,
         autoload: bool = True,
+        prefer_quantized: bool = True,
+        vocab_index: bool = False,
     ):
         self.store = ArtifactStore(model_dir=model_dir)
         self.device = device
+        self.prefer_quantized = prefer_quantized
+        self.vocab_index = vocab_index
         self.model: TextClassifier | None = None  # type: ignore
         self.vocab = None
+        self.encoder: FastEncoder | None = None
         self.labels: list[str] = []
+        self.temperature = 1.0
         self.device_obj = None
+        self.version: str | None = None
         if autoload:
             self.reload()
 
     def reload(self) -> None:
+        # веса, словарь и температура из одной версии артефактов
+        store = self.store.resolve()
         loaded_model, vocab, labels, _, device_obj = (
-            self.store.load_predictor_bundle(self.device)
+            store.load_predictor_bundle(
+                self.device,
+                prefer_quantized=self.prefer_quantized,
+                vocab_index=self.vocab_index,
+            )
         )
         self.model = loaded_model
         self.vocab = vocab
+        self.encoder = FastEncoder(vocab)
         self.labels = labels
+        self.temperature = store.load_temperature()
         self.device_obj = device_obj
+        self.version = store.artifact_version()
 
     def _require_loaded(self) -> None:
         if (
             self.model is None
             or self.vocab is None
+            or self.encoder is None
             or self.device_obj is None
         ):
             raise RuntimeError(
                 "Model is not loaded. Call reload() first."
             )
 
-    def predict_raw(
+    def predict_probabilities(
         self,
         inputs: list[PredictionInput],
-    ) -> list[dict[str, Any]]:
+    ) -> torch.Tensor:
         if not inputs:
             raise ValueError("Provide at least one input model.")
 
         self._require_loaded()
         self.model: TextClassifier
+        self.encoder: FastEncoder
 
         texts: list[str] = []
         for index, item in enumerate(inputs):
@@ -87,30 +85,37 @@ class ModelPredictor:
                 )
             texts.append(normalized)
 
-        input_ids, offsets = _encode_texts(
-            texts=texts, vocab=self.vocab
-        )
+        input_ids, offsets = self.encoder.encode_batch(texts)
         input_ids = input_ids.to(self.device_obj)
         offsets = offsets.to(self.device_obj)
 
         with torch.inference_mode():
             logits = self.model(input_ids, offsets)
-            probs = torch.softmax(logits, dim=-1).cpu().tolist()
+            # температура из калибровки на валидации
+            if self.temperature != 1.0:
+                logits = logits / self.temperature
+            return torch.softmax(logits, dim=-1).cpu()
+
+    def predict_raw(
+        self,
+        inputs: list[PredictionInput],
+    ) -> list[dict[str, Any]]:
+        probs = self.predict_probabilities(inputs)
+        best_values, best_indices = probs.max(dim=-1)
 
         results: list[dict[str, Any]] = []
-        for input_, row in zip(inputs, probs):
-            best_index = int(
-                max(range(len(row)), key=lambda idx: row[idx])
-            )
+        for input_, row, best_index, best_value in zip(
+            inputs,
+            probs.tolist(),
+            best_indices.tolist(),
+            best_values.tolist(),
+        ):
             results.append(
                 {
                     "news_id": input_.news_id,
                     "category": self.labels[best_index],
-                    "confidence": float(row[best_index]),
-                    "probabilities": {
-                        self.labels[index]: float(row[index])
-                        for index in range(len(self.labels))
-                    },
+                    "confidence": float(best_value),
+                    "probabilities": dict(zip(self.labels, row)),
                 }
             )
         return results
@@ -123,14 +128,13 @@ class ModelPredictor:
         allowed_labels: set[str] | None = None,
         include_probabilities: bool = False,
     ) -> PredictionResult:
-        raw = self.predict_raw([payload])[0]
-        return self.filter_prediction(
-            raw=raw,
-            allowed_labels=allowed_labels,
+        return self.predict_many(
+            payloads=[payload],
             top_k=top_k,
             min_confidence=min_confidence,
+            allowed_labels=allowed_labels,
             include_probabilities=include_probabilities,
-        )
+        )[0]
 
     def predict_many(
         self,
@@ -140,18 +144,135 @@ class ModelPredictor:
         allowed_labels: set[str] | None = None,
         include_probabilities: bool = False,
     ) -> list[PredictionResult]:
-        raw_results = self.predict_raw(payloads)
-        return [
-            self.filter_prediction(
-                raw=raw,
-                allowed_labels=allowed_labels,
-                top_k=top_k,
-                min_confidence=min_confidence,
-                include_probabilities=include_probabilities,
-            )
-            for raw in raw_results
+        probs = self.predict_probabilities(payloads)
+        return self.filter_batch(
+            probs=probs,
+            allowed_labels=allowed_labels,
+            top_k=top_k,
+            min_confidence=min_confidence,
+            include_probabilities=include_probabilities,
+        )
+
+    def filter_batch(
+        self,
+        probs: torch.Tensor,
+        allowed_labels: set[str] | None,
+        top_k: int,
+        min_confidence: float | None,
+        include_probabilities: bool = False,
+    ) -> list[PredictionResult]:
+        """
+        Векторный аналог filter_prediction для матрицы вероятностей
+        [batch, classes]: маскирование меток, перенормировка, top-k
+        и порог считаются тензорными операциями над всем батчем.
+        """
+        raw_categories = [
+            self.labels[index]
+            for index in probs.argmax(dim=-1).tolist()
         ]
 
+        labels = self.labels
+        if allowed_labels is not None:
+            columns = [
+                index
+                for index, label in enumerate(self.labels)
+                if label in allowed_labels
+            ]
+            labels = [self.labels[index] for index in columns]
+            probs = probs.index_select(
+                1, torch.tensor(columns, dtype=torch.long)
+            )
+
+        if not labels:
+            return [
+                PredictionResult(
+                    category=None,
+                    confidence=0.0,
+                    top_k=[],
+                    raw_category=raw_category,
+                    reason="no_allowed_labels",
+                    probabilities={}
+                    if include_probabilities
+                    else None,
+                )
+                for raw_category in raw_categories
+            ]
+
+        totals = probs.sum(dim=-1, keepdim=True)
+        normalized = probs / totals.clamp_min(1e-12)
+        safe_top_k = min(max(int(top_k), 1), len(labels))
+        top_values, top_indices = torch.topk(
+            normalized, safe_top_k, dim=-1
+        )
+
+        threshold = None
+        if min_confidence is not None:
+            threshold = min(max(float(min_confidence), 0.0), 1.0)
+        accepted = (
+            top_values[:, 0] >= threshold
+            if threshold is not None
+            else torch.ones(top_values.shape[0], dtype=torch.bool)
+        )
+
+        # в Python-объекты переводим только на границе ответа
+        rows = zip(
+            raw_categories,
+            (totals.squeeze(-1) <= 0).tolist(),
+            accepted.tolist(),
+            top_values.tolist(),
+            top_indices.tolist(),
+            normalized.tolist()
+            if include_probabilities
+            else [None] * len(raw_categories),
+        )
+        results: list[PredictionResult] = []
+        for (
+            raw_category,
+            is_zero,
+            is_accepted,
+            values,
+            indices,
+            row,
+        ) in rows:
+            if is_zero:
+                results.append(
+                    PredictionResult(
+                        category=None,
+                        confidence=0.0,
+                        top_k=[],
+                        raw_category=raw_category,
+                        reason="zero_probability",
+                        probabilities={}
+                        if include_probabilities
+                        else None,
+                    )
+                )
+                continue
+
+            results.append(
+                PredictionResult(
+                    category=labels[indices[0]]
+                    if is_accepted
+                    else None,
+                    confidence=float(values[0]),
+                    top_k=[
+                        TopPrediction(
+                            category=labels[index],
+                            confidence=float(value),
+                        )
+                        for index, value in zip(indices, values)
+                    ],
+                    raw_category=raw_category,
+                    reason=None
+                    if is_accepted
+                    else "low_confidence",
+                    probabilities=dict(zip(labels, row))
+                    if row is not None
+                    else None,
+                )
+            )
+        return results
+
     @staticmethod
     def filter_prediction(
         raw: dict[str, Any],
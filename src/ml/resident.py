@@ -0,0 +1,156 @@
+import logging
+import threading
+import time
+
+from src.config import settings
+from src.ml.artifacts import ArtifactStore
+from src.ml.prediction import ModelPredictor
+from src.schemas.ml import PredictionInput, PredictionResult
+
+logger = logging.getLogger("src.ml.resident")
+
+
+class ResidentPredictor:
+    """
+    Держит загруженную модель в памяти процесса и подменяет её,
+    когда в каталоге артефактов появляется новая версия.
+
+    Новая модель загружается целиком в отдельный ModelPredictor и
+    только потом подставляется одной операцией присваивания, поэтому
+    уже начатые предсказания дорабатывают на старой модели.
+    """
+
+    def __init__(
+        self,
+        model_dir: str,
+        device: str,
+        check_interval: float = 30.0,
+        prefer_quantized: bool = True,
+        vocab_index: bool = False,
+    ):
+        self.store = ArtifactStore(model_dir=model_dir)
+        self.device = device
+        self.prefer_quantized = prefer_quantized
+        self.vocab_index = vocab_index
+        self.check_interval = check_interval
+        self._active: tuple[str, ModelPredictor] | None = None
+        self._lock = threading.Lock()
+        self._next_check = 0.0
+
+    @property
+    def version(self) -> str | None:
+        active = self._active
+        return active[0] if active else None
+
+    def refresh(self, force: bool = False) -> bool:
+        now = time.monotonic()
+        if (
+            not force
+            and self._active is not None
+            and now < self._next_check
+        ):
+            return False
+
+        # пока модель уже есть, не ждём чужую перезагрузку
+        if not self._lock.acquire(blocking=self._active is None):
+            return False
+        try:
+            self._next_check = now + self.check_interval
+            version = self.store.artifact_version()
+            if version is None:
+                if self._active is None:
+                    raise FileNotFoundError(
+                        f"Model artifacts are missing in {self.store.model_dir}"
+                    )
+                return False
+            if self._active and self._active[0] == version:
+                return False
+
+            started = time.perf_counter()
+            predictor = ModelPredictor(
+                model_dir=self.store.model_dir,
+                device=self.device,
+                prefer_quantized=self.prefer_quantized,
+                vocab_index=self.vocab_index,
+            )
+            previous = self.version
+            # пока шла загрузка, могли опубликовать ещё одну версию
+            version = predictor.version or version
+            self._active = (version, predictor)
+            logger.info(
+                "Loaded model version %s (previous: %s) in %.2fs",
+                version,
+                previous,
+                time.perf_counter() - started,
+            )
+            return True
+        finally:
+            self._lock.release()
+
+    def get(self) -> ModelPredictor:
+        try:
+            self.refresh()
+        except Exception as exc:
+            if self._active is None:
+                raise
+            logger.warning(
+                "Failed to reload model, keeping version %s: %s",
+                self.version,
+                exc,
+            )
+        return self._active[1]  # type: ignore[index]
+
+    def predict(
+        self,
+        payload: PredictionInput,
+        top_k: int = 3,
+        min_confidence: float | None = None,
+        allowed_labels: set[str] | None = None,
+        include_probabilities: bool = False,
+    ) -> PredictionResult:
+        return self.get().predict(
+            payload=payload,
+            top_k=top_k,
+            min_confidence=min_confidence,
+            allowed_labels=allowed_labels,
+            include_probabilities=include_probabilities,
+        )
+
+    def predict_many(
+        self,
+        payloads: list[PredictionInput],
+        top_k: int = 3,
+        min_confidence: float | None = None,
+        allowed_labels: set[str] | None = None,
+        include_probabilities: bool = False,
+    ) -> list[PredictionResult]:
+        return self.get().predict_many(
+            payloads=payloads,
+            top_k=top_k,
+            min_confidence=min_confidence,
+            allowed_labels=allowed_labels,
+            include_probabilities=include_probabilities,
+        )
+
+
+_resident: ResidentPredictor | None = None
+_resident_lock = threading.Lock()
+
+
+def get_resident_predictor() -> ResidentPredictor:
+    global _resident
+    if _resident is None:
+        with _resident_lock:
+            if _resident is None:
+                _resident = ResidentPredictor(
+                    model_dir=settings.model_dir,
+                    device=settings.DEVICE,
+                    check_interval=(
+                        settings.ML_MODEL_RELOAD_CHECK_SEC
+                    ),
+                    prefer_quantized=(
+                        settings.ML_PREFER_QUANTIZED_MODEL
+                    ),
+                    vocab_index=settings.ML_VOCAB_IN_MEMORY_INDEX,
+                )
+    return _resident
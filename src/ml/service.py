@@ -1,6 +1,8 @@
-from pathlib import Path
+import os
+from typing import Callable
 
 from src.config import settings
+from src.ml.artifacts import ArtifactStore
 from src.ml.prediction import ModelPredictor
 from src.schemas.ml import (
     PredictionInput,
@@ -31,14 +33,21 @@ class NewsClassifierService:
 
     @staticmethod
     def model_exists() -> bool:
-        model_dir = Path(settings.model_dir)
+        store = ArtifactStore(
+            model_dir=settings.model_dir
+        ).resolve()
         required = (
-            "model.pt",
-            "vocab.json",
-            "labels.json",
-            "config.json",
+            store.model_path,
+            store.labels_path,
+            store.config_path,
+        )
+        # vocab.json остался у артефактов старого формата
+        has_vocab = os.path.exists(
+            store.vocab_bin_path
+        ) or os.path.exists(store.vocab_path)
+        return has_vocab and all(
+            os.path.exists(path) for path in required
         )
-        return all((model_dir / name).exists() for name in required)
 
     def train(
         self,
@@ -47,12 +56,14 @@ class NewsClassifierService:
         resume: bool = False,
         reload_model: bool = True,
         verbose: bool = True,
+        on_epoch_end: Callable[[dict], None] | None = None,
     ) -> TrainingResult:
         result = self.trainer.train(
             samples=samples,
             config=config,
             resume=resume,
             verbose=verbose,
+            on_epoch_end=on_epoch_end,
         )
         if reload_model:
             self.predictor.reload()
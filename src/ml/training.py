@@ -1,71 +1,199 @@
 import logging
+import multiprocessing
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
 
+import numpy as np
 import torch
 from torch import nn
-from torch.utils.data import DataLoader, Dataset
+from torch.utils.data import (
+    BatchSampler,
+    DataLoader,
+    Dataset,
+    RandomSampler,
+    Sampler,
+    SequentialSampler,
+)
 
 from src.ml.artifacts import ArtifactStore
+from src.ml.calibration import collect_logits, fit_temperature
+from src.ml.corpus import EncodedCorpus, load_or_build_corpus
+from src.ml.export import export_quantized
 from src.ml.io_utils import resolve_device, seed_everything
 from src.ml.network import TextClassifier
 from src.schemas.ml import TrainConfig, TrainingSample, TrainingResult
-from src.ml.text import normalize_training_sample, tokenize
+from src.ml.text import normalize_training_sample
 from src.ml.vocab import (
-    Vocab,
     build_label_map,
     build_vocab,
-    split_samples,
+    split_indices,
 )
 
 logger = logging.getLogger(__file__)
 
 
-class _TextDataset(Dataset):
+class _CorpusDataset(Dataset):
+    """
+    Подмножество закодированного корпуса. Индексируется сразу
+    списком номеров от BatchSampler и отдаёт готовый батч.
+    """
+
+    def __init__(self, corpus: EncodedCorpus, indices: list[int]):
+        self._corpus = corpus
+        self._indices = np.asarray(indices, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self._indices)
+
+    def lengths(self) -> np.ndarray:
+        offsets = self._corpus.offsets
+        return offsets[self._indices + 1] - offsets[self._indices]
+
+    def __getitem__(self, positions: list[int]):
+        input_ids, offsets, labels = self._corpus.gather(
+            self._indices[positions]
+        )
+        return (
+            torch.from_numpy(input_ids),
+            torch.from_numpy(offsets),
+            torch.from_numpy(labels),
+        )
+
+
+class _BucketBatchSampler(Sampler[list[int]]):
+    """
+    Перемешивает примеры, режет их на пулы по pool_batches батчей,
+    внутри пула сортирует по длине и раздаёт батчи в случайном
+    порядке. Батчи получаются из текстов близкой длины, а порядок
+    эпохи остаётся случайным.
+    """
+
     def __init__(
         self,
-        samples: list[tuple[str, str]],
-        vocab: Vocab,
-        label_to_idx: dict[str, int],
+        lengths: np.ndarray,
+        batch_size: int,
+        pool_batches: int = 50,
     ):
-        self._samples = samples
-        self._vocab = vocab
-        self._label_to_idx = label_to_idx
+        self._lengths = lengths
+        self._batch_size = batch_size
+        self._pool_size = batch_size * pool_batches
 
     def __len__(self) -> int:
-        return len(self._samples)
-
-    def __getitem__(self, index: int):
-        text, label = self._samples[index]
-        token_ids = self._vocab.encode(tokenize(text))
-        if not token_ids:
-            token_ids = [self._vocab.unk_idx]
-        return token_ids, self._label_to_idx[label]
-
-
-def _collate_batch(batch):
-    input_ids: list[int] = []
-    offsets: list[int] = []
-    labels: list[int] = []
-    offset = 0
-    for token_ids, label in batch:
-        offsets.append(offset)
-        input_ids.extend(token_ids)
-        offset += len(token_ids)
-        labels.append(label)
-
-    return (
-        torch.tensor(input_ids, dtype=torch.long),
-        torch.tensor(offsets, dtype=torch.long),
-        torch.tensor(labels, dtype=torch.long),
+        return -(-len(self._lengths) // self._batch_size)
+
+    def __iter__(self) -> Iterator[list[int]]:
+        order = torch.randperm(len(self._lengths)).numpy()
+        batches: list[list[int]] = []
+        for start in range(0, len(order), self._pool_size):
+            pool = order[start : start + self._pool_size]
+            pool = pool[
+                np.argsort(self._lengths[pool], kind="stable")
+            ]
+            batches.extend(
+                pool[idx : idx + self._batch_size].tolist()
+                for idx in range(0, len(pool), self._batch_size)
+            )
+        for index in torch.randperm(len(batches)).tolist():
+            yield batches[index]
+
+
+def _resolve_workers(config: TrainConfig) -> int:
+    if config.num_workers <= 0:
+        return 0
+    # дочерний процесс Celery (prefork) демонический и не может
+    # запускать свои процессы
+    if multiprocessing.current_process().daemon:
+        logger.warning(
+            "DataLoader workers are not available in a daemon "
+            "process, loading batches in the main process"
+        )
+        return 0
+    return config.num_workers
+
+
+def _make_loader(
+    dataset: _CorpusDataset,
+    config: TrainConfig,
+    shuffle: bool,
+    device: torch.device,
+) -> DataLoader:
+    batch_sampler: Sampler[list[int]]
+    if shuffle and config.bucket_by_length:
+        batch_sampler = _BucketBatchSampler(
+            dataset.lengths(), batch_size=config.batch_size
+        )
+    else:
+        batch_sampler = BatchSampler(
+            RandomSampler(dataset)
+            if shuffle
+            else SequentialSampler(dataset),
+            batch_size=config.batch_size,
+            drop_last=False,
+        )
+    num_workers = _resolve_workers(config)
+    return DataLoader(
+        dataset,
+        sampler=batch_sampler,
+        batch_size=None,
+        num_workers=num_workers,
+        persistent_workers=num_workers > 0
+        and config.persistent_workers,
+        pin_memory=device.type == "cuda",
     )
 
 
+def _make_scheduler(
+    optimizer: torch.optim.Optimizer,
+    config: TrainConfig,
+    has_val: bool,
+):
+    if config.lr_schedule == "cosine":
+        return torch.optim.lr_scheduler.CosineAnnealingLR(
+            optimizer, T_max=max(config.epochs, 1)
+        )
+    if config.lr_schedule == "plateau" and has_val:
+        return torch.optim.lr_scheduler.ReduceLROnPlateau(
+            optimizer, mode="max", factor=0.5, patience=1
+        )
+    return None
+
+
+def _step_scheduler(scheduler, val_acc: float | None) -> None:
+    if scheduler is None:
+        return
+    if isinstance(
+        scheduler, torch.optim.lr_scheduler.ReduceLROnPlateau
+    ):
+        scheduler.step(val_acc)
+    else:
+        scheduler.step()
+
+
+def _clone_state(model: nn.Module) -> dict[str, torch.Tensor]:
+    return {
+        name: tensor.detach().clone()
+        for name, tensor in model.state_dict().items()
+    }
+
+
+@contextmanager
+def _torch_threads(num_threads: int) -> Iterator[None]:
+    # процесс воркера общий, после обучения возвращаем как было
+    previous = torch.get_num_threads()
+    if num_threads > 0:
+        torch.set_num_threads(num_threads)
+    try:
+        yield
+    finally:
+        torch.set_num_threads(previous)
+
+
 def _compute_class_weights(
-    samples: list[tuple[str, str]],
-    label_to_idx: dict[str, int],
+    labels: np.ndarray,
+    num_classes: int,
 ) -> torch.Tensor:
-    counts = [0 for _ in range(len(label_to_idx))]
-    for _, label in samples:
-        counts[label_to_idx[label]] += 1
+    counts = np.bincount(labels, minlength=num_classes).tolist()
     total = sum(counts)
     weights = [total / max(count, 1) for count in counts]
     norm = sum(weights) / max(len(weights), 1)
@@ -150,12 +278,34 @@ class ModelTrainer:
         resume: bool = False,
         config: TrainConfig | None = None,
         verbose: bool = True,
+        on_epoch_end: Callable[[dict], None] | None = None,
+    ) -> TrainingResult:
+        """
+        on_epoch_end получает сводку каждой эпохи (номер, loss,
+        accuracy, lr, время) сразу после её завершения.
+        """
+        active_config = config or TrainConfig()
+        with _torch_threads(active_config.num_threads):
+            return self._train(
+                samples=samples,
+                resume=resume,
+                active_config=active_config,
+                verbose=verbose,
+                on_epoch_end=on_epoch_end,
+            )
+
+    def _train(
+        self,
+        samples: list[TrainingSample],
+        resume: bool,
+        active_config: TrainConfig,
+        verbose: bool,
+        on_epoch_end: Callable[[dict], None] | None = None,
     ) -> TrainingResult:
         normalized_samples = _normalize_samples(samples)
         if not normalized_samples:
             raise ValueError("No training samples found.")
 
-        active_config = config or TrainConfig()
         seed_everything(active_config.seed)
         device_obj = resolve_device(self.device)
 
@@ -192,27 +342,34 @@ class ModelTrainer:
             )
             state = None
 
-        train_samples, val_samples = split_samples(
-            samples=normalized_samples,
+        train_indices, val_indices = split_indices(
+            size=len(normalized_samples),
             val_split=active_config.val_split,
             seed=active_config.seed,
         )
-        if not train_samples:
+        if not train_indices:
             raise ValueError(
                 "Train split is empty. Decrease val_split."
             )
 
-        train_loader = DataLoader(
-            _TextDataset(train_samples, vocab, label_to_idx),
-            batch_size=active_config.batch_size,
+        # корпус кодируется один раз, эпохи берут из него срезы
+        corpus = load_or_build_corpus(
+            cache_dir=self.store.corpus_cache_dir,
+            samples=normalized_samples,
+            vocab=vocab,
+            label_to_idx=label_to_idx,
+        )
+        train_loader = _make_loader(
+            _CorpusDataset(corpus, train_indices),
+            config=active_config,
             shuffle=True,
-            collate_fn=_collate_batch,
+            device=device_obj,
         )
-        val_loader = DataLoader(
-            _TextDataset(val_samples, vocab, label_to_idx),
-            batch_size=active_config.batch_size,
+        val_loader = _make_loader(
+            _CorpusDataset(corpus, val_indices),
+            config=active_config,
             shuffle=False,
-            collate_fn=_collate_batch,
+            device=device_obj,
         )
 
         model = TextClassifier(
@@ -227,7 +384,7 @@ class ModelTrainer:
 
         if active_config.balance:
             weights = _compute_class_weights(
-                train_samples, label_to_idx
+                corpus.labels[train_indices], len(labels)
             ).to(device_obj)
             loss_fn = nn.CrossEntropyLoss(weight=weights)
         else:
@@ -239,14 +396,25 @@ class ModelTrainer:
             weight_decay=active_config.weight_decay,
         )
 
-        metrics: dict[str, list[dict[str, float]]] = {
+        scheduler = _make_scheduler(
+            optimizer,
+            config=active_config,
+            has_val=bool(val_indices),
+        )
+
+        metrics: dict[str, Any] = {
             "train": [],
             "val": [],
         }
         best_val_acc = -1.0
-        saved = False
+        best_epoch = 0
+        best_state: dict[str, torch.Tensor] | None = None
+        stale_epochs = 0
 
         for epoch in range(1, active_config.epochs + 1):
+            started = time.perf_counter()
+            lr = optimizer.param_groups[0]["lr"]
+            val_acc: float | None = None
             train_loss, train_acc = _train_epoch(
                 model=model,
                 loader=train_loader,
@@ -259,10 +427,11 @@ class ModelTrainer:
                     "epoch": epoch,
                     "loss": train_loss,
                     "accuracy": train_acc,
+                    "lr": lr,
                 }
             )
 
-            if val_samples:
+            if val_indices:
                 val_loss, val_acc = _evaluate(
                     model=model,
                     loader=val_loader,
@@ -276,43 +445,130 @@ class ModelTrainer:
                         "accuracy": val_acc,
                     }
                 )
-                if verbose:
+                # лучшее состояние держим в памяти, на диск пишем
+                # один раз после обучения
+                if val_acc > best_val_acc + active_config.min_delta:
+                    best_val_acc = val_acc
+                    best_epoch = epoch
+                    best_state = _clone_state(model)
+                    stale_epochs = 0
+                else:
+                    stale_epochs += 1
+            else:
+                best_epoch = epoch
+
+            _step_scheduler(scheduler, val_acc)
+            seconds = time.perf_counter() - started
+            metrics["train"][-1]["seconds"] = seconds
+            if on_epoch_end is not None:
+                on_epoch_end(
+                    {
+                        **metrics["train"][-1],
+                        "epochs": active_config.epochs,
+                        "val": metrics["val"][-1]
+                        if val_indices
+                        else None,
+                        "best_epoch": best_epoch,
+                    }
+                )
+
+            if verbose:
+                if val_indices:
                     logger.info(
-                        "Epoch %d: train_loss=%f train_acc=%f val_loss=%f val_acc=%f",
+                        "Epoch %d (%.2fs, lr=%g): train_loss=%f "
+                        "train_acc=%f val_loss=%f val_acc=%f",
                         epoch,
+                        seconds,
+                        lr,
                         train_loss,
                         train_acc,
                         val_loss,
                         val_acc,
                     )
-                if val_acc >= best_val_acc:
-                    best_val_acc = val_acc
-                    self.store.save_model_state(model)
-                    saved = True
-            else:
-                if verbose:
+                else:
                     logger.info(
-                        "Epoch %d: train_loss=%f train_acc=%f",
+                        "Epoch %d (%.2fs, lr=%g): train_loss=%f "
+                        "train_acc=%f",
                         epoch,
+                        seconds,
+                        lr,
                         train_loss,
                         train_acc,
                     )
-                self.store.save_model_state(model)
-                saved = True
 
-        if not saved:
-            self.store.save_model_state(model)
+            if (
+                active_config.patience > 0
+                and stale_epochs >= active_config.patience
+            ):
+                if verbose:
+                    logger.info(
+                        "Early stopping at epoch %d, best epoch %d",
+                        epoch,
+                        best_epoch,
+                    )
+                break
+
+        metrics["best_epoch"] = best_epoch
+        metrics["epochs_run"] = len(metrics["train"])
+        if best_state is not None:
+            model.load_state_dict(best_state)
+        model.eval()
+
+        metrics["temperature"] = 1.0
+        if active_config.calibrate and val_indices:
+            temperature, nll_before, nll_after = fit_temperature(
+                *collect_logits(model, val_loader, device_obj)
+            )
+            metrics["temperature"] = temperature
+            metrics["calibration"] = {
+                "nll_before": nll_before,
+                "nll_after": nll_after,
+            }
+            if verbose:
+                logger.info(
+                    "Calibrated temperature %.3f: val_nll %f -> %f",
+                    temperature,
+                    nll_before,
+                    nll_after,
+                )
+        # новая версия пишется в свой каталог и видна читателям
+        # только после publish
+        staged = self.store.stage()
+        staged.save_model_state(model)
+
+        if active_config.export_quantized:
+            probe_indices = (val_indices or train_indices)[:1024]
+            probe_ids, probe_offsets, _ = _CorpusDataset(
+                corpus, probe_indices
+            )[list(range(len(probe_indices)))]
+            exported = export_quantized(
+                model=model,
+                path=staged.quantized_model_path,
+                probe=(probe_ids, probe_offsets),
+            )
+            if verbose and exported:
+                logger.info(
+                    "Exported quantized model to %s",
+                    staged.quantized_model_path,
+                )
 
-        self.store.save_metadata(
+        staged.save_metadata(
             vocab=vocab,
             labels=labels,
             config=active_config,
             metrics=metrics,
         )
+        staged.save_validation(
+            [normalized_samples[index] for index in val_indices]
+        )
+        staged.save_mmap_bundle(model=model)
+        version = self.store.publish(staged)
 
         if verbose:
             logger.info(
-                "Saved model artifacts to %s", self.store.model_dir
+                "Saved model artifacts to %s (version %s)",
+                staged.artifact_dir,
+                version,
             )
 
         return TrainingResult(
@@ -1,6 +1,14 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import zlib
 from collections import Counter
+from itertools import repeat
 from typing import Dict, Iterable, Sequence
 
+import numpy as np
 import torch
 
 from src.ml.text import tokenize
@@ -14,12 +22,34 @@ class Vocab:
         self.unk_token = unk_token
         self.unk_idx = token_to_idx[unk_token]
 
+    def __len__(self) -> int:
+        return len(self.token_to_idx)
+
     def encode(self, tokens: Sequence[str]) -> list[int]:
         return [
             self.token_to_idx.get(token, self.unk_idx)
             for token in tokens
         ]
 
+    def encode_array(self, tokens: Sequence[str]) -> np.ndarray:
+        return np.fromiter(
+            map(
+                self.token_to_idx.get,
+                tokens,
+                repeat(self.unk_idx, len(tokens)),
+            ),
+            dtype=np.int64,
+            count=len(tokens),
+        )
+
+    def digest(self) -> str:
+        payload = json.dumps(
+            self.to_dict(),
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
     def to_dict(self) -> dict[str, object]:
         return {
             "token_to_idx": self.token_to_idx,
@@ -31,6 +61,232 @@ class Vocab:
         return cls(payload["token_to_idx"], payload["unk_token"])  # type: ignore
 
 
+VOCAB_MAGIC = b"FFVOCAB1"
+# magic, число токенов, размер хэш-таблицы, unk_idx, размер blob
+_HEADER = struct.Struct("<8sIIII")
+
+
+class BinaryVocab:
+    """
+    Словарь только для чтения поверх vocab.bin, отображённого в
+    память.
+
+    Формат: заголовок, offsets uint32[n + 1] в blob UTF-8 токенов
+    (id токена это его номер), хэш-таблица int32 с открытой
+    адресацией по crc32 и сам blob. Загрузка это один mmap без
+    разбора JSON, все процессы делят одни страницы словаря.
+
+    encode_array ищет весь список токенов в таблице векторно:
+    один шаг пробы для всех токенов сразу, поэтому словарь
+    выгоднее кодировать крупными списками (FastEncoder отдаёт
+    сюда токены всего батча). С in_memory_index поиск идёт по
+    dict в памяти процесса, см. ML_VOCAB_IN_MEMORY_INDEX.
+    """
+
+    def __init__(self, buffer):
+        magic, count, table_size, unk_idx, blob_size = (
+            _HEADER.unpack_from(buffer, 0)
+        )
+        if magic != VOCAB_MAGIC:
+            raise ValueError("Unknown binary vocab format.")
+
+        view = memoryview(buffer)
+        position = _HEADER.size
+        self._offsets = view[
+            position : position + 4 * (count + 1)
+        ].cast("I")
+        self._offsets_array = np.frombuffer(
+            buffer, dtype="<u4", count=count + 1, offset=position
+        )
+        position += 4 * (count + 1)
+        self._table = view[
+            position : position + 4 * table_size
+        ].cast("i")
+        self._table_array = np.frombuffer(
+            buffer, dtype="<i4", count=table_size, offset=position
+        )
+        position += 4 * table_size
+        self._blob = view[position : position + blob_size]
+        self._blob_array = np.frombuffer(
+            buffer, dtype=np.uint8, count=blob_size, offset=position
+        )
+        self._buffer = buffer
+        self._count = count
+        self._mask = table_size - 1
+        self._index: dict[str, int] | None = None
+        self.unk_idx = unk_idx
+        self.unk_token = self.token(unk_idx)
+
+    @classmethod
+    def open(
+        cls, path: str, in_memory_index: bool = False
+    ) -> "BinaryVocab":
+        with open(path, "rb") as file:
+            buffer = mmap.mmap(
+                file.fileno(), 0, access=mmap.ACCESS_READ
+            )
+        vocab = cls(buffer)
+        if in_memory_index:
+            vocab._index = vocab.to_vocab().token_to_idx
+        return vocab
+
+    def __len__(self) -> int:
+        return self._count
+
+    def token(self, index: int) -> str:
+        start, end = self._offsets[index], self._offsets[index + 1]
+        return bytes(self._blob[start:end]).decode("utf-8")
+
+    def lookup(self, token: str) -> int:
+        raw = token.encode("utf-8")
+        slot = zlib.crc32(raw) & self._mask
+        while True:
+            index = self._table[slot]
+            if index < 0:
+                return self.unk_idx
+            if (
+                self._blob[
+                    self._offsets[index] : self._offsets[index + 1]
+                ]
+                == raw
+            ):
+                return index
+            slot = (slot + 1) & self._mask
+
+    def encode(self, tokens: Sequence[str]) -> list[int]:
+        return self.encode_array(tokens).tolist()
+
+    def encode_array(self, tokens: Sequence[str]) -> np.ndarray:
+        count = len(tokens)
+        if self._index is not None:
+            return np.fromiter(
+                map(self._index.get, tokens, repeat(self.unk_idx)),
+                dtype=np.int64,
+                count=count,
+            )
+
+        ids = np.full(count, self.unk_idx, dtype=np.int64)
+        if not count:
+            return ids
+
+        raw = list(map(str.encode, tokens))
+        query = np.frombuffer(b"".join(raw), dtype=np.uint8)
+        lengths = np.fromiter(
+            map(len, raw), dtype=np.int64, count=count
+        )
+        starts = np.zeros(count, dtype=np.int64)
+        np.cumsum(lengths[:-1], out=starts[1:])
+        slots = np.fromiter(
+            map(zlib.crc32, raw), dtype=np.int64, count=count
+        )
+        slots &= self._mask
+
+        # на каждом шаге пробы остаются токены, чей слот занят
+        # другим токеном; при заполненности до 50% шагов мало
+        pending = np.arange(count)
+        while pending.size:
+            found = self._table_array[slots[pending]].astype(
+                np.int64
+            )
+            occupied = found >= 0
+            pending, found = pending[occupied], found[occupied]
+            matched = self._matches(
+                found, query, starts[pending], lengths[pending]
+            )
+            ids[pending[matched]] = found[matched]
+            pending = pending[~matched]
+            slots[pending] = (slots[pending] + 1) & self._mask
+        return ids
+
+    def _matches(
+        self,
+        found: np.ndarray,
+        query: np.ndarray,
+        starts: np.ndarray,
+        lengths: np.ndarray,
+    ) -> np.ndarray:
+        """Побайтно сравнивает токены запроса с кандидатами."""
+        candidate_starts = self._offsets_array[found].astype(
+            np.int64
+        )
+        matched = (
+            self._offsets_array[found + 1] - candidate_starts
+            == lengths
+        )
+        same = np.flatnonzero(matched & (lengths > 0))
+        if not same.size:
+            return matched
+
+        sizes = lengths[same]
+        bounds = np.cumsum(sizes) - sizes
+        # номер байта внутри своего токена
+        within = np.arange(int(sizes.sum())) - np.repeat(
+            bounds, sizes
+        )
+        equal = (
+            self._blob_array[
+                np.repeat(candidate_starts[same], sizes) + within
+            ]
+            == query[np.repeat(starts[same], sizes) + within]
+        )
+        matched[same] = np.logical_and.reduceat(equal, bounds)
+        return matched
+
+    def to_vocab(self) -> Vocab:
+        blob = bytes(self._blob)
+        offsets = self._offsets.tolist()
+        token_to_idx = {
+            blob[start:end].decode("utf-8"): index
+            for index, (start, end) in enumerate(
+                zip(offsets, offsets[1:])
+            )
+        }
+        return Vocab(token_to_idx, self.unk_token)
+
+
+def write_binary_vocab(vocab: Vocab, path: str) -> None:
+    ordered = sorted(
+        vocab.token_to_idx.items(), key=lambda item: item[1]
+    )
+    if [index for _, index in ordered] != list(range(len(ordered))):
+        raise ValueError("Vocab ids must be contiguous from zero.")
+
+    encoded = [token.encode("utf-8") for token, _ in ordered]
+    offsets = np.zeros(len(encoded) + 1, dtype="<u4")
+    offsets[1:] = np.cumsum(
+        np.fromiter(map(len, encoded), dtype=np.int64)
+    )
+
+    # заполненность таблицы не выше 50%, цепочки остаются короткими
+    table_size = 1
+    while table_size < 2 * len(encoded):
+        table_size <<= 1
+    table = np.full(table_size, -1, dtype="<i4")
+    mask = table_size - 1
+    for index, raw in enumerate(encoded):
+        slot = zlib.crc32(raw) & mask
+        while table[slot] >= 0:
+            slot = (slot + 1) & mask
+        table[slot] = index
+
+    blob = b"".join(encoded)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(
+            _HEADER.pack(
+                VOCAB_MAGIC,
+                len(encoded),
+                table_size,
+                vocab.unk_idx,
+                len(blob),
+            )
+        )
+        file.write(offsets.tobytes())
+        file.write(table.tobytes())
+        file.write(blob)
+    os.replace(tmp_path, path)
+
+
 def build_label_map(
     labels: Iterable[str],
 ) -> tuple[dict[str, int], list[str]]:
@@ -69,26 +325,38 @@ def build_vocab(
     return Vocab(token_to_idx=token_to_idx, unk_token=unk_token)
 
 
-def split_samples(
-    samples: Sequence[tuple[str, str]],
+def split_indices(
+    size: int,
     val_split: float,
     seed: int,
-) -> tuple[list[tuple[str, str]], list[tuple[str, str]]]:
+) -> tuple[list[int], list[int]]:
     if val_split <= 0:
-        return list(samples), []
+        return list(range(size)), []
 
     generator = torch.Generator().manual_seed(seed)
-    indices = torch.randperm(
-        len(samples), generator=generator
-    ).tolist()
-    val_size = int(len(samples) * val_split)
+    indices = torch.randperm(size, generator=generator).tolist()
+    val_size = int(size * val_split)
     val_indices = set(indices[:val_size])
 
-    train_samples: list[tuple[str, str]] = []
-    val_samples: list[tuple[str, str]] = []
-    for index, sample in enumerate(samples):
+    train_indices: list[int] = []
+    val_indices_ordered: list[int] = []
+    for index in range(size):
         if index in val_indices:
-            val_samples.append(sample)
+            val_indices_ordered.append(index)
         else:
-            train_samples.append(sample)
-    return train_samples, val_samples
+            train_indices.append(index)
+    return train_indices, val_indices_ordered
+
+
+def split_samples(
+    samples: Sequence[tuple[str, str]],
+    val_split: float,
+    seed: int,
+) -> tuple[list[tuple[str, str]], list[tuple[str, str]]]:
+    train_indices, val_indices = split_indices(
+        size=len(samples), val_split=val_split, seed=seed
+    )
+    return (
+        [samples[index] for index in train_indices],
+        [samples[index] for index in val_indices],
+    )
@@ -0,0 +1,182 @@
+"""
+Обучение в отдельном процессе. Задача Celery запускает
+
+    python -m src.ml.worker <job.json> [--cpus 0,1]
+
+и читает из stdout события в формате JSON Lines: "epoch" после
+каждой эпохи и "result" либо "error" в конце.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+from typing import Awaitable, Callable
+
+from src.config import BASE_DIR
+from src.ml.training import ModelTrainer
+from src.schemas.ml import (
+    TrainConfig,
+    TrainingResult,
+    TrainingSample,
+)
+
+logger = logging.getLogger("src.ml.worker")
+
+# число потоков BLAS/OpenMP читается при импорте torch, поэтому
+# задаётся окружением дочернего процесса
+THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+)
+
+
+def _emit(event: str, **payload) -> None:
+    sys.stdout.write(
+        json.dumps({"event": event, **payload}, ensure_ascii=False)
+        + "\n"
+    )
+    sys.stdout.flush()
+
+
+def main(args: argparse.Namespace) -> int:
+    logging.basicConfig(
+        level=logging.INFO,
+        stream=sys.stderr,
+        format="%(asctime)s %(name)s %(levelname)s %(message)s",
+    )
+    if args.cpus and hasattr(os, "sched_setaffinity"):
+        cpus = {int(cpu) for cpu in args.cpus.split(",")}
+        os.sched_setaffinity(0, cpus)
+        logger.info("Pinned training process to CPUs %s", cpus)
+
+    with open(args.job, encoding="utf-8") as file:
+        job = json.load(file)
+
+    try:
+        trainer = ModelTrainer(
+            model_dir=job["model_dir"], device=job["device"]
+        )
+        result = trainer.train(
+            samples=[
+                TrainingSample(**sample)
+                for sample in job["samples"]
+            ],
+            config=TrainConfig(**job["config"]),
+            resume=job["resume"],
+            on_epoch_end=lambda epoch: _emit("epoch", data=epoch),
+        )
+    except Exception as exc:
+        logger.exception("Training failed")
+        _emit("error", message=str(exc))
+        return 1
+    _emit("result", data=result.model_dump(mode="json"))
+    return 0
+
+
+async def run_training_process(
+    samples: list[TrainingSample],
+    config: TrainConfig,
+    resume: bool,
+    model_dir: str,
+    device: str,
+    on_epoch_end: Callable[[dict], Awaitable[None]] | None = None,
+    cpus: list[int] | None = None,
+    num_threads: int = 0,
+    timeout: float | None = None,
+) -> TrainingResult:
+    """
+    Запускает обучение в дочернем процессе и ждёт его, не занимая
+    event loop: прогресс эпох передаётся в on_epoch_end по мере
+    поступления.
+    """
+    with tempfile.NamedTemporaryFile(
+        "w", suffix=".json", delete=False, encoding="utf-8"
+    ) as job_file:
+        json.dump(
+            {
+                "model_dir": model_dir,
+                "device": device,
+                "config": config.model_dump(),
+                "resume": resume,
+                "samples": [
+                    sample.model_dump() for sample in samples
+                ],
+            },
+            job_file,
+            ensure_ascii=False,
+        )
+
+    env = os.environ.copy()
+    if num_threads > 0:
+        env.update(
+            {name: str(num_threads) for name in THREAD_ENV_VARS}
+        )
+    command = [sys.executable, "-m", "src.ml.worker", job_file.name]
+    if cpus:
+        command += ["--cpus", ",".join(map(str, cpus))]
+
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            stdout=asyncio.subprocess.PIPE,
+            env=env,
+            cwd=str(BASE_DIR),
+            limit=2**24,
+        )
+        try:
+            result, error = await asyncio.wait_for(
+                _read_events(process, on_epoch_end), timeout
+            )
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            process.kill()
+            await process.wait()
+            raise
+        returncode = await process.wait()
+    finally:
+        os.remove(job_file.name)
+
+    if result is None:
+        raise RuntimeError(
+            error
+            or f"Training process exited with code {returncode}"
+        )
+    return result
+
+
+async def _read_events(
+    process: asyncio.subprocess.Process,
+    on_epoch_end: Callable[[dict], Awaitable[None]] | None,
+) -> tuple[TrainingResult | None, str | None]:
+    result: TrainingResult | None = None
+    error: str | None = None
+    assert process.stdout is not None
+    async for line in process.stdout:
+        try:
+            event = json.loads(line)
+        except ValueError:
+            # посторонний вывод библиотек в stdout
+            continue
+        if not isinstance(event, dict):
+            continue
+        if event.get("event") == "epoch" and on_epoch_end:
+            try:
+                await on_epoch_end(event["data"])
+            except Exception as exc:
+                logger.warning("Failed to report progress: %s", exc)
+        elif event.get("event") == "result":
+            result = TrainingResult.model_validate(event["data"])
+        elif event.get("event") == "error":
+            error = event.get("message")
+    return result, error
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("job")
+    parser.add_argument("--cpus", default="")
+    sys.exit(main(parser.parse_args()))
@@ -15,6 +15,9 @@ class DatasetUploads(Base, PrimaryKeyMixin, TimingMixin):
     errors: Mapped[int] = mapped_column(
         default=0, server_default=text("0")
     )
+    duplicates: Mapped[int] = mapped_column(
+        default=0, server_default=text("0")
+    )
     is_completed: Mapped[bool] = mapped_column(
         default=False, server_default=text("false")
     )
@@ -32,6 +35,10 @@ class DatasetUploads(Base, PrimaryKeyMixin, TimingMixin):
             "errors >= 0",
             name="chk_dataset_uploads_positive_errors",
         ),
+        CheckConstraint(
+            "duplicates >= 0",
+            name="chk_dataset_uploads_positive_duplicates",
+        ),
     )
 
 
@@ -1,11 +1,13 @@
 from datetime import datetime
 
 from sqlalchemy import (
+    Computed,
     ForeignKey,
+    Index,
     String,
     Text, text, Boolean,
 )
-from sqlalchemy.dialects.postgresql import ENUM
+from sqlalchemy.dialects.postgresql import ENUM, JSON
 from sqlalchemy.orm import Mapped, mapped_column
 
 from src.models.base import Base
@@ -13,6 +15,14 @@ from src.models.mixins.primary_key import PrimaryKeyMixin
 from src.models.mixins.timing import TimingMixin
 from src.schemas.enums import NewsCategory
 
+# хэш нормализованного текста обучающего примера: регистр и пробелы
+# не различаются, так что повторная загрузка не плодит дубликаты
+DENORMALIZED_TEXT_HASH_SQL = (
+    "md5(lower(regexp_replace("
+    "trim(title || ' ' || coalesce(summary, '')), "
+    "'\\s+', ' ', 'g')))"
+)
+
 
 class News(Base, PrimaryKeyMixin, TimingMixin):
     __tablename__ = "news"  # type: ignore
@@ -39,6 +49,45 @@ class News(Base, PrimaryKeyMixin, TimingMixin):
         ),
         default=None,
     )
+    # уверенность модели в назначенной категории, NULL для ручной
+    category_confidence: Mapped[float | None] = mapped_column(
+        default=None
+    )
+    # top-k ответа модели {категория: вероятность}, в том числе
+    # для отказов ниже порога уверенности
+    category_top_k: Mapped[dict | None] = mapped_column(
+        JSON, default=None
+    )
+    # очередь классификации: попытки и версия модели, к которой
+    # они относятся, версия модели последнего прохода и время
+    # захвата строки воркером
+    classify_attempts: Mapped[int] = mapped_column(
+        default=0, server_default=text("0")
+    )
+    classify_attempted_with: Mapped[str | None] = mapped_column(
+        String(64), default=None
+    )
+    classified_with: Mapped[str | None] = mapped_column(
+        String(64), default=None
+    )
+    classify_claimed_at: Mapped[datetime | None] = mapped_column(
+        default=None
+    )
+
+    __table_args__ = (
+        Index("ix_news_created_at", "created_at"),
+        Index(
+            "ix_news_uncategorized",
+            "id",
+            postgresql_where=text("category IS NULL"),
+        ),
+        # text_pattern_ops нужен для LIKE 'prefix%' при любой
+        # локали базы
+        Index(
+            "ix_news_title_prefix",
+            text("lower(title) text_pattern_ops"),
+        ),
+    )
 
 
 class DenormalizedNews(Base, PrimaryKeyMixin, TimingMixin):
@@ -50,4 +99,18 @@ class DenormalizedNews(Base, PrimaryKeyMixin, TimingMixin):
     category: Mapped[NewsCategory] = mapped_column(
         ENUM(NewsCategory, name="newscategory_enum")
     )
-    used_in_training: Mapped[bool] = mapped_column(Boolean, default=False, server_default=text("false"))
\ No newline at end of file
+    used_in_training: Mapped[bool] = mapped_column(Boolean, default=False, server_default=text("false"))
+    text_hash: Mapped[str] = mapped_column(
+        String(32),
+        Computed(DENORMALIZED_TEXT_HASH_SQL, persisted=True),
+        unique=True,
+    )
+
+    __table_args__ = (
+        # счётчики категорий для replay-выборки без скана таблицы
+        Index(
+            "ix_news_denormalized_used_category",
+            "category",
+            postgresql_where=text("used_in_training"),
+        ),
+    )
\ No newline at end of file
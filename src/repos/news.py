@@ -1,7 +1,23 @@
+import json
+from datetime import datetime, timedelta
 from typing import Sequence
 
 from asyncpg import DataError
-from sqlalchemy import func, insert, or_, select, update
+from sqlalchemy import (
+    Float,
+    Integer,
+    String,
+    case,
+    cast,
+    column,
+    func,
+    or_,
+    select,
+    tablesample,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import JSON
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.exc import DBAPIError
 
@@ -11,13 +27,52 @@ from src.repos.mappers.mappers import (
     DenormNewsMapper,
     NewsMapper,
 )
+from src.schemas.enums import NewsCategory
 from src.schemas.news import (
     AddNewsDTO,
+    CategoryAssignmentDTO,
     NewsDTO,
 )
-from src.schemas.samples import DenormalizedNewsDTO
+from src.schemas.samples import (
+    DenormalizedNewsAddDTO,
+    DenormalizedNewsDTO,
+)
 from src.utils.exceptions import ValueOutOfRangeError
 
+# запас выборки TABLESAMPLE, чтобы случайный недобор строк редко
+# оставлял квоты категорий незаполненными
+REPLAY_OVERSAMPLE = 2.0
+
+
+def _proportional_quotas(
+    counts: dict[NewsCategory, int], limit: int
+) -> dict[NewsCategory, int]:
+    """Квоты по долям категорий, остаток по наибольшим дробям."""
+    total = sum(counts.values())
+    if total <= 0 or limit <= 0:
+        return {}
+    limit = min(limit, total)
+    shares = {
+        category: limit * count / total
+        for category, count in counts.items()
+    }
+    quotas = {
+        category: int(share) for category, share in shares.items()
+    }
+    rest = limit - sum(quotas.values())
+    by_fraction = sorted(
+        shares,
+        key=lambda category: shares[category] - quotas[category],
+        reverse=True,
+    )
+    for category in by_fraction[:rest]:
+        quotas[category] += 1
+    return {
+        category: quota
+        for category, quota in quotas.items()
+        if quota > 0
+    }
+
 
 class DenormNewsRepo(
     BaseRepo[DenormalizedNews, DenormalizedNewsDTO]
@@ -35,8 +90,11 @@ class DenormNewsRepo(
             )
         )
         insert_stmt = (
-            insert(self.model)
+            pg_insert(self.model)
             .from_select(["title", "summary", "category"], query)
+            .on_conflict_do_nothing(
+                constraint="uq_news_denormalized_text_hash"
+            )
             .returning(self.model)
         )
         result = await self.session.execute(insert_stmt)
@@ -45,20 +103,146 @@ class DenormNewsRepo(
             self.mapper.map_to_domain_entity(obj) for obj in objs
         ]
 
-    async def get_random_used_samples(
+    async def upsert_by_text(
+        self, data: DenormalizedNewsAddDTO
+    ) -> DenormalizedNewsDTO:
+        """
+        Добавляет пример; если такой текст уже есть, заменяет его
+        категорию на новую и снова отдаёт пример в обучение.
+        """
+        insert_stmt = pg_insert(self.model).values(
+            **data.model_dump()
+        )
+        upsert_stmt = insert_stmt.on_conflict_do_update(
+            constraint="uq_news_denormalized_text_hash",
+            set_={
+                "category": insert_stmt.excluded.category,
+                "used_in_training": False,
+            },
+        ).returning(self.model)
+        result = await self.session.execute(upsert_stmt)
+        obj = result.scalars().one()
+        return self.mapper.map_to_domain_entity(obj)
+
+    async def add_bulk_skip_duplicates(
+        self,
+        data: Sequence[DenormalizedNewsAddDTO],
+        chunk_size: int = 1000,
+    ) -> int:
+        """
+        Вставляет примеры, пропуская тексты, которые уже есть в
+        таблице или повторяются в data (ON CONFLICT DO NOTHING по
+        text_hash). Возвращает число реально добавленных строк.
+        """
+        inserted = 0
+        for idx in range(0, len(data), chunk_size):
+            chunk = data[idx : idx + chunk_size]
+            add_obj_stmt = (
+                pg_insert(self.model)
+                .values([item.model_dump() for item in chunk])
+                .on_conflict_do_nothing(
+                    constraint="uq_news_denormalized_text_hash"
+                )
+                .returning(self.model.id)
+            )
+            result = await self.session.execute(add_obj_stmt)
+            inserted += len(result.scalars().all())
+        return inserted
+
+    async def get_stratified_replay_samples(
         self, limit: int
     ) -> list[DenormalizedNewsDTO]:
+        """
+        Replay-выборка без ORDER BY random() по всей таблице: квоты
+        категорий пропорциональны их частоте, строки берутся из
+        TABLESAMPLE BERNOULLI с долей limit / total (с запасом), и
+        случайный порядок считается только внутри этой выборки.
+        Если выборка не покрыла квоты, недобор добирается
+        ORDER BY random() LIMIT по оставшимся строкам.
+        """
         if limit <= 0:
             return []
 
-        query = (
-            select(self.model)
-            .filter_by(used_in_training=True)
-            .order_by(func.random())
-            .limit(limit)
+        counts_query = (
+            select(self.model.category, func.count())
+            .filter(self.model.used_in_training.is_(True))
+            .group_by(self.model.category)
+        )
+        counts_result = await self.session.execute(counts_query)
+        counts = {
+            category: count
+            for category, count in counts_result.all()
+        }
+        quotas = _proportional_quotas(counts, limit)
+        if not quotas:
+            return []
+
+        total = sum(counts.values())
+        percent = min(
+            100.0, 100.0 * limit * REPLAY_OVERSAMPLE / total
+        )
+        sampled = tablesample(
+            self.model, func.bernoulli(percent), name="sampled"
+        )
+        ranked = (
+            select(
+                sampled.c.id,
+                sampled.c.category,
+                func.row_number()
+                .over(
+                    partition_by=sampled.c.category,
+                    order_by=func.random(),
+                )
+                .label("rank"),
+            )
+            .filter(sampled.c.used_in_training.is_(True))
+            .subquery("ranked")
+        )
+        category_quotas = values(
+            column("category", String),
+            column("quota", Integer),
+            name="quotas",
+        ).data(
+            [
+                (category.name, quota)
+                for category, quota in quotas.items()
+            ]
+        )
+        ids_query = (
+            select(ranked.c.id)
+            .join(
+                category_quotas,
+                ranked.c.category
+                == cast(
+                    category_quotas.c.category,
+                    self.model.category.type,
+                ),
+            )
+            .filter(ranked.c.rank <= category_quotas.c.quota)
         )
         try:
-            result = await self.session.execute(query)
+            ids_result = await self.session.execute(ids_query)
+            ids = list(ids_result.scalars().all())
+            shortfall = sum(quotas.values()) - len(ids)
+            if shortfall > 0:
+                top_up_query = (
+                    select(self.model.id)
+                    .filter(
+                        self.model.used_in_training.is_(True),
+                        self.model.id.not_in(ids),
+                    )
+                    .order_by(func.random())
+                    .limit(shortfall)
+                )
+                top_up_result = await self.session.execute(
+                    top_up_query
+                )
+                ids.extend(top_up_result.scalars().all())
+            if not ids:
+                return []
+            result = await self.session.execute(
+                select(self.model).filter(self.model.id.in_(ids))
+            )
         except DBAPIError as exc:
             if isinstance(exc.orig.__cause__, DataError):  # type: ignore
                 raise ValueOutOfRangeError(
@@ -96,6 +280,206 @@ class NewsRepo(BaseRepo[News, NewsDTO]):
     model = News
     mapper = NewsMapper
 
+    def _claimable_filters(
+        self,
+        model_version: str,
+        max_attempts: int,
+        lease_sec: int,
+    ) -> tuple:
+        lease_expired = func.now() - timedelta(seconds=lease_sec)
+        return (
+            self.model.category.is_(None),
+            self.model.classified_with.is_distinct_from(
+                model_version
+            ),
+            # попытки считаются для каждой версии модели отдельно:
+            # новая версия снова берёт строки, на которых падала
+            # прежняя
+            or_(
+                self.model.classify_attempts < max_attempts,
+                self.model.classify_attempted_with.is_distinct_from(
+                    model_version
+                ),
+            ),
+            or_(
+                self.model.classify_claimed_at.is_(None),
+                self.model.classify_claimed_at < lease_expired,
+            ),
+        )
+
+    async def has_claimable(
+        self,
+        model_version: str,
+        max_attempts: int,
+        lease_sec: int,
+    ) -> bool:
+        query = (
+            select(self.model.id)
+            .filter(
+                *self._claimable_filters(
+                    model_version, max_attempts, lease_sec
+                )
+            )
+            .limit(1)
+        )
+        result = await self.session.execute(query)
+        return result.scalar() is not None
+
+    async def claim_uncategorized(
+        self,
+        limit: int,
+        model_version: str,
+        max_attempts: int,
+        lease_sec: int,
+    ) -> list[NewsDTO]:
+        """
+        Захватывает до limit новостей без категории, которые эта
+        версия модели ещё не обрабатывала. Строки, занятые другим
+        воркером, пропускаются (SKIP LOCKED), а после коммита их
+        защищает аренда classify_claimed_at.
+        """
+        candidates = (
+            select(self.model.id)
+            .filter(
+                *self._claimable_filters(
+                    model_version, max_attempts, lease_sec
+                )
+            )
+            .order_by(self.model.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        stmt = (
+            update(self.model)
+            .where(self.model.id.in_(candidates))
+            .values(
+                classify_claimed_at=func.now(),
+                classify_attempts=case(
+                    (
+                        self.model.classify_attempted_with
+                        == model_version,
+                        self.model.classify_attempts + 1,
+                    ),
+                    else_=1,
+                ),
+                classify_attempted_with=model_version,
+                # служебные поля, содержимое новости не менялось
+                updated_at=self.model.updated_at,
+            )
+            .returning(self.model)
+        )
+        result = await self.session.execute(stmt)
+        return [
+            self.mapper.map_to_domain_entity(obj)
+            for obj in result.scalars().all()
+        ]
+
+    async def finish_classification(
+        self,
+        ids: list[int],
+        model_version: str,
+    ) -> None:
+        if not ids:
+            return
+        stmt = (
+            update(self.model)
+            .where(self.model.id.in_(ids))
+            .values(
+                classified_with=model_version,
+                classify_claimed_at=None,
+                classify_attempts=0,
+                updated_at=self.model.updated_at,
+            )
+        )
+        await self.session.execute(stmt)
+
+    async def bulk_assign_categories(
+        self,
+        assignments: list[CategoryAssignmentDTO],
+        model_version: str | None = None,
+        reclassify: bool = False,
+    ) -> list[int]:
+        """
+        Проставляет категории одним UPDATE ... FROM (VALUES ...)
+        вместо SELECT + UPDATE на каждую новость. Вместе с
+        категорией пишутся уверенность модели, top-k и версия
+        модели, аренда снимается. Отказ (category=None) оставляет
+        новость без категории до следующей версии модели.
+
+        Обновляются только новости без категории, а с reclassify -
+        только с категорией от модели: ручная категория,
+        выставленная во время классификации, не перезаписывается.
+        Возвращает id реально обновлённых строк.
+        """
+        if not assignments:
+            return []
+        assigned = values(
+            column("id", Integer),
+            column("category", String),
+            column("confidence", Float),
+            column("top_k", String),
+            name="assigned",
+        ).data(
+            [
+                (
+                    item.news_id,
+                    item.category.name if item.category else None,
+                    item.confidence,
+                    json.dumps(item.top_k, ensure_ascii=False),
+                )
+                for item in assignments
+            ]
+        )
+        not_manual = (
+            self.model.category_confidence.is_not(None)
+            if reclassify
+            else self.model.category.is_(None)
+        )
+        stmt = (
+            update(self.model)
+            .where(self.model.id == assigned.c.id, not_manual)
+            .values(
+                category=cast(
+                    assigned.c.category, self.model.category.type
+                ),
+                category_confidence=assigned.c.confidence,
+                category_top_k=cast(assigned.c.top_k, JSON),
+                classified_with=(
+                    model_version or self.model.classified_with
+                ),
+                classify_claimed_at=None,
+                classify_attempts=0,
+            )
+            .returning(self.model.id)
+        )
+        result = await self.session.execute(stmt)
+        return list(result.scalars().all())
+
+    async def get_auto_categorized_after(
+        self,
+        after_id: int,
+        limit: int,
+    ) -> list[NewsDTO]:
+        """
+        Следующая по id порция новостей с категорией от модели
+        (у ручных category_confidence пустой).
+        """
+        query = (
+            select(self.model)
+            .filter(
+                self.model.id > after_id,
+                self.model.category.is_not(None),
+                self.model.category_confidence.is_not(None),
+            )
+            .order_by(self.model.id)
+            .limit(limit)
+        )
+        result = await self.session.execute(query)
+        return [
+            self.mapper.map_to_domain_entity(obj)
+            for obj in result.scalars().all()
+        ]
+
     async def get_recent(
         self,
         channel_id: int,
@@ -208,6 +592,31 @@ class NewsRepo(BaseRepo[News, NewsDTO]):
 
         return total_count, news
 
+    async def suggest_titles(
+        self,
+        prefix: str,
+        limit: int,
+    ) -> list[dict]:
+        escaped = (
+            prefix.replace("\\", "\\\\")
+            .replace("%", "\\%")
+            .replace("_", "\\_")
+        )
+        # prefix уже в нижнем регистре, LIKE 'prefix%' по
+        # lower(title) обслуживает индекс ix_news_title_prefix
+        query = (
+            select(self.model.id, self.model.title)
+            .filter(
+                func.lower(self.model.title).like(
+                    f"{escaped}%", escape="\\"
+                )
+            )
+            .order_by(self.model.published.desc())
+            .limit(limit)
+        )
+        result = await self.session.execute(query)
+        return [dict(row) for row in result.mappings().all()]
+
     async def search_with_pagination(
         self,
         limit: int,
@@ -217,6 +626,11 @@ class NewsRepo(BaseRepo[News, NewsDTO]):
         without_category: bool = False,
         channel_ids=None,
         recent_first: bool = True,
+        published_from: datetime | None = None,
+        published_to: datetime | None = None,
+        published_before: datetime | None = None,
+        published_after: datetime | None = None,
+        created_after: datetime | None = None,
     ) -> tuple[int, list[NewsDTO]]:
         filters = []
 
@@ -233,6 +647,16 @@ class NewsRepo(BaseRepo[News, NewsDTO]):
             filters.append(self.model.category.in_(categories))
         elif without_category:
             filters.append(self.model.category.is_(None))
+        if published_from:
+            filters.append(self.model.published >= published_from)
+        if published_to:
+            filters.append(self.model.published <= published_to)
+        if published_before:
+            filters.append(self.model.published < published_before)
+        if published_after:
+            filters.append(self.model.published > published_after)
+        if created_after:
+            filters.append(self.model.created_at > created_after)
         if query_string:
             pattern = f"%{query_string.strip()}%"
             filters.append(
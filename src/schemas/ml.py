@@ -1,4 +1,7 @@
 from datetime import datetime
+from typing import Literal
+
+from pydantic import Field
 
 from src.schemas.base import BaseDTO
 
@@ -38,6 +41,33 @@ class TrainConfig(BaseDTO):
     )
     max_vocab: int = 50000  # Максимальное количество слов в словаре
     balance: bool = False  # Флаг для балансировки классов
+    export_quantized: bool = (
+        True  # Сохранять int8 TorchScript-копию для CPU-инференса
+    )
+    num_threads: int = (
+        0  # Потоки torch внутри операций (0 = по умолчанию)
+    )
+    num_workers: int = (
+        0  # Процессы DataLoader (0 = загрузка в основном процессе)
+    )
+    persistent_workers: bool = (
+        True  # Не пересоздавать процессы DataLoader каждую эпоху
+    )
+    bucket_by_length: bool = (
+        False  # Собирать батчи из текстов близкой длины
+    )
+    patience: int = (
+        3  # Эпох без роста val_accuracy до остановки (0 = выкл.)
+    )
+    min_delta: float = (
+        0.0  # Минимальный прирост val_accuracy для улучшения
+    )
+    lr_schedule: Literal["none", "plateau", "cosine"] = (
+        "plateau"  # Расписание скорости обучения
+    )
+    calibrate: bool = (
+        True  # Подбирать температуру softmax на валидации
+    )
 
 
 class TopPrediction(BaseDTO):
@@ -54,6 +84,14 @@ class PredictionResult(BaseDTO):
     probabilities: dict[str, float] | None = None
 
 
+class PredictTextRequest(BaseDTO):
+    title: str = Field(min_length=1, max_length=1000)
+    summary: str = Field(default="", max_length=10000)
+    top_k: int = Field(default=3, ge=1, le=10)
+    min_confidence: float | None = Field(default=None, ge=0, le=1)
+    include_probabilities: bool = False
+
+
 class TrainingAddDTO(BaseDTO):
     config: TrainConfig
     model_dir: str
@@ -47,6 +47,17 @@ class NewsDTO(AddNewsDTO):
 
 class NewsUpdateDTO(BaseDTO):
     category: NewsCategory | None = None
+    category_confidence: float | None = None
+    category_top_k: dict[str, float] | None = None
+
+
+class CategoryAssignmentDTO(BaseDTO):
+    """Ответ модели для новости; category=None означает отказ."""
+
+    news_id: int
+    category: NewsCategory | None = None
+    confidence: float
+    top_k: dict[str, float] = {}
 
 
 class PagingInfo(BaseDTO):
@@ -89,3 +100,13 @@ class NewsResponseDTO(BaseDTO):
 class NewsResponse(BaseDTO):
     meta: PagingInfo
     news: list[NewsResponseDTO]
+
+
+class NewsSuggestionDTO(BaseDTO):
+    id: int
+    title: str
+
+
+class NewsSuggestResponse(BaseDTO):
+    query: str
+    suggestions: list[NewsSuggestionDTO]
@@ -37,12 +37,14 @@ class DenormalizedNewsDTO(DenormalizedNewsAddDTO):
 class DatasetUploadAddDTO(BaseDTO):
     uploads: int = Field(default=0, ge=0)
     errors: int = Field(default=0, ge=0)
+    duplicates: int = Field(default=0, ge=0)
     details: list[str] = Field(default_factory=list)
 
 
 class DatasetUploadUpdateDTO(BaseDTO):
     uploads: int | None = Field(default=None, ge=0)
     errors: int | None = Field(default=None, ge=0)
+    duplicates: int | None = Field(default=None, ge=0)
     details: list[str] | None = None
     is_completed: bool | None = None
 
@@ -1,4 +1,5 @@
 from src.services.base import BaseService
+from src.utils.search_cache import news_search_cache
 from src.schemas.channels import (
     ChannelDTO,
     ChannelAddDTO,
@@ -59,3 +60,4 @@ class ChannelService(BaseService):
         except ObjectNotFoundError as exc:
             raise ChannelNotFoundError from exc
         await self.db.commit()
+        await news_search_cache.invalidate()
@@ -1,11 +1,15 @@
+import asyncio
 import base64
 import json
 import csv
 import io
+import logging
+from datetime import datetime, timezone
 
 from kombu.exceptions import OperationalError
 
 from src.schemas.news import (
+    NewsSuggestionDTO,
     NewsUpdateDTO,
 )
 from src.schemas.samples import DenormalizedNewsAddDTO, DenormalizedNewsDTO, DatasetUploadAddDTO
@@ -14,20 +18,46 @@ from src.tasks.ml import upload_training_dataset
 from src.config import settings
 from src.services.base import BaseService
 from src.utils.es_manager import ESManager
+from src.utils.search_cache import news_search_cache
 from src.utils.search_sync import sync_news_documents
+from src.utils.ttl_cache import TTLCache
 from src.utils.exceptions import (
     NewsNotFoundError,
     ChannelNotFoundError,
     ObjectNotFoundError,
     AlreadyAssignedCategoryError,
-    ObjectExistsError,
-    DenormalizedNewsAlreadyExistsError,
     CSVDecodeError,
     MissingCSVHeadersError,
     UploadNotFoundError,
     BrokerUnavailableError,
 )
 
+logger = logging.getLogger("src.services.news")
+
+_suggest_cache = TTLCache(
+    maxsize=settings.NEWS_SUGGEST_CACHE_SIZE,
+    ttl=settings.NEWS_SUGGEST_CACHE_TTL_SEC,
+)
+
+
+def _to_naive_utc(value: datetime | None) -> datetime | None:
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _sort_value_to_datetime(value: int | float) -> datetime:
+    return datetime.fromtimestamp(
+        value / 1000, tz=timezone.utc
+    ).replace(tzinfo=None)
+
+
+def _datetime_to_sort_value(value: str) -> int:
+    published = datetime.fromisoformat(value)
+    if published.tzinfo is None:
+        published = published.replace(tzinfo=timezone.utc)
+    return int(published.timestamp() * 1000)
+
 
 class CursorEncoder:
     @staticmethod
@@ -80,23 +110,26 @@ class NewsService(BaseService):
         if news.category and news.category == category:
             raise AlreadyAssignedCategoryError
 
-        to_update = NewsUpdateDTO(category=category)
+        # ручная категория: ответ модели больше не актуален
+        to_update = NewsUpdateDTO(
+            category=category,
+            category_confidence=None,
+            category_top_k=None,
+        )
         await self.db.news.edit(
             id=news_id,
             ensure_existence=False,
             data=to_update,
         )
 
-        try:
-            added_news = await self.db.denorm_news.add(
-                DenormalizedNewsAddDTO(
-                    title=news.title,
-                    summary=news.summary,
-                    category=category,
-                )
+        # повторная правка того же текста заменяет прежнюю метку
+        added_news = await self.db.denorm_news.upsert_by_text(
+            DenormalizedNewsAddDTO(
+                title=news.title,
+                summary=news.summary,
+                category=category,
             )
-        except ObjectExistsError as exc:
-            raise DenormalizedNewsAlreadyExistsError from exc
+        )
 
         await self.db.commit()
         await sync_news_documents(
@@ -108,6 +141,7 @@ class NewsService(BaseService):
             ],
             refresh=True,
         )
+        await news_search_cache.invalidate()
         return added_news
 
     async def upload_denormalized_news(self, content: bytes):
@@ -135,6 +169,57 @@ class NewsService(BaseService):
             raise BrokerUnavailableError from exc
         return upload_resp
 
+    async def suggest(
+        self,
+        prefix: str,
+        limit: int,
+    ) -> list[NewsSuggestionDTO]:
+        normalized = " ".join(prefix.lower().split())
+        if not normalized:
+            return []
+
+        cache_key = (normalized, limit)
+        cached = _suggest_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        rows = None
+        if ESManager.is_enabled():
+            rows = await self._suggest_with_es(normalized, limit)
+        if rows is None:
+            rows = await self.db.news.suggest_titles(
+                prefix=normalized, limit=limit
+            )
+
+        suggestions = [
+            NewsSuggestionDTO(id=int(row["id"]), title=row["title"])
+            for row in rows
+        ]
+        _suggest_cache.set(cache_key, suggestions)
+        return suggestions
+
+    @staticmethod
+    async def _suggest_with_es(
+        prefix: str, limit: int
+    ) -> list[dict] | None:
+        es = ESManager.shared(index_name=settings.ES_INDEX_NAME)
+        try:
+            return await asyncio.wait_for(
+                es.suggest(prefix=prefix, limit=limit),
+                timeout=settings.NEWS_SUGGEST_TIMEOUT_SEC,
+            )
+        except asyncio.TimeoutError:
+            logger.warning(
+                "ES suggest exceeded %.3fs budget, using PostgreSQL",
+                settings.NEWS_SUGGEST_TIMEOUT_SEC,
+            )
+        except Exception as exc:
+            # ошибка одного запроса не отключает поиск через ES
+            logger.warning(
+                "ES suggest failed, using PostgreSQL: %s", exc
+            )
+        return None
+
     async def get_news_list(
         self,
         limit: int,
@@ -145,7 +230,55 @@ class NewsService(BaseService):
         channel_ids: list[int] | None = None,
         search_after: str | None = None,
         recent_first: bool = True,
-        ) -> tuple[int, list[dict], str | None, int]:
+        published_from: datetime | None = None,
+        published_to: datetime | None = None,
+    ) -> tuple[int, list[dict], str | None, int]:
+        published_from = _to_naive_utc(published_from)
+        published_to = _to_naive_utc(published_to)
+
+        cache_key = None
+        if not search_after:
+            cache_key = news_search_cache.make_key(
+                limit=limit,
+                query_string=query_string,
+                categories=categories,
+                without_category=without_category,
+                channel_ids=channel_ids,
+                recent_first=recent_first,
+                published_from=published_from,
+                published_to=published_to,
+            )
+            cached = await news_search_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        result = await self._search_news(
+            limit=limit,
+            categories=categories,
+            without_category=without_category,
+            query_string=query_string,
+            channel_ids=channel_ids,
+            search_after=search_after,
+            recent_first=recent_first,
+            published_from=published_from,
+            published_to=published_to,
+        )
+        if cache_key is not None:
+            await news_search_cache.set(cache_key, result)
+        return result
+
+    async def _search_news(
+        self,
+        limit: int,
+        categories: list[NewsCategory] | None,
+        without_category: bool,
+        query_string: str | None,
+        channel_ids: list[int] | None,
+        search_after: str | None,
+        recent_first: bool,
+        published_from: datetime | None,
+        published_to: datetime | None,
+    ) -> tuple[int, list[dict], str | None, int]:
         try:
             if channel_ids:
                 for channel_id in channel_ids:
@@ -158,10 +291,16 @@ class NewsService(BaseService):
 
         if ESManager.is_enabled():
             sort_param = current_cursor.get("sort", None)
+            # общее количество считается только на первой странице:
+            # следующие страницы могут идти в меньший набор партиций
+            known_total = current_cursor.get("total")
             try:
                 async with ESManager(
                     index_name=settings.ES_INDEX_NAME
                 ) as es:
+                    checkpoint = None
+                    if settings.ES_HYBRID_SEARCH:
+                        checkpoint = await es.sync_checkpoint()
                     total, news, last_hit_sort = await es.search(
                         query_string=query_string,
                         categories=categories,
@@ -170,16 +309,47 @@ class NewsService(BaseService):
                         limit=limit,
                         search_after=sort_param,
                         recent_first=recent_first,
+                        published_from=published_from,
+                        published_to=published_to,
+                        track_total_hits=(
+                            sort_param is None or known_total is None
+                        ),
                     )
             except Exception:
                 ESManager.disable_runtime()
             else:
+                # без checkpoint PG вернул бы все новости, и они
+                # посчитались бы дважды
+                if (
+                    settings.ES_HYBRID_SEARCH
+                    and checkpoint is not None
+                ):
+                    total, news, last_hit_sort = (
+                        await self._merge_fresh_news(
+                            es_total=total,
+                            es_news=news,
+                            es_last_sort=last_hit_sort,
+                            checkpoint=checkpoint,
+                            limit=limit,
+                            sort_param=sort_param,
+                            categories=categories,
+                            without_category=without_category,
+                            query_string=query_string,
+                            channel_ids=channel_ids,
+                            recent_first=recent_first,
+                            published_from=published_from,
+                            published_to=published_to,
+                        )
+                    )
+                if not (sort_param is None or known_total is None):
+                    total = int(known_total)
                 new_cursor = None
                 if len(news) == limit:
                     new_cursor = CursorEncoder().encode_cursor(
                         cursor={
                             "sort": last_hit_sort,
                             "offset": offset + len(news),
+                            "total": total,
                         }
                     )
                 return total, news, new_cursor, offset
@@ -192,6 +362,8 @@ class NewsService(BaseService):
             without_category=without_category,
             channel_ids=channel_ids,
             recent_first=recent_first,
+            published_from=published_from,
+            published_to=published_to,
         )
         news = [row.model_dump(mode="json") for row in news_rows]
         next_offset = offset + len(news)
@@ -201,3 +373,68 @@ class NewsService(BaseService):
                 cursor={"offset": next_offset}
             )
         return total, news, new_cursor, offset
+
+    async def _merge_fresh_news(
+        self,
+        es_total: int,
+        es_news: list[dict],
+        es_last_sort: list | None,
+        checkpoint: datetime,
+        limit: int,
+        sort_param: list | None,
+        categories: list[NewsCategory] | None,
+        without_category: bool,
+        query_string: str | None,
+        channel_ids: list[int] | None,
+        recent_first: bool,
+        published_from: datetime | None,
+        published_to: datetime | None,
+    ) -> tuple[int, list[dict], list | None]:
+        """
+        Добавляет к выдаче ES новости, созданные после последнего
+        проиндексированного документа, и сортирует общий список по
+        дате публикации. Курсор строится по последнему элементу
+        общего списка, поэтому обе выборки продолжаются с одного
+        места.
+        """
+        cursor_published = None
+        if sort_param:
+            cursor_published = _sort_value_to_datetime(sort_param[0])
+
+        fresh_total, fresh_rows = (
+            await self.db.news.search_with_pagination(
+                limit=limit,
+                offset=0,
+                query_string=query_string,
+                categories=categories,
+                without_category=without_category,
+                channel_ids=channel_ids,
+                recent_first=recent_first,
+                published_from=published_from,
+                published_to=published_to,
+                published_before=(
+                    cursor_published if recent_first else None
+                ),
+                published_after=(
+                    None if recent_first else cursor_published
+                ),
+                created_after=checkpoint,
+            )
+        )
+        if not fresh_rows:
+            return es_total, es_news, es_last_sort
+
+        merged = {item["id"]: item for item in es_news}
+        for row in fresh_rows:
+            merged.setdefault(row.id, row.model_dump(mode="json"))
+        ordered = sorted(
+            merged.values(),
+            key=lambda item: datetime.fromisoformat(
+                item["published"]
+            ),
+            reverse=recent_first,
+        )[:limit]
+        last_sort = [
+            _datetime_to_sort_value(ordered[-1]["published"])
+        ]
+        return es_total + fresh_total, ordered, last_sort
@@ -38,6 +38,9 @@ celery_app.conf.update(
     task_reject_on_worker_lost=True,
     broker_connection_retry_on_startup=True,
     broker_connection_max_retries=None,
+    task_routes={
+        "retrain_model": {"queue": settings.ML_TRAIN_QUEUE},
+    },
     # beat_scheduler="redbeat.RedBeatScheduler",
     # redbeat_redis_url=settings.redis_url,
 )
@@ -61,7 +64,18 @@ if settings.ENABLE_ML_AUTOTRAIN:
 if settings.ENABLE_ML_AUTOCATEGORIZATION:
     beat_schedule["check_for_uncategorized_news"] = {
         "task": "check_for_uncategorized_news",
-        "schedule": crontab(minute="*"),
+        "schedule": crontab(
+            minute="*/10" if settings.ML_CLASSIFY_ON_INGEST else "*"
+        ),
+    }
+if (
+    settings.USE_ELASTICSEARCH
+    and settings.ES_MONTHLY_INDICES
+    and settings.ES_RETENTION_MONTHS > 0
+):
+    beat_schedule["apply_search_retention"] = {
+        "task": "apply_search_retention",
+        "schedule": crontab(minute=30, hour=0),
     }
 
 celery_app.conf.beat_schedule = beat_schedule
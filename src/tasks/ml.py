@@ -3,22 +3,30 @@ import csv
 import io
 import json
 import logging
+import time
 from pathlib import Path
 
 from src.config import settings
 from src.db import sessionmaker_null_pool
 from src.schemas.ml import (
     PredictionInput,
+    PredictionResult,
     TrainingSample,
     TrainingResult,
     TrainingUpdateDTO,
     TrainingAddDTO,
     TrainConfig,
 )
+from src.ml.artifacts import ArtifactStore
+from src.ml.resident import (
+    ResidentPredictor,
+    get_resident_predictor,
+)
 from src.ml.service import NewsClassifierService
+from src.ml.worker import run_training_process
 from src.schemas.news import (
+    CategoryAssignmentDTO,
     NewsDTO,
-    NewsUpdateDTO,
 )
 from src.schemas.samples import (
     DenormalizedNewsAddDTO,
@@ -29,7 +37,12 @@ from src.schemas.samples import (
 from src.schemas.enums import NewsCategory
 from src.tasks.app import celery_app
 from src.utils.db_tools import DBManager
-from src.utils.search_sync import sync_news_documents
+from src.utils.search_cache import news_search_cache
+from src.utils.search_sync import (
+    refresh_news_index,
+    sync_news_documents,
+    update_news_fields,
+)
 
 logger = logging.getLogger("src.tasks.ml")
 
@@ -75,20 +88,33 @@ async def upload_dataset(
         len(errors),
         len(validated_data),
     )
+    inserted = 0
+    duplicates = 0
     async with DBManager(sessionmaker_null_pool) as db:
         if validated_data:
             try:
-                await db.denorm_news.add_bulk(validated_data)
+                inserted = (
+                    await db.denorm_news.add_bulk_skip_duplicates(
+                        validated_data
+                    )
+                )
+                duplicates = len(validated_data) - inserted
             except Exception as exc:
                 logger.error(
                     "Failed to upload dataset to db: %s", exc
                 )
                 errors.append(str(exc))
 
+        logger.info(
+            "Inserted %d samples, skipped %d duplicates",
+            inserted,
+            duplicates,
+        )
         edit_upload = DatasetUploadUpdateDTO(
             is_completed=True,
             errors=len(errors),
-            uploads=len(validated_data),
+            uploads=inserted,
+            duplicates=duplicates,
             details=errors,
         )
         await db.uploads.edit(id=upload.id, data=edit_upload)
@@ -118,7 +144,9 @@ def _deserialize_training_payload(
 
 
 def _load_known_labels() -> set[str]:
-    path = Path(settings.model_dir) / "labels.json"
+    path = Path(
+        ArtifactStore(model_dir=settings.model_dir).labels_path
+    )
     if not path.exists():
         return set()
 
@@ -229,8 +257,10 @@ async def _select_training_batch(
     if replay_size <= 0:
         return new_rows, True, "incremental_without_replay"
 
-    replay_rows = await db.denorm_news.get_random_used_samples(
-        replay_size
+    replay_rows = (
+        await db.denorm_news.get_stratified_replay_samples(
+            replay_size
+        )
     )
     merged_rows = {row.id: row for row in new_rows}
     for row in replay_rows:
@@ -255,55 +285,131 @@ def check_for_uncategorized_news():
 
 
 async def handle_uncategorized_news():
-    if not NewsClassifierService.model_exists():
+    model_version = ArtifactStore(
+        model_dir=settings.model_dir
+    ).artifact_version()
+    if (
+        model_version is None
+        or not NewsClassifierService.model_exists()
+    ):
         logger.info(
             "Model artifacts are missing. Skipping ML categorization."
         )
         return
 
     async with DBManager(sessionmaker_null_pool) as db:
-        uncategorized_news = await db.news.get_all_filtered(
-            category=None
+        has_work = await db.news.has_claimable(
+            model_version=model_version,
+            max_attempts=settings.ML_CLASSIFY_MAX_ATTEMPTS,
+            lease_sec=settings.ML_CLASSIFY_LEASE_SEC,
         )
-        if len(uncategorized_news) == 0:
-            logger.info("No uncategorized news. Skipping...")
-            return
-
-        logger.info(
-            "Found %d uncategorized news...",
-            len(uncategorized_news),
-        )
-
-        news_to_categorize = []
-        for idx, news in enumerate(uncategorized_news, start=1):
-            obj = news.model_dump()
-            news_to_categorize.append(obj)
-            logger.debug("Dump #%d: %s", idx, obj)
+    if not has_work:
+        logger.info("No news waiting for classification. Skipping...")
+        return
 
-        categorize_uncategorized_news.delay(  # pyright: ignore
-            news_to_categorize,
-        )
+    # воркеры сами забирают строки из БД, в сообщении только сигнал
+    for _ in range(max(settings.ML_CLASSIFY_PARALLEL_TASKS, 1)):
+        categorize_uncategorized_news.delay()  # pyright: ignore
 
 
 @celery_app.task(name="categorize_uncategorized_news")
-def categorize_uncategorized_news(news: list[dict]):
-    validated_news = [NewsDTO.model_validate(obj) for obj in news]
+def categorize_uncategorized_news(news: list[dict] | None = None):
+    # news остался для сообщений, поставленных в очередь до перехода
+    # на захват строк; сами строки воркер берёт из БД
+    predictor = get_resident_predictor()
     try:
-        service = NewsClassifierService(
-            model_dir=settings.model_dir,
-            device=settings.DEVICE,
-        )
-        logger.info("Successfully loaded model...")
+        predictor.refresh()
     except Exception as exc:
         logger.error("Failed to load model: %s", exc)
         return
-    asyncio.run(assign_categories(validated_news, service))
+    asyncio.run(classify_claimed_news(predictor))
 
 
-async def assign_categories(
-    news: list[NewsDTO],
-    service: NewsClassifierService,
+async def classify_claimed_news(
+    predictor: ResidentPredictor,
 ) -> None:
+    processed = 0
+    max_batches = max(settings.ML_CLASSIFY_MAX_BATCHES_PER_TASK, 1)
+    for _ in range(max_batches):
+        model_version = predictor.version
+        if model_version is None:
+            return
+
+        async with DBManager(sessionmaker_null_pool) as db:
+            news = await db.news.claim_uncategorized(
+                limit=settings.ML_CLASSIFY_BATCH_SIZE,
+                model_version=model_version,
+                max_attempts=settings.ML_CLASSIFY_MAX_ATTEMPTS,
+                lease_sec=settings.ML_CLASSIFY_LEASE_SEC,
+            )
+            await db.commit()
+        if not news:
+            break
+
+        await assign_categories(news, predictor, model_version)
+        processed += len(news)
+
+    logger.info("Processed %d claimed news items", processed)
+
+
+def _predict_isolated(
+    predictor: ResidentPredictor,
+    payloads: list[PredictionInput],
+) -> list[PredictionResult | None]:
+    """
+    predict_many для всего батча, а при ошибке - по одной строке,
+    чтобы одна испорченная новость не роняла остальные. Для
+    упавших строк возвращается None. Если не прошла ни одна
+    строка, ошибка не во входных данных и пробрасывается.
+    """
+    min_confidence = settings.ML_ABSTAIN_CONFIDENCE or None
+    try:
+        return list(
+            predictor.predict_many(
+                payloads, min_confidence=min_confidence
+            )
+        )
+    except Exception as exc:
+        if len(payloads) <= 1:
+            raise
+        logger.warning(
+            "Batch prediction failed, retrying per item: %s", exc
+        )
+
+    results: list[PredictionResult | None] = []
+    last_error: Exception | None = None
+    for payload in payloads:
+        try:
+            results.extend(
+                predictor.predict_many(
+                    [payload], min_confidence=min_confidence
+                )
+            )
+        except Exception as exc:
+            last_error = exc
+            logger.warning(
+                "Failed to classify news_id '%d': %s",
+                payload.news_id,
+                exc,
+            )
+            results.append(None)
+    if last_error is not None and all(
+        result is None for result in results
+    ):
+        raise last_error
+    return results
+
+
+def predict_assignments(
+    news: list[NewsDTO],
+    predictor: ResidentPredictor,
+) -> list[CategoryAssignmentDTO]:
+    """
+    Ответы модели для bulk_assign_categories. Ниже порога
+    ML_ABSTAIN_CONFIDENCE категория не ставится, но уверенность и
+    top-k сохраняются. Строки, на которых модель упала, в ответ не
+    попадают.
+    """
     payloads = [
         PredictionInput(
             news_id=obj.id,
@@ -312,20 +418,21 @@ async def assign_categories(
         )
         for obj in news
     ]
-    result = service.predict_many(payloads)
+    result = _predict_isolated(predictor, payloads)
     predictions_by_id = {
         payload.news_id: prediction
         for payload, prediction in zip(payloads, result)
+        if prediction is not None
     }
 
-    async with DBManager(sessionmaker_null_pool) as db:
-        updated = 0
-        documents_to_sync: list[dict] = []
-        for news_obj in news:
-            prediction = predictions_by_id.get(news_obj.id)
-            if not prediction or not prediction.category:
-                continue
+    assignments: list[CategoryAssignmentDTO] = []
+    for news_obj in news:
+        prediction = predictions_by_id.get(news_obj.id)
+        if not prediction or not prediction.top_k:
+            continue
 
+        category = None
+        if prediction.category:
             try:
                 category = NewsCategory(prediction.category)
             except ValueError:
@@ -335,31 +442,234 @@ async def assign_categories(
                     news_obj.id,
                 )
                 continue
+        assignments.append(
+            CategoryAssignmentDTO(
+                news_id=news_obj.id,
+                category=category,
+                confidence=prediction.confidence,
+                top_k={
+                    item.category: item.confidence
+                    for item in prediction.top_k
+                },
+            )
+        )
+    return assignments
+
 
-            to_update = NewsUpdateDTO(category=category)
-            await db.news.edit(to_update, id=news_obj.id)
-            documents_to_sync.append(
-                {
-                    **news_obj.model_dump(mode="json"),
-                    "category": category.value,
-                }
+async def assign_categories(
+    news: list[NewsDTO],
+    predictor: ResidentPredictor,
+    model_version: str | None = None,
+) -> None:
+    assignments = predict_assignments(news, predictor)
+    async with DBManager(sessionmaker_null_pool) as db:
+        updated_ids = set(
+            await db.news.bulk_assign_categories(
+                assignments=assignments,
+                model_version=model_version,
             )
-            logger.debug(
-                "Assigned category '%s' to news_id '%d'",
-                to_update.category.value,  # pyright: ignore
-                news_obj.id,
+        )
+        # отказы уже помечены версией модели в bulk-обновлении;
+        # строки вовсе без ответа тоже ждут следующей версии
+        if model_version is not None:
+            await db.news.finish_classification(
+                ids=[
+                    news_obj.id
+                    for news_obj in news
+                    if news_obj.id not in updated_ids
+                ],
+                model_version=model_version,
             )
-            updated += 1
         await db.commit()
-        await sync_news_documents(
-            documents_to_sync,
-            refresh=True,
-        )
-        logger.info(
-            "Assigned categories to %d of %d news items",
-            updated,
-            len(news),
-        )
+
+    categories = {
+        item.news_id: item.category
+        for item in assignments
+        if item.category is not None and item.news_id in updated_ids
+    }
+    documents_to_sync = [
+        {
+            **news_obj.model_dump(mode="json"),
+            "category": categories[news_obj.id].value,
+        }
+        for news_obj in news
+        if news_obj.id in categories
+    ]
+    updated = len(categories)
+    await sync_news_documents(
+        documents_to_sync,
+        refresh=True,
+    )
+    if updated:
+        await news_search_cache.invalidate()
+    logger.info(
+        "Assigned categories to %d of %d news items",
+        updated,
+        len(news),
+    )
+
+
+@celery_app.task(name="reclassify_news", acks_late=True)
+def reclassify_news(training_id: int) -> None:
+    predictor = get_resident_predictor()
+    try:
+        predictor.refresh(force=True)
+    except Exception as exc:
+        logger.error("Failed to load model: %s", exc)
+        return
+    finished = asyncio.run(
+        reclassify_news_async(training_id, predictor)
+    )
+    # длинный обход режется на задачи, каждая продолжает с чекпоинта
+    if not finished:
+        reclassify_news.delay(training_id)  # pyright: ignore
+
+
+async def _save_reclassify_progress(
+    db: DBManager,
+    training_id: int,
+    metrics: dict,
+    progress: dict,
+) -> None:
+    metrics["reclassify"] = progress
+    await db.trains.edit(
+        data=TrainingUpdateDTO(metrics=metrics),
+        id=training_id,
+        ensure_existence=False,
+    )
+
+
+async def reclassify_news_async(
+    training_id: int,
+    predictor: ResidentPredictor,
+) -> bool:
+    """
+    Пересматривает категории, ранее поставленные моделью, порциями
+    в порядке id. Обновляются только строки, где категория
+    сменилась. Прогресс и сводка изменений лежат в
+    metrics["reclassify"] записи обучения и коммитятся вместе с
+    порцией, поэтому обход можно продолжить после падения.
+    Возвращает True, когда обход завершён.
+    """
+    model_version = predictor.version
+    if model_version is None:
+        return True
+
+    async with DBManager(sessionmaker_null_pool) as db:
+        training = await db.trains.get_one_or_none(id=training_id)
+    if training is None:
+        logger.warning("Training %s not found", training_id)
+        return True
+
+    metrics = dict(training.metrics or {})
+    progress = metrics.get("reclassify") or {
+        "model_version": model_version,
+        "last_id": 0,
+        "scanned": 0,
+        "changed": 0,
+        "transitions": {},
+        "finished": False,
+    }
+    if progress["finished"]:
+        return True
+
+    max_rate = settings.ML_RECLASSIFY_MAX_ROWS_PER_SEC
+    started = time.monotonic()
+    scanned_now = 0
+    changed_now = 0
+    batches = max(settings.ML_RECLASSIFY_MAX_BATCHES_PER_TASK, 1)
+    for _ in range(batches):
+        # после нового обучения обход продолжит уже его задача
+        if predictor.version != progress["model_version"]:
+            progress["superseded_by"] = predictor.version
+            progress["finished"] = True
+            break
+
+        async with DBManager(sessionmaker_null_pool) as db:
+            news = await db.news.get_auto_categorized_after(
+                after_id=progress["last_id"],
+                limit=settings.ML_RECLASSIFY_BATCH_SIZE,
+            )
+        if not news:
+            progress["finished"] = True
+            break
+
+        current = {obj.id: obj for obj in news}
+        changed = [
+            item
+            for item in predict_assignments(news, predictor)
+            if item.category is not None
+            and item.category != current[item.news_id].category
+        ]
+        async with DBManager(sessionmaker_null_pool) as db:
+            updated_ids = set(
+                await db.news.bulk_assign_categories(
+                    assignments=changed,
+                    model_version=progress["model_version"],
+                    reclassify=True,
+                )
+            )
+            documents: list[dict] = []
+            for item in changed:
+                previous = current[item.news_id].category
+                if (
+                    item.news_id not in updated_ids
+                    or previous is None
+                    or item.category is None
+                ):
+                    continue
+                transition = (
+                    f"{previous.name}->{item.category.name}"
+                )
+                progress["transitions"][transition] = (
+                    progress["transitions"].get(transition, 0) + 1
+                )
+                documents.append(
+                    {
+                        **current[item.news_id].model_dump(
+                            mode="json", include={"id", "published"}
+                        ),
+                        "category": item.category.value,
+                    }
+                )
+            progress["last_id"] = news[-1].id
+            progress["scanned"] += len(news)
+            progress["changed"] += len(updated_ids)
+            await _save_reclassify_progress(
+                db, training_id, metrics, progress
+            )
+            await db.commit()
+
+        await update_news_fields(documents, fields=["category"])
+        scanned_now += len(news)
+        changed_now += len(updated_ids)
+
+        if max_rate > 0:
+            delay = scanned_now / max_rate - (
+                time.monotonic() - started
+            )
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+    if progress["finished"]:
+        async with DBManager(sessionmaker_null_pool) as db:
+            await _save_reclassify_progress(
+                db, training_id, metrics, progress
+            )
+            await db.commit()
+    if changed_now:
+        # пакеты обновлялись без ожидания refresh
+        await refresh_news_index()
+        await news_search_cache.invalidate()
+    logger.info(
+        "Reclassified %d of %d news (total %d of %d, finished=%s)",
+        changed_now,
+        scanned_now,
+        progress["changed"],
+        progress["scanned"],
+        progress["finished"],
+    )
+    return progress["finished"]
 
 
 @celery_app.task(name="retrain_model")
@@ -450,29 +760,38 @@ async def retrain_model_async(
             len(training_rows),
         )
 
-        model_exists = NewsClassifierService.model_exists()
-
-        try:
-            service = NewsClassifierService(
-                model_dir=settings.model_dir,
-                device=settings.DEVICE,
-                autoload_model=model_exists,
-            )
-            logger.info("Successfully loaded model service...")
-        except Exception as exc:
-            await _fail_training(
-                db=db,
-                training_id=training_id,
-                message="Failed to load model service",
-                exc=exc,
-            )
-            return
+        progress: list[dict] = []
 
+        async def report_epoch(epoch: dict) -> None:
+            progress.append(epoch)
+            try:
+                await db.trains.edit(
+                    data=TrainingUpdateDTO(
+                        metrics={"progress": progress}
+                    ),
+                    id=training_id,
+                    ensure_existence=False,
+                )
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                raise
+
+        # обучение идёт в дочернем процессе, event loop задачи
+        # свободен для записи прогресса. Слот воркера занят до
+        # конца обучения, поэтому задача уходит в свою очередь
+        # ML_TRAIN_QUEUE с отдельным воркером
         try:
-            result: TrainingResult = service.train(
+            result: TrainingResult = await run_training_process(
                 samples=_to_training_samples(training_rows),
                 config=config,
                 resume=resume,
+                model_dir=settings.model_dir,
+                device=settings.DEVICE,
+                on_epoch_end=report_epoch,
+                cpus=settings.ML_TRAIN_CPU_AFFINITY,
+                num_threads=settings.ML_TRAIN_NUM_THREADS,
+                timeout=settings.ML_TRAIN_TIMEOUT_SEC or None,
             )
         except Exception as exc:
             await _fail_training(
@@ -508,6 +827,11 @@ async def retrain_model_async(
                 f"({train_mode}). Marked used rows: {updated_rows}"
             ),
         )
+        if (
+            settings.ENABLE_ML_AUTOCATEGORIZATION
+            and settings.ML_RECLASSIFY_AFTER_TRAIN
+        ):
+            reclassify_news.delay(training_id)  # pyright: ignore
         logger.info(
             "Successfully trained model. Mode: %s, "
             "new samples: %d, trained batch: %d",
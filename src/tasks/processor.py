@@ -4,10 +4,12 @@ import logging
 
 from src.config import settings
 from src.db import sessionmaker_null_pool
-from src.schemas.news import AddNewsDTO, ParsedNewsDTO
+from src.schemas.news import AddNewsDTO, NewsDTO, ParsedNewsDTO
 from src.tasks.app import celery_app
 from src.utils.db_tools import DBManager
 from src.utils.es_manager import ESManager
+from src.utils.search_cache import news_search_cache
+from src.utils.search_sync import apply_search_retention
 
 logger = logging.getLogger("src.tasks.processor")
 
@@ -77,25 +79,110 @@ async def save_news(self, news_items: list[ParsedNewsDTO]):
             await db.rollback()
             raise self.retry(exc=exc, countdown=retry_countdown)
 
-        if not ESManager.is_enabled():
+        if (
+            settings.ENABLE_ML_AUTOCATEGORIZATION
+            and settings.ML_CLASSIFY_ON_INGEST
+        ):
+            inserted_news = await classify_inserted_news(
+                db, inserted_news
+            )
+
+        if ESManager.is_enabled():
+            await index_news(inserted_news)
+        else:
             logger.info(
                 "Elasticsearch disabled, skipping indexing."
             )
-            return
+        # кэш сбрасывается, когда новости уже видны поиску: иначе
+        # до refresh индекса в кэш снова попадёт старая выдача
+        await news_search_cache.invalidate()
 
-        logger.info("Started indexing news in Elasticsearch...")
-        try:
-            async with ESManager(
-                index_name=settings.ES_INDEX_NAME
-            ) as es:
-                data_dict: list[dict] = [
-                    obj.model_dump(mode="json")
-                    for obj in inserted_news
-                ]
-                await es.add(data=data_dict)
-        except Exception as exc:
-            ESManager.disable_runtime()
-            logger.warning(
-                "Failed to index news in Elasticsearch: %s",
-                exc,
+
+async def index_news(news: list[NewsDTO]) -> None:
+    logger.info("Started indexing news in Elasticsearch...")
+    try:
+        async with ESManager(
+            index_name=settings.ES_INDEX_NAME
+        ) as es:
+            data_dict: list[dict] = [
+                obj.model_dump(mode="json") for obj in news
+            ]
+            await es.add(data=data_dict, refresh=True)
+    except Exception as exc:
+        ESManager.disable_runtime()
+        logger.warning(
+            "Failed to index news in Elasticsearch: %s",
+            exc,
+        )
+
+
+async def classify_inserted_news(
+    db: DBManager,
+    news: list[NewsDTO],
+) -> list[NewsDTO]:
+    """
+    Классифицирует только что сохранённые новости резидентной
+    моделью, чтобы в ES они попали сразу с категорией. При ошибке
+    новости остаются в очереди для check_for_uncategorized_news.
+    Кэш поиска сбрасывает вызывающий код после индексации.
+    """
+    if not news:
+        return news
+    # src.ml тянет за собой torch: импорт только при включённой
+    # классификации на входе
+    from src.ml.resident import get_resident_predictor
+    from src.tasks.ml import predict_assignments
+
+    predictor = get_resident_predictor()
+    try:
+        # загрузка модели и прямой проход не блокируют event loop
+        await asyncio.to_thread(predictor.refresh)
+        model_version = predictor.version
+        assignments = await asyncio.to_thread(
+            predict_assignments, news, predictor
+        )
+        updated_ids = set(
+            await db.news.bulk_assign_categories(
+                assignments=assignments,
+                model_version=model_version,
+            )
+        )
+        if model_version is not None:
+            await db.news.finish_classification(
+                ids=[
+                    obj.id
+                    for obj in news
+                    if obj.id not in updated_ids
+                ],
+                model_version=model_version,
             )
+        await db.commit()
+    except Exception as exc:
+        await db.rollback()
+        logger.warning("Failed to classify news on ingest: %s", exc)
+        return news
+
+    categories = {
+        item.news_id: item.category
+        for item in assignments
+        if item.category is not None and item.news_id in updated_ids
+    }
+    logger.info(
+        "Classified on ingest: %d of %d items",
+        len(categories),
+        len(news),
+    )
+    return [
+        obj.model_copy(update={"category": categories[obj.id]})
+        if obj.id in categories
+        else obj
+        for obj in news
+    ]
+
+
+@celery_app.task(name="apply_search_retention")
+def apply_search_retention_task() -> None:
+    expired = asyncio.run(apply_search_retention())
+    logger.info(
+        "Search retention removed %d partitions", len(expired)
+    )
@@ -1,25 +1,66 @@
 import logging
 import sys
+from datetime import datetime, timezone
 from pathlib import Path
 
 from src.schemas.enums import NewsCategory
+from src.schemas.news import NewsResponseDTO
 
 sys.path.append(str(Path(__file__).parent.parent.parent))
 
 from elastic_transport import ObjectApiResponse
 from elasticsearch import AsyncElasticsearch
 
-from src.config import settings
+from src.config import ESMappingProfile, settings
+from src.utils.exceptions import SearchIndexNotPartitionedError
 
 logger = logging.getLogger("src.utils.es_manager")
 
+NEWS_SOURCE_FIELDS = list(NewsResponseDTO.model_fields)
+SUGGEST_SOURCE_FIELDS = ["id", "title"]
+MAX_ROUTED_PARTITIONS = 24
+
+
+def _month_index(dt: datetime) -> int:
+    return dt.year * 12 + dt.month - 1
+
+
+def _parse_es_date(value) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, (int, float)):
+        # значения сортировки ES для дат приходят в миллисекундах
+        return datetime.fromtimestamp(
+            value / 1000, tz=timezone.utc
+        ).replace(tzinfo=None)
+    return datetime.fromisoformat(str(value))
+
 
 class ESManager:
     _runtime_enabled: bool = True
+    _shared_client: AsyncElasticsearch | None = None
+    # есть ли created_at в маппинге индекса, по имени индекса
+    _checkpoint_mapped: dict[str, bool] = {}
 
-    def __init__(self, index_name: str):
+    def __init__(
+        self,
+        index_name: str,
+        mapping_profile: ESMappingProfile | None = None,
+        partitioned: bool | None = None,
+        create_index: bool = True,
+    ):
         self._dsn: str = settings.get_elasticsearch_url
         self._index: str = index_name
+        self._mapping_profile: ESMappingProfile = (
+            mapping_profile or settings.ES_MAPPING_PROFILE
+        )
+        self._partitioned: bool = (
+            settings.ES_MONTHLY_INDICES
+            if partitioned is None
+            else partitioned
+        )
+        # False, когда индекс всё равно пересоздаётся recreate_index
+        self._create_on_enter = create_index
 
     @classmethod
     def is_enabled(cls) -> bool:
@@ -32,6 +73,30 @@ class ESManager:
     @classmethod
     def enable_runtime(cls) -> None:
         cls._runtime_enabled = True
+
+    @classmethod
+    def shared(cls, index_name: str) -> "ESManager":
+        """
+        Менеджер на общем для процесса клиенте для частых коротких
+        запросов API: без нового соединения, ping и проверки
+        индекса на каждый вызов. Повторов нет, ожиданием управляет
+        вызывающий код.
+        """
+        if cls._shared_client is None:
+            cls._shared_client = AsyncElasticsearch(
+                settings.get_elasticsearch_url,
+                request_timeout=30,
+                max_retries=0,
+            )
+        manager = cls(index_name=index_name)
+        manager._client = cls._shared_client
+        return manager
+
+    @classmethod
+    async def close_shared(cls) -> None:
+        if cls._shared_client is not None:
+            await cls._shared_client.close()
+            cls._shared_client = None
 
     async def connection_is_stable(self) -> bool:
         if getattr(self, "_client", None) is None:
@@ -63,7 +128,8 @@ class ESManager:
 
         self.enable_runtime()
         logger.info("Successfully connected to Elasticsearch...")
-        await self._create_index()
+        if self._create_on_enter:
+            await self._create_index()
         return self
 
     async def delete_index(
@@ -83,58 +149,180 @@ class ESManager:
             raise
 
     async def recreate_index(self) -> None:
-        await self.delete_index(index_name=self._index)
+        if self._partitioned:
+            # сначала партиции: вместе с ними уходит алиас, а
+            # обычный индекс с тем же именем удаляется следом
+            partitions = await self.get_partitions()
+            for index_name in [*partitions, self._index]:
+                await self.delete_index(index_name=index_name)
+            await self._client.options(
+                ignore_status=404
+            ).indices.delete_index_template(
+                name=self._template_name
+            )
+        else:
+            await self.delete_index(index_name=self._index)
+        self._checkpoint_mapped.pop(self._index, None)
         await self._create_index()
 
-    async def _create_index(self):
-        if await self._client.indices.exists(index=self._index):
-            return
+    async def refresh(self) -> None:
+        """Делает проиндексированные документы видимыми поиску."""
+        await self._client.indices.refresh(
+            index=self._index, ignore_unavailable=True
+        )
 
-        config = {
-            "settings": {
-                "index": {
-                    "number_of_shards": 1,
-                    "number_of_replicas": 0,
-                    "refresh_interval": "30s",
-                },
-            },
+    @property
+    def _template_name(self) -> str:
+        return f"{self._index}-template"
+
+    @property
+    def _partition_pattern(self) -> str:
+        return f"{self._index}-*"
+
+    def _partition_name(self, month_index: int) -> str:
+        year, month = divmod(month_index, 12)
+        return f"{self._index}-{year:04d}.{month + 1:02d}"
+
+    def _write_index(self, document: dict) -> str:
+        if not self._partitioned:
+            return self._index
+        published = _parse_es_date(document["published"])
+        return self._partition_name(_month_index(published))
+
+    async def get_partitions(self) -> list[str]:
+        response = await self._client.indices.get_alias(
+            index=self._partition_pattern,
+            ignore_unavailable=True,
+            allow_no_indices=True,
+        )
+        return sorted(response.body.keys())
+
+    def _route_partitions(
+        self,
+        published_from: datetime | None,
+        published_to: datetime | None,
+        search_after: list | None,
+        recent_first: bool,
+    ) -> list[str] | None:
+        lower = published_from
+        upper = published_to
+        if search_after:
+            cursor = _parse_es_date(search_after[0])
+            if recent_first:
+                upper = min(upper, cursor) if upper else cursor
+            else:
+                lower = max(lower, cursor) if lower else cursor
+
+        current = _month_index(
+            datetime.now(timezone.utc).replace(tzinfo=None)
+        )
+        first = _month_index(lower) if lower else None
+        # запас в один месяц на даты публикации "из будущего"
+        last = _month_index(upper) if upper else current + 1
+        if settings.ES_RETENTION_MONTHS > 0:
+            oldest = current - settings.ES_RETENTION_MONTHS + 1
+            first = oldest if first is None else max(first, oldest)
+
+        if first is None or last - first >= MAX_ROUTED_PARTITIONS:
+            return None
+        return [
+            self._partition_name(month)
+            for month in range(first, last + 1)
+        ]
+
+    async def enforce_retention(self) -> list[str]:
+        if (
+            not self._partitioned
+            or settings.ES_RETENTION_MONTHS <= 0
+        ):
+            return []
+
+        current = _month_index(
+            datetime.now(timezone.utc).replace(tzinfo=None)
+        )
+        oldest = current - settings.ES_RETENTION_MONTHS + 1
+        expired = [
+            name
+            for name in await self.get_partitions()
+            if name < self._partition_name(oldest)
+        ]
+        for name in expired:
+            await self.delete_index(index_name=name)
+            logger.info(
+                "Deleted expired search partition: %s", name
+            )
+        return expired
+
+    def _build_mappings(self) -> dict:
+        autocomplete = {
+            "type": "text",
+            "analyzer": "autocomplete_analyzer",
+            "search_analyzer": "search_analyzer",
         }
-        config["mappings"] = {
+        suggest = {
+            "type": "completion",
+            "analyzer": "search_analyzer",
+        }
+        stored_only = {
+            "type": "keyword",
+            "index": False,
+            "doc_values": False,
+        }
+
+        if self._mapping_profile == "slim":
+            return {
+                "dynamic": False,
+                "properties": {
+                    "id": {"type": "keyword"},
+                    "channel_id": {"type": "keyword"},
+                    "published": {"type": "date"},
+                    "created_at": {"type": "date"},
+                    "title": {
+                        "type": "text",
+                        "analyzer": "russian_analyzer",
+                        "fields": {
+                            "autocomplete": autocomplete,
+                            "suggest": suggest,
+                        },
+                    },
+                    "summary": {
+                        "type": "text",
+                        "analyzer": "russian_analyzer",
+                    },
+                    "category": {"type": "keyword"},
+                    "source": {"type": "keyword"},
+                    "link": stored_only,
+                    "image": stored_only,
+                    "content_hash": stored_only,
+                },
+            }
+
+        return {
             "properties": {
                 "id": {"type": "keyword"},
                 "channel_id": {"type": "keyword"},
                 "published": {"type": "date"},
+                "created_at": {"type": "date"},
                 "title": {
                     "type": "text",
                     "analyzer": "russian_analyzer",
                     "fields": {
                         "keyword": {"type": "keyword"},
-                        "autocomplete": {
-                            "type": "text",
-                            "analyzer": "autocomplete_analyzer",
-                            "search_analyzer": "search_analyzer",
-                        },
+                        "autocomplete": autocomplete,
+                        "suggest": suggest,
                     },
                 },
                 "summary": {
                     "type": "text",
                     "analyzer": "russian_analyzer",
-                    "fields": {
-                        "autocomplete": {
-                            "type": "text",
-                            "analyzer": "autocomplete_analyzer",
-                            "search_analyzer": "search_analyzer",
-                        }
-                    },
+                    "fields": {"autocomplete": autocomplete},
                 },
                 "category": {
                     "type": "keyword",
-                    "analyzer": "russian_analyzer",
                     "fields": {"keyword": {"type": "keyword"}},
                 },
                 "source": {
                     "type": "keyword",
-                    "analyzer": "russian_analyzer",
                     "fields": {"keyword": {"type": "keyword"}},
                 },
                 "link": {"type": "keyword"},
@@ -142,6 +330,24 @@ class ESManager:
                 "content_hash": {"type": "keyword"},
             }
         }
+
+    @property
+    def _autocomplete_fields(self) -> list[str]:
+        if self._mapping_profile == "slim":
+            return ["title.autocomplete^2"]
+        return ["title.autocomplete^2", "summary.autocomplete"]
+
+    def _build_index_config(self) -> dict:
+        config = {
+            "settings": {
+                "index": {
+                    "number_of_shards": 1,
+                    "number_of_replicas": 0,
+                    "refresh_interval": "30s",
+                },
+            },
+        }
+        config["mappings"] = self._build_mappings()
         config["settings"]["analysis"] = {
             "analyzer": {
                 "russian_analyzer": {
@@ -181,6 +387,17 @@ class ESManager:
             },
         }
 
+        return config
+
+    async def _create_index(self):
+        if self._partitioned:
+            await self._create_template()
+            return
+
+        if await self._client.indices.exists(index=self._index):
+            return
+
+        config = self._build_index_config()
         try:
             return await self._client.options(
                 ignore_status=400
@@ -197,6 +414,45 @@ class ESManager:
             )
             raise
 
+    async def _create_template(self):
+        # шаблон вешает на месячные индексы алиас с именем индекса:
+        # пока это имя занято обычным индексом, ни одна партиция
+        # не создастся, и шаблон ставить бессмысленно
+        if await self._client.indices.exists(
+            index=self._index
+        ) and not await self._client.indices.exists_alias(
+            name=self._index
+        ):
+            raise SearchIndexNotPartitionedError(
+                f"Index '{self._index}' is not an alias, monthly "
+                "partitions cannot be attached. Set "
+                "ES_RESET_INDEX=true to rebuild it as partitions."
+            )
+
+        if await self._client.indices.exists_index_template(
+            name=self._template_name
+        ):
+            return
+
+        config = self._build_index_config()
+        try:
+            return await self._client.indices.put_index_template(
+                name=self._template_name,
+                index_patterns=[self._partition_pattern],
+                template={
+                    "settings": config["settings"],
+                    "mappings": config["mappings"],
+                    "aliases": {self._index: {}},
+                },
+            )
+        except Exception as e:
+            logger.error(
+                "Failed to create index template: %s; error: %s",
+                self._template_name,
+                e,
+            )
+            raise
+
     async def add(
         self,
         data: list[dict],
@@ -215,7 +471,7 @@ class ESManager:
             operations.append(
                 {
                     "index": {
-                        "_index": self._index,
+                        "_index": self._write_index(item),
                         "_id": str(news_id),
                     }
                 }
@@ -224,7 +480,6 @@ class ESManager:
 
         try:
             response = await self._client.bulk(
-                index=self._index,
                 operations=operations,
                 refresh="wait_for" if refresh else False,
             )
@@ -251,6 +506,57 @@ class ESManager:
             )
         return response
 
+    async def update(
+        self,
+        data: list[dict],
+        fields: list[str],
+        refresh: bool = False,
+    ) -> ObjectApiResponse | None:
+        """
+        Частичное обновление полей fields. Документам нужны id и
+        published, по дате выбирается месячный индекс.
+        """
+        if not data:
+            return None
+
+        operations = []
+        for item in data:
+            operations.append(
+                {
+                    "update": {
+                        "_index": self._write_index(item),
+                        "_id": str(item["id"]),
+                    }
+                }
+            )
+            operations.append(
+                {"doc": {field: item[field] for field in fields}}
+            )
+
+        try:
+            response = await self._client.bulk(
+                operations=operations,
+                refresh="wait_for" if refresh else False,
+            )
+        except Exception as e:
+            logger.error(
+                "Failed to bulk update: %s; error: %s",
+                self._index,
+                e,
+            )
+            raise
+
+        if response.get("errors"):
+            error_items = [
+                item
+                for item in response["items"]
+                if "error" in item.get("update", {})
+            ]
+            logger.warning(
+                "Bulk update had %d errors", len(error_items)
+            )
+        return response
+
     async def search(
         self,
         limit: int,
@@ -260,6 +566,9 @@ class ESManager:
         channel_ids: list[int] | None = None,
         search_after: list | None = None,
         recent_first: bool = True,
+        published_from: datetime | None = None,
+        published_to: datetime | None = None,
+        track_total_hits: bool = True,
         # offset: int = 0,
     ) -> tuple[int, list[dict], list | None]:
         must_clauses = {"match_all": {}}
@@ -291,10 +600,7 @@ class ESManager:
                         {
                             "multi_match": {
                                 "query": query_string,
-                                "fields": [
-                                    "title.autocomplete^2",
-                                    "summary.autocomplete",
-                                ],
+                                "fields": self._autocomplete_fields,
                                 "type": "phrase_prefix",
                             }
                         },
@@ -366,6 +672,16 @@ class ESManager:
                 }
             )
 
+        if published_from or published_to:
+            published_range = {}
+            if published_from:
+                published_range["gte"] = published_from.isoformat()
+            if published_to:
+                published_range["lte"] = published_to.isoformat()
+            filter_clauses.append(
+                {"range": {"published": published_range}}
+            )
+
         query_map = {
             "query": {
                 "bool": {
@@ -383,11 +699,23 @@ class ESManager:
                     }
                 }
             ],
-            "track_total_hits": True,
+            "track_total_hits": track_total_hits,
         }
 
+        partitions = None
+        if self._partitioned:
+            partitions = self._route_partitions(
+                published_from=published_from,
+                published_to=published_to,
+                search_after=search_after,
+                recent_first=recent_first,
+            )
+
         response = await self._client.search(
-            index=self._index,
+            index=",".join(partitions) if partitions else self._index,
+            source_includes=NEWS_SOURCE_FIELDS,
+            ignore_unavailable=True,
+            allow_no_indices=True,
             **query_map,
             # body=query_map,
         )
@@ -406,5 +734,86 @@ class ESManager:
 
         return total, results, last_hit
 
+    async def _has_created_at_mapping(self) -> bool:
+        cached = self._checkpoint_mapped.get(self._index)
+        if cached is not None:
+            return cached
+        response = await self._client.indices.get_field_mapping(
+            index=self._index,
+            fields="created_at",
+            ignore_unavailable=True,
+            allow_no_indices=True,
+        )
+        missing = [
+            name
+            for name, item in response.body.items()
+            if not item.get("mappings")
+        ]
+        if missing:
+            logger.warning(
+                "No created_at mapping in %s, hybrid search is off "
+                "until reindex with ES_RESET_INDEX=true",
+                ", ".join(sorted(missing)),
+            )
+        mapped = bool(response.body) and not missing
+        self._checkpoint_mapped[self._index] = mapped
+        return mapped
+
+    async def sync_checkpoint(self) -> datetime | None:
+        """
+        Дата создания последнего проиндексированного документа.
+        None, если индекс пуст или создан без created_at в маппинге
+        (slim-профиль до гибридного поиска): тогда догружать свежие
+        новости из PostgreSQL нельзя, выборки пересекутся.
+        """
+        if not await self._has_created_at_mapping():
+            return None
+        response = await self._client.search(
+            index=self._index,
+            size=0,
+            aggs={"checkpoint": {"max": {"field": "created_at"}}},
+            ignore_unavailable=True,
+            allow_no_indices=True,
+        )
+        value = (
+            response.get("aggregations", {})
+            .get("checkpoint", {})
+            .get("value")
+        )
+        if value is None:
+            return None
+        return _parse_es_date(value)
+
+    async def suggest(
+        self,
+        prefix: str,
+        limit: int,
+    ) -> list[dict]:
+        response = await self._client.search(
+            index=self._index,
+            source_includes=SUGGEST_SOURCE_FIELDS,
+            size=0,
+            suggest={
+                "titles": {
+                    "prefix": prefix,
+                    "completion": {
+                        "field": "title.suggest",
+                        "size": limit,
+                        "skip_duplicates": True,
+                    },
+                }
+            },
+        )
+
+        suggestions = response.get("suggest", {}).get(
+            "titles", []
+        )
+        if not suggestions:
+            return []
+        return [
+            option["_source"]
+            for option in suggestions[0].get("options", [])
+        ]
+
     async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
         await self._client.close()
@@ -21,6 +21,10 @@ class MissingTablesError(ApplicationError):
         super().__init__(self.detail)
 
 
+class SearchIndexNotPartitionedError(ApplicationError):
+    detail = "Search index is not partitioned"
+
+
 class AlreadyAssignedCategoryError(ApplicationError):
     detail = "Provided already assigned category"
 
@@ -45,10 +49,6 @@ class ObjectExistsError(ApplicationError):
     detail = "Object already exists"
 
 
-class DenormalizedNewsAlreadyExistsError(ObjectExistsError):
-    detail = "Denormalized news already exists"
-
-
 class ChannelExistsError(ObjectExistsError):
     detail = "Channel already exists"
 
@@ -101,6 +101,14 @@ class ModelAlreadyTrainingError(ObjectExistsError):
     detail = "Model is currently training"
 
 
+class ModelNotReadyError(ApplicationError):
+    detail = "Classification model is not ready"
+
+
+class InferenceOverloadedError(ApplicationError):
+    detail = "Prediction queue is full, try again later"
+
+
 class MissingCSVHeadersError(ApplicationError):
     detail = "Missing CSV headers"
 
@@ -146,11 +154,6 @@ class AlreadyAssignedCategoryHTTPError(ApplicationHTTPError):
     status_code = status.HTTP_400_BAD_REQUEST
 
 
-class DenormalizedNewsAlreadyExistsHTTPError(ApplicationHTTPError):
-    detail = "Denormalized news already exists"
-    status_code = status.HTTP_409_CONFLICT
-
-
 class SubNotFoundHTTPError(ApplicationHTTPError):
     detail = "Subscription not found"
     status_code = status.HTTP_404_NOT_FOUND
@@ -258,3 +261,18 @@ class ModelAlreadyTrainingHTTPError(ApplicationHTTPError):
 class TrainingNotFoundHTTPError(ApplicationHTTPError):
     detail = "Training not found"
     status_code = status.HTTP_404_NOT_FOUND
+
+
+class ModelNotReadyHTTPError(ApplicationHTTPError):
+    detail = "Classification model is not ready"
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+
+
+class InferenceOverloadedHTTPError(ApplicationHTTPError):
+    detail = "Prediction queue is full, try again later"
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+
+
+class EmptyPredictionInputHTTPError(ApplicationHTTPError):
+    detail = "Text is empty after normalization"
+    status_code = status.HTTP_422_UNPROCESSABLE_CONTENT
@@ -14,7 +14,11 @@ class RedisManager:
 
     async def connect(self) -> Redis:
         self.redis_obj = Redis(host=self.host, port=self.port)
-        await self.redis_obj.ping()  # type: ignore
+        try:
+            await self.redis_obj.ping()  # type: ignore
+        except Exception:
+            self.redis_obj = None
+            raise
         return self.redis_obj
 
     @property
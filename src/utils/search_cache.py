@@ -0,0 +1,109 @@
+import logging
+from datetime import datetime
+from typing import Any
+
+from redis.asyncio import Redis
+
+from src.config import settings
+from src.schemas.enums import NewsCategory
+from src.utils.redis_manager import redis_manager
+from src.utils.ttl_cache import TTLCache
+
+logger = logging.getLogger("src.utils.search_cache")
+
+GENERATION_KEY = "ffusion:news-search:generation"
+
+
+class NewsSearchCache:
+    """
+    Кэш первых страниц выдачи новостей по нормализованным фильтрам.
+
+    Ключ включает номер поколения: загрузка новостей или смена
+    категорий увеличивает его, и все старые записи перестают
+    совпадать. Поколение хранится в Redis, общем для API и
+    Celery. Без Redis (или пока он недоступен) кэш не работает:
+    локальный счётчик не увидел бы новостей, загруженных
+    воркером.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    @staticmethod
+    def make_key(
+        limit: int,
+        query_string: str | None,
+        categories: list[NewsCategory] | None,
+        without_category: bool,
+        channel_ids: list[int] | None,
+        recent_first: bool,
+        published_from: datetime | None,
+        published_to: datetime | None,
+    ) -> tuple:
+        query = " ".join((query_string or "").lower().split())
+        return (
+            limit,
+            query,
+            tuple(sorted({c.value for c in categories or ()})),
+            without_category,
+            tuple(sorted(set(channel_ids or ()))),
+            recent_first,
+            published_from.isoformat() if published_from else None,
+            published_to.isoformat() if published_to else None,
+        )
+
+    async def generation(self) -> int | None:
+        """Текущее поколение или None, если кэш недоступен."""
+        if (
+            not settings.USE_REDIS_CACHE
+            or redis_manager.redis_obj is None
+        ):
+            return None
+        try:
+            value = await redis_manager.redis.get(GENERATION_KEY)
+        except Exception as exc:
+            logger.warning(
+                "Failed to read search cache generation: %s", exc
+            )
+            return None
+        return int(value or 0)
+
+    async def get(self, key: tuple) -> Any | None:
+        generation = await self.generation()
+        if generation is None:
+            return None
+        return self._entries.get((generation, key))
+
+    async def set(self, key: tuple, value: Any) -> None:
+        generation = await self.generation()
+        if generation is None:
+            return
+        self._entries.set((generation, key), value)
+
+    async def invalidate(self) -> None:
+        self._entries.clear()
+        if not settings.USE_REDIS_CACHE:
+            return
+
+        try:
+            if redis_manager.redis_obj is not None:
+                await redis_manager.redis.incr(GENERATION_KEY)
+                return
+            # процессы Celery не держат постоянного подключения
+            client = Redis(
+                host=settings.REDIS_HOST, port=settings.REDIS_PORT
+            )
+            try:
+                await client.incr(GENERATION_KEY)
+            finally:
+                await client.aclose()
+        except Exception as exc:
+            logger.warning(
+                "Failed to bump search cache generation: %s", exc
+            )
+
+
+news_search_cache = NewsSearchCache(
+    maxsize=settings.NEWS_SEARCH_CACHE_SIZE,
+    ttl=settings.NEWS_SEARCH_CACHE_TTL_SEC,
+)
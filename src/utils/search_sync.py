@@ -32,6 +32,50 @@ async def sync_news_documents(
     return True
 
 
+async def update_news_fields(
+    documents: list[dict],
+    fields: list[str],
+    *,
+    refresh: bool = False,
+) -> bool:
+    if not ESManager.is_enabled() or not documents:
+        return False
+
+    try:
+        async with ESManager(
+            index_name=settings.ES_INDEX_NAME
+        ) as es:
+            await es.update(
+                data=documents, fields=fields, refresh=refresh
+            )
+    except Exception as exc:
+        ESManager.disable_runtime()
+        logger.warning(
+            "Search partial update failed: %s",
+            exc,
+        )
+        return False
+
+    return True
+
+
+async def refresh_news_index() -> bool:
+    if not ESManager.is_enabled():
+        return False
+
+    try:
+        async with ESManager(
+            index_name=settings.ES_INDEX_NAME
+        ) as es:
+            await es.refresh()
+    except Exception as exc:
+        ESManager.disable_runtime()
+        logger.warning("Search index refresh failed: %s", exc)
+        return False
+
+    return True
+
+
 async def rebuild_search_index(
     *,
     reset_index: bool = False,
@@ -47,7 +91,8 @@ async def rebuild_search_index(
         ]
 
         async with ESManager(
-            index_name=settings.ES_INDEX_NAME
+            index_name=settings.ES_INDEX_NAME,
+            create_index=not reset_index,
         ) as es:
             if reset_index:
                 await es.recreate_index()
@@ -65,3 +110,18 @@ async def rebuild_search_index(
         len(documents),
     )
     return True
+
+
+async def apply_search_retention() -> list[str]:
+    if not ESManager.is_enabled():
+        return []
+
+    try:
+        async with ESManager(
+            index_name=settings.ES_INDEX_NAME
+        ) as es:
+            return await es.enforce_retention()
+    except Exception as exc:
+        ESManager.disable_runtime()
+        logger.warning("Search retention failed: %s", exc)
+        return []
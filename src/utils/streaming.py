@@ -0,0 +1,88 @@
+import asyncio
+from typing import AsyncIterator, Callable, Mapping
+
+from starlette.background import BackgroundTask
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+BodyHandler = Callable[[AsyncIterator[bytes]], AsyncIterator[bytes]]
+
+# чанков тела впереди обработчика: дальше uvicorn перестаёт
+# читать сокет, и клиент упирается в backpressure
+BODY_QUEUE_SIZE = 16
+
+
+class BodyStreamingResponse(StreamingResponse):
+    """
+    Потоковый ответ, который читает тело запроса одновременно с
+    отправкой ответа. StreamingResponse ждёт http.disconnect через
+    свой receive() и при этом забирает чанки тела, поэтому здесь
+    receive() вызывает только одна задача: чанки идут в handler
+    через ограниченную очередь, а после конца тела задача ждёт
+    отключения клиента и останавливает ответ.
+    """
+
+    def __init__(
+        self,
+        handler: BodyHandler,
+        status_code: int = 200,
+        headers: Mapping[str, str] | None = None,
+        media_type: str | None = None,
+        background: BackgroundTask | None = None,
+        queue_size: int = BODY_QUEUE_SIZE,
+    ) -> None:
+        self.handler = handler
+        self.queue_size = queue_size
+        self.status_code = status_code
+        self.media_type = (
+            self.media_type if media_type is None else media_type
+        )
+        self.background = background
+        self.init_headers(headers)
+
+    async def __call__(
+        self, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        queue: asyncio.Queue[bytes | None] = asyncio.Queue(
+            self.queue_size
+        )
+
+        async def read_body() -> None:
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    return
+                body = message.get("body", b"")
+                if body:
+                    await queue.put(body)
+                if not message.get("more_body", False):
+                    break
+            await queue.put(None)
+            while (await receive())["type"] != "http.disconnect":
+                pass
+
+        async def chunks() -> AsyncIterator[bytes]:
+            while (chunk := await queue.get()) is not None:
+                yield chunk
+
+        self.body_iterator = self.handler(chunks())
+        reader = asyncio.create_task(read_body())
+        writer = asyncio.create_task(self.stream_response(send))
+        try:
+            # отключение клиента завершает reader, конец ответа
+            # завершает writer: вторую задачу отменяем
+            done, _ = await asyncio.wait(
+                (reader, writer),
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+        finally:
+            for task in (reader, writer):
+                task.cancel()
+            await asyncio.gather(
+                reader, writer, return_exceptions=True
+            )
+        for task in done:
+            task.result()
+
+        if self.background is not None:
+            await self.background()
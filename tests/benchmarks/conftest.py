@@ -0,0 +1,58 @@
+"""
+Фикстуры бенчмарк-сьюта src/ml. Тесты помечены benchmark и по
+умолчанию не собираются (addopts в pytest.ini).
+
+Окружение:
+
+    ML_BENCH_SAMPLES   размер среза датасета (5000)
+    ML_BENCH_REPORT    куда писать отчёт (bench_report.json)
+    ML_BENCH_BASELINE  отчёт для сравнения; без него проверок нет
+"""
+
+import os
+from typing import Iterator
+
+import pytest
+
+from src.config import settings
+from src.ml.io_utils import load_json
+
+from tests.benchmarks.ml_suite import (
+    BenchReport,
+    Split,
+    TrainedModel,
+    load_split,
+    train_model,
+)
+
+
+@pytest.fixture(scope="session")
+def bench_report() -> Iterator[BenchReport]:
+    baseline_path = os.environ.get("ML_BENCH_BASELINE")
+    baseline = load_json(baseline_path) if baseline_path else None
+    report = BenchReport(baseline)
+    yield report
+    report.dump(
+        os.environ.get("ML_BENCH_REPORT", "bench_report.json")
+    )
+
+
+@pytest.fixture(scope="session")
+def bench_samples() -> Split:
+    path = settings.TRAIN_DATASET_LOCATION
+    if not os.path.exists(path):
+        pytest.skip(f"dataset is missing: {path}")
+    return load_split(
+        path, size=int(os.environ.get("ML_BENCH_SAMPLES", 5000))
+    )
+
+
+@pytest.fixture(scope="session")
+def trained_model(
+    tmp_path_factory: pytest.TempPathFactory,
+    bench_samples: Split,
+) -> TrainedModel:
+    train, _ = bench_samples
+    return train_model(
+        train, model_dir=str(tmp_path_factory.mktemp("bench_model"))
+    )
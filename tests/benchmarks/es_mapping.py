@@ -0,0 +1,133 @@
+"""
+Сравнение профилей маппинга Elasticsearch: размер индекса и
+задержка поиска.
+
+Запуск (нужны PostgreSQL с новостями и Elasticsearch):
+
+    poetry run python -m tests.benchmarks.es_mapping --queries 200
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from typing import get_args
+
+from src.config import ESMappingProfile, settings
+from src.db import sessionmaker_null_pool
+from src.utils.db_tools import DBManager
+from src.utils.es_manager import ESManager
+
+from tests.benchmarks.stats import percentile
+
+
+def _sample_queries(
+    documents: list[dict], count: int, seed: int
+) -> list[str]:
+    rng = random.Random(seed)
+    queries: list[str] = []
+    for _ in range(count):
+        words = rng.choice(documents)["title"].split()
+        if not words:
+            continue
+        size = rng.randint(1, min(3, len(words)))
+        start = rng.randint(0, len(words) - size)
+        query = " ".join(words[start : start + size])
+        if rng.random() < 0.5:
+            # неполное последнее слово, как при наборе текста
+            query = query[: max(2, len(query) - 2)]
+        queries.append(query)
+    return queries
+
+
+async def _bench_profile(
+    profile: ESMappingProfile,
+    documents: list[dict],
+    queries: list[str],
+    limit: int,
+) -> dict:
+    index_name = f"bench-{profile}-{settings.ES_INDEX_NAME}"
+    async with ESManager(
+        index_name=index_name,
+        mapping_profile=profile,
+        partitioned=False,
+    ) as es:
+        await es.recreate_index()
+        started = time.perf_counter()
+        for idx in range(0, len(documents), 1000):
+            await es.add(data=documents[idx : idx + 1000])
+        index_time = time.perf_counter() - started
+
+        client = es._client
+        await client.indices.refresh(index=index_name)
+        await client.indices.forcemerge(
+            index=index_name, max_num_segments=1
+        )
+        stats = await client.indices.stats(
+            index=index_name, metric="store"
+        )
+        store_bytes = stats["_all"]["primaries"]["store"][
+            "size_in_bytes"
+        ]
+
+        latencies: list[float] = []
+        for query in queries:
+            started = time.perf_counter()
+            await es.search(limit=limit, query_string=query)
+            latencies.append(
+                (time.perf_counter() - started) * 1000
+            )
+
+        await es.delete_index(index_name=index_name)
+
+    return {
+        "profile": profile,
+        "documents": len(documents),
+        "store_mb": store_bytes / 1024 / 1024,
+        "index_sec": index_time,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    async with DBManager(
+        session_factory=sessionmaker_null_pool
+    ) as db:
+        rows = await db.news.get_all()
+    documents = [row.model_dump(mode="json") for row in rows]
+    if args.max_docs:
+        documents = documents[: args.max_docs]
+    if not documents:
+        raise SystemExit("No news in the database to index.")
+
+    raw_bytes = sum(len(str(doc).encode()) for doc in documents)
+    queries = _sample_queries(documents, args.queries, args.seed)
+
+    print(
+        f"documents={len(documents)} "
+        f"raw_mb={raw_bytes / 1024 / 1024:.2f} "
+        f"queries={len(queries)}"
+    )
+    for profile in get_args(ESMappingProfile):
+        report = await _bench_profile(
+            profile, documents, queries, args.limit
+        )
+        print(
+            "{profile:>5}: store={store_mb:.2f}MB "
+            "index={index_sec:.2f}s p50={p50_ms:.2f}ms "
+            "p95={p95_ms:.2f}ms p99={p99_ms:.2f}ms".format(
+                **report
+            )
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=9)
+    parser.add_argument("--max-docs", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=42)
+    asyncio.run(main(parser.parse_args()))
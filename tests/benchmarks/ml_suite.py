@@ -0,0 +1,137 @@
+"""
+Общая часть бенчмарк-сьюта src/ml (tests/benchmarks/test_ml.py):
+срез датасета с фиксированным сидом, обучение модели на нём и
+JSON-отчёт с метриками, который сравнивается с базовым.
+"""
+
+import json
+import platform
+import random
+import time
+from typing import NamedTuple
+
+import torch
+
+from src.config import settings
+from src.ml.io_utils import load_samples_from_csv
+from src.ml.prediction import ModelPredictor
+from src.ml.training import ModelTrainer
+from src.ml.vocab import split_indices
+from src.schemas.ml import TrainingSample
+
+SEED = 42
+
+# допустимое ухудшение относительно базового отчёта: для скорости
+# в долях, для качества в абсолютных пунктах
+SPEED_TOLERANCE = 0.25
+QUALITY_TOLERANCE = 0.02
+
+# (train, test)
+Split = tuple[list[TrainingSample], list[TrainingSample]]
+
+
+class BenchReport:
+    def __init__(self, baseline: dict | None):
+        self.baseline = baseline or {}
+        self.metrics: dict[str, float] = {}
+
+    def record(
+        self,
+        name: str,
+        value: float,
+        higher_is_better: bool = True,
+        quality: bool = False,
+    ) -> None:
+        """
+        Сохраняет метрику и, если есть базовый отчёт, проверяет,
+        что она не ухудшилась больше допуска.
+        """
+        self.metrics[name] = value
+        base = self.baseline.get("metrics", {}).get(name)
+        if base is None:
+            return
+        if quality:
+            limit = (
+                base - QUALITY_TOLERANCE
+                if higher_is_better
+                else base + QUALITY_TOLERANCE
+            )
+        else:
+            limit = (
+                base * (1 - SPEED_TOLERANCE)
+                if higher_is_better
+                else base * (1 + SPEED_TOLERANCE)
+            )
+        regressed = (
+            value < limit if higher_is_better else value > limit
+        )
+        assert not regressed, (
+            f"{name} regressed: {value:.4f} vs baseline {base:.4f}"
+        )
+
+    def dump(self, path: str) -> None:
+        payload = {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "torch": torch.__version__,
+            "threads": torch.get_num_threads(),
+            "metrics": self.metrics,
+        }
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(payload, file, ensure_ascii=False, indent=2)
+
+
+class TrainedModel(NamedTuple):
+    predictor: ModelPredictor
+    samples_per_sec: float
+
+
+def load_split(path: str, size: int) -> Split:
+    """Срез датасета, одинаковый от запуска к запуску."""
+    rows = load_samples_from_csv(path)
+    random.Random(SEED).shuffle(rows)
+    samples = [
+        TrainingSample(
+            title=row.title,
+            summary=row.summary,
+            category=row.category.value,
+        )
+        for row in rows[:size]
+    ]
+    train_indices, test_indices = split_indices(
+        size=len(samples), val_split=0.2, seed=SEED
+    )
+    return (
+        [samples[index] for index in train_indices],
+        [samples[index] for index in test_indices],
+    )
+
+
+def train_model(
+    train: list[TrainingSample], model_dir: str
+) -> TrainedModel:
+    config = settings.TRAIN_CONFIG.model_copy(
+        update={
+            "seed": SEED,
+            "epochs": 3,
+            "val_split": 0.1,
+            "patience": 0,
+            "num_workers": 0,
+            "export_quantized": False,
+        }
+    )
+    started = time.perf_counter()
+    result = ModelTrainer(model_dir=model_dir, device="cpu").train(
+        samples=train, config=config, verbose=False
+    )
+    elapsed = time.perf_counter() - started
+    return TrainedModel(
+        predictor=ModelPredictor(
+            model_dir=model_dir,
+            device="cpu",
+            prefer_quantized=False,
+        ),
+        samples_per_sec=(
+            len(train) * result.metrics["epochs_run"] / elapsed
+        ),
+    )
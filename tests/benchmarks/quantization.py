@@ -0,0 +1,93 @@
+"""
+Сравнение float32 модели и квантованной TorchScript-копии на
+валидационной выборке: точность, задержка батча и размер на диске.
+Выборка берётся из validation.json артефактов, те же строки модель
+не видела при обучении.
+
+Запуск (нужны обученные артефакты):
+
+    poetry run python -m tests.benchmarks.quantization
+"""
+
+import argparse
+import os
+import statistics
+import time
+
+from src.config import settings
+from src.ml.artifacts import ArtifactStore
+from src.ml.prediction import ModelPredictor
+from src.schemas.ml import PredictionInput
+
+
+def _bench(
+    predictor: ModelPredictor,
+    payloads: list[PredictionInput],
+    expected: list[str],
+    batch_size: int,
+) -> dict:
+    latencies: list[float] = []
+    correct = 0
+    for idx in range(0, len(payloads), batch_size):
+        batch = payloads[idx : idx + batch_size]
+        started = time.perf_counter()
+        results = predictor.predict_raw(batch)
+        latencies.append((time.perf_counter() - started) * 1000)
+        correct += sum(
+            result["category"] == label
+            for result, label in zip(
+                results, expected[idx : idx + batch_size]
+            )
+        )
+    return {
+        "accuracy": correct / len(payloads),
+        "p50_ms": statistics.median(latencies),
+        "max_ms": max(latencies),
+    }
+
+
+def main(args: argparse.Namespace) -> None:
+    store = ArtifactStore(model_dir=args.model_dir).resolve()
+    if not os.path.exists(store.quantized_model_path):
+        raise SystemExit("Quantized artifact is missing, retrain.")
+
+    validation = store.load_validation()
+    if not validation:
+        raise SystemExit(
+            "No stored validation split, retrain with val_split > 0"
+        )
+    # текст уже нормализован при обучении, summary не нужен
+    payloads = [
+        PredictionInput(news_id=index, title=text, summary="")
+        for index, (text, _) in enumerate(validation)
+    ]
+    expected = [label for _, label in validation]
+
+    print(
+        f"val={len(payloads)} batch={args.batch_size} "
+        f"float_mb={os.path.getsize(store.model_path) / 2**20:.2f} "
+        f"int8_mb="
+        f"{os.path.getsize(store.quantized_model_path) / 2**20:.2f}"
+    )
+    for name, quantized in (("float32", False), ("int8", True)):
+        predictor = ModelPredictor(
+            model_dir=args.model_dir,
+            device="cpu",
+            prefer_quantized=quantized,
+        )
+        report = _bench(
+            predictor, payloads, expected, args.batch_size
+        )
+        print(
+            "{name:>7}: accuracy={accuracy:.4f} "
+            "p50={p50_ms:.2f}ms max={max_ms:.2f}ms".format(
+                name=name, **report
+            )
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model-dir", default=settings.model_dir)
+    parser.add_argument("--batch-size", type=int, default=64)
+    main(parser.parse_args())
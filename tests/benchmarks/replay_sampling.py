@@ -0,0 +1,141 @@
+"""
+Replay-выборка для дообучения: ORDER BY random() против
+стратифицированной выборки через TABLESAMPLE. Замеряется время
+запроса и отклонение долей категорий от генеральной совокупности.
+
+Синтетические строки вставляются в той же транзакции и
+откатываются в конце, таблица не меняется.
+
+Запуск (нужен PostgreSQL с применёнными миграциями):
+
+    poetry run python -m tests.benchmarks.replay_sampling --rows 1000000
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from collections import Counter
+
+from sqlalchemy import func, insert, select
+
+from src.db import sessionmaker_null_pool
+from src.models.news import DenormalizedNews
+from src.schemas.enums import NewsCategory
+from src.schemas.samples import DenormalizedNewsDTO
+from src.utils.db_tools import DBManager
+
+
+async def _seed(db: DBManager, rows: int, seed: int) -> None:
+    rng = random.Random(seed)
+    categories = list(NewsCategory)
+    # несбалансированные классы, как в реальных данных
+    weights = [2**index for index in range(len(categories))]
+    chunk = 10000
+    for start in range(0, rows, chunk):
+        await db.session.execute(
+            insert(DenormalizedNews),
+            [
+                {
+                    "title": f"bench {index}",
+                    "category": rng.choices(categories, weights)[0],
+                    "used_in_training": True,
+                }
+                for index in range(start, min(start + chunk, rows))
+            ],
+        )
+
+
+async def _order_by_random(
+    db: DBManager, limit: int
+) -> list[DenormalizedNewsDTO]:
+    """Прежняя выборка: сортировка всей таблицы по random()."""
+    result = await db.session.execute(
+        select(DenormalizedNews)
+        .filter(DenormalizedNews.used_in_training.is_(True))
+        .order_by(func.random())
+        .limit(limit)
+    )
+    return [
+        db.denorm_news.mapper.map_to_domain_entity(obj)
+        for obj in result.scalars().all()
+    ]
+
+
+def _distance(sample: Counter, population: Counter) -> float:
+    """Total variation distance между долями категорий."""
+    sample_total = sum(sample.values()) or 1
+    population_total = sum(population.values()) or 1
+    return 0.5 * sum(
+        abs(
+            sample[category] / sample_total
+            - population[category] / population_total
+        )
+        for category in population
+    )
+
+
+async def main(args: argparse.Namespace) -> None:
+    async with DBManager(sessionmaker_null_pool) as db:
+        if args.rows:
+            started = time.perf_counter()
+            await _seed(db, args.rows, args.seed)
+            print(
+                f"seeded {args.rows} rows in "
+                f"{time.perf_counter() - started:.1f}s"
+            )
+
+        counts_result = await db.session.execute(
+            select(DenormalizedNews.category, func.count())
+            .filter(DenormalizedNews.used_in_training.is_(True))
+            .group_by(DenormalizedNews.category)
+        )
+        population = Counter(dict(counts_result.all()))
+        print(
+            f"used samples={sum(population.values())} "
+            f"limit={args.limit} repeats={args.repeats}"
+        )
+
+        repo = db.denorm_news
+        methods = {
+            "order_by_random": lambda limit: _order_by_random(
+                db, limit
+            ),
+            "stratified": repo.get_stratified_replay_samples,
+        }
+        for name, method in methods.items():
+            latencies: list[float] = []
+            distances: list[float] = []
+            sizes: list[int] = []
+            for _ in range(args.repeats):
+                started = time.perf_counter()
+                rows = await method(args.limit)
+                latencies.append(
+                    (time.perf_counter() - started) * 1000
+                )
+                sizes.append(len(rows))
+                distances.append(
+                    _distance(
+                        Counter(row.category for row in rows),
+                        population,
+                    )
+                )
+            p50 = statistics.median(latencies)
+            print(
+                f"{name:>16}: p50={p50:.1f}ms "
+                f"max={max(latencies):.1f}ms "
+                f"rows={min(sizes)}..{max(sizes)} "
+                f"tvd={statistics.mean(distances):.4f}"
+            )
+        # синтетические строки не сохраняем
+        await db.rollback()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=0)
+    parser.add_argument("--limit", type=int, default=500)
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,11 @@
+"""Общие расчёты для бенчмарков."""
+
+
+def percentile(values: list[float], percent: float) -> float:
+    """Перцентиль по ближайшему рангу, без интерполяции."""
+    ordered = sorted(values)
+    index = min(
+        int(round(percent / 100 * (len(ordered) - 1))),
+        len(ordered) - 1,
+    )
+    return ordered[index]
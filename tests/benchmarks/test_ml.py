@@ -0,0 +1,175 @@
+"""
+Бенчмарк-сьют src/ml: скорость токенизации, обучения и
+предсказания, качество по категориям. Пишет JSON-отчёт и падает,
+если метрика хуже базового отчёта больше допуска.
+
+Запуск (нужен src/data/dataset.csv и тестовое окружение, как для
+остальных тестов):
+
+    poetry run pytest -m benchmark tests/benchmarks
+    ML_BENCH_BASELINE=baseline.json poetry run pytest -m benchmark tests/benchmarks
+"""
+
+import statistics
+import time
+from collections import Counter
+
+import pytest
+
+from src.ml.encoding import FastEncoder
+from src.ml.text import normalize_title_summary
+from src.schemas.ml import PredictionInput, TrainingSample
+
+from tests.benchmarks.ml_suite import (
+    BenchReport,
+    Split,
+    TrainedModel,
+)
+from tests.benchmarks.stats import percentile
+
+pytestmark = pytest.mark.benchmark
+
+BATCH_SIZE = 64
+LATENCY_ROUNDS = 200
+
+
+def _payloads(
+    samples: list[TrainingSample],
+) -> list[PredictionInput]:
+    return [
+        PredictionInput(
+            news_id=index,
+            title=sample.title,
+            summary=sample.summary or "",
+        )
+        for index, sample in enumerate(samples)
+    ]
+
+
+def test_tokenization_throughput(
+    bench_samples: Split,
+    trained_model: TrainedModel,
+    bench_report: BenchReport,
+):
+    _, test = bench_samples
+    texts = [
+        normalize_title_summary(sample.title, sample.summary or "")
+        for sample in test
+    ]
+    # без кэша, чтобы мерить саму токенизацию
+    encoder = FastEncoder(
+        trained_model.predictor.vocab, cache_size=0
+    )
+    started = time.perf_counter()
+    for idx in range(0, len(texts), BATCH_SIZE):
+        encoder.encode_batch(texts[idx : idx + BATCH_SIZE])
+    elapsed = time.perf_counter() - started
+    bench_report.record(
+        "tokenize_texts_per_sec", len(texts) / elapsed
+    )
+
+
+def test_training_throughput(
+    trained_model: TrainedModel, bench_report: BenchReport
+):
+    bench_report.record(
+        "train_samples_per_sec", trained_model.samples_per_sec
+    )
+
+
+def test_single_prediction_latency(
+    bench_samples: Split,
+    trained_model: TrainedModel,
+    bench_report: BenchReport,
+):
+    _, test = bench_samples
+    payloads = _payloads(test)[:LATENCY_ROUNDS]
+    predictor = trained_model.predictor
+    latencies: list[float] = []
+    for payload in payloads:
+        started = time.perf_counter()
+        predictor.predict(payload)
+        latencies.append((time.perf_counter() - started) * 1000)
+    bench_report.record(
+        "single_p50_ms",
+        statistics.median(latencies),
+        higher_is_better=False,
+    )
+    bench_report.record(
+        "single_p99_ms",
+        percentile(latencies, 99),
+        higher_is_better=False,
+    )
+
+
+def test_batch_prediction_latency(
+    bench_samples: Split,
+    trained_model: TrainedModel,
+    bench_report: BenchReport,
+):
+    _, test = bench_samples
+    payloads = _payloads(test)
+    predictor = trained_model.predictor
+    latencies: list[float] = []
+    for idx in range(0, len(payloads), BATCH_SIZE):
+        started = time.perf_counter()
+        predictor.predict_many(payloads[idx : idx + BATCH_SIZE])
+        latencies.append((time.perf_counter() - started) * 1000)
+    bench_report.record(
+        "batch_p50_ms",
+        statistics.median(latencies),
+        higher_is_better=False,
+    )
+    bench_report.record(
+        "batch_p99_ms",
+        percentile(latencies, 99),
+        higher_is_better=False,
+    )
+
+
+def test_quality(
+    bench_samples: Split,
+    trained_model: TrainedModel,
+    bench_report: BenchReport,
+):
+    _, test = bench_samples
+    payloads = _payloads(test)
+    predicted: list[str] = []
+    for idx in range(0, len(payloads), 256):
+        predicted.extend(
+            result["category"]
+            for result in trained_model.predictor.predict_raw(
+                payloads[idx : idx + 256]
+            )
+        )
+    expected = [sample.category for sample in test]
+
+    true_positive: Counter[str] = Counter()
+    predicted_count = Counter(predicted)
+    expected_count = Counter(expected)
+    for actual, label in zip(predicted, expected):
+        if actual == label:
+            true_positive[label] += 1
+
+    f1_scores: list[float] = []
+    for label in sorted(expected_count):
+        precision = true_positive[label] / max(
+            predicted_count[label], 1
+        )
+        recall = true_positive[label] / expected_count[label]
+        f1 = (
+            2 * precision * recall / (precision + recall)
+            if precision + recall
+            else 0.0
+        )
+        f1_scores.append(f1)
+        bench_report.record(f"f1[{label}]", f1, quality=True)
+
+    bench_report.record(
+        "accuracy",
+        sum(true_positive.values()) / len(expected),
+        quality=True,
+    )
+    bench_report.record(
+        "macro_f1", statistics.mean(f1_scores), quality=True
+    )
@@ -0,0 +1,105 @@
+"""
+Скорость токенизации и кодирования текстов: старый путь через
+списки Python против FastEncoder (без кэша и с прогретым LRU) на
+dict-словаре и на vocab.bin с пробами хэш-таблицы.
+
+Запуск (нужен бутстрап-датасет src/data/dataset.csv):
+
+    poetry run python -m tests.benchmarks.tokenization --batch-size 64
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import torch
+
+from src.config import settings
+from src.ml.encoding import FastEncoder
+from src.ml.io_utils import load_samples_from_csv
+from src.ml.text import normalize_title_summary, tokenize
+from src.ml.vocab import (
+    BinaryVocab,
+    build_vocab,
+    write_binary_vocab,
+)
+
+
+def _encode_lists(texts: list[str], vocab) -> tuple:
+    input_ids: list[int] = []
+    offsets: list[int] = []
+    offset = 0
+    for text in texts:
+        token_ids = vocab.encode(tokenize(text)) or [vocab.unk_idx]
+        offsets.append(offset)
+        input_ids.extend(token_ids)
+        offset += len(token_ids)
+    return (
+        torch.tensor(input_ids, dtype=torch.long),
+        torch.tensor(offsets, dtype=torch.long),
+    )
+
+
+def _bench(encode, texts: list[str], batch_size: int) -> float:
+    started = time.perf_counter()
+    for idx in range(0, len(texts), batch_size):
+        encode(texts[idx : idx + batch_size])
+    return time.perf_counter() - started
+
+
+def main(args: argparse.Namespace) -> None:
+    samples = load_samples_from_csv(args.dataset)
+    texts = [
+        normalize_title_summary(sample.title, sample.summary)
+        for sample in samples
+    ]
+    if not texts:
+        raise SystemExit("Dataset is empty.")
+
+    config = settings.TRAIN_CONFIG
+    vocab = build_vocab(
+        texts=texts,
+        min_freq=config.min_freq,
+        max_size=config.max_vocab,
+    )
+    tokens = sum(len(tokenize(text)) for text in texts)
+    print(
+        f"texts={len(texts)} tokens={tokens} "
+        f"vocab={len(vocab.token_to_idx)} batch={args.batch_size}"
+    )
+
+    cold = FastEncoder(vocab, cache_size=0)
+    warm = FastEncoder(vocab, cache_size=len(texts))
+    warm.encode_batch(texts)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "vocab.bin")
+        write_binary_vocab(vocab, path)
+        binary = FastEncoder(BinaryVocab.open(path), cache_size=0)
+
+    runs = {
+        "lists": lambda batch: _encode_lists(batch, vocab),
+        "fast": cold.encode_batch,
+        "fast+lru": warm.encode_batch,
+        "fast+bin": binary.encode_batch,
+    }
+    for name, encode in runs.items():
+        elapsed = min(
+            _bench(encode, texts, args.batch_size)
+            for _ in range(args.repeat)
+        )
+        print(
+            f"{name:>8}: {elapsed:.3f}s "
+            f"{len(texts) / elapsed:,.0f} texts/s "
+            f"{tokens / elapsed:,.0f} tokens/s"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--dataset", default=settings.TRAIN_DATASET_LOCATION
+    )
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--repeat", type=int, default=3)
+    main(parser.parse_args())
@@ -0,0 +1,77 @@
+"""
+Пропускная способность обучения (samples/sec) для разных настроек
+выполнения: потоки torch, процессы DataLoader и батчи по длине.
+
+Запуск (нужен src/data/dataset.csv):
+
+    poetry run python -m tests.benchmarks.training --threads 1 2 4
+"""
+
+import argparse
+import itertools
+import tempfile
+import time
+
+from src.config import settings
+from src.ml.io_utils import load_samples_from_csv
+from src.ml.training import ModelTrainer
+from src.schemas.ml import TrainingSample
+
+
+def main(args: argparse.Namespace) -> None:
+    samples = [
+        TrainingSample(
+            title=row.title,
+            summary=row.summary,
+            category=row.category.value,
+        )
+        for row in load_samples_from_csv(args.dataset)
+    ]
+    if args.max_samples:
+        samples = samples[: args.max_samples]
+    print(f"samples={len(samples)} epochs={args.epochs}")
+
+    grid = itertools.product(
+        args.threads, args.workers, (False, True)
+    )
+    for num_threads, num_workers, bucket in grid:
+        config = settings.TRAIN_CONFIG.model_copy(
+            update={
+                "epochs": args.epochs,
+                "val_split": 0.0,
+                "export_quantized": False,
+                "num_threads": num_threads,
+                "num_workers": num_workers,
+                "bucket_by_length": bucket,
+            }
+        )
+        with tempfile.TemporaryDirectory() as model_dir:
+            trainer = ModelTrainer(
+                model_dir=model_dir, device="cpu"
+            )
+            started = time.perf_counter()
+            trainer.train(
+                samples=samples, config=config, verbose=False
+            )
+            elapsed = time.perf_counter() - started
+        print(
+            f"threads={num_threads} workers={num_workers} "
+            f"bucket={bucket!s:>5}: {elapsed:.2f}s "
+            f"{len(samples) * args.epochs / elapsed:,.0f} samples/s"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--dataset", default=settings.TRAIN_DATASET_LOCATION
+    )
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--max-samples", type=int, default=0)
+    parser.add_argument(
+        "--threads", type=int, nargs="+", default=[1, 2, 4]
+    )
+    parser.add_argument(
+        "--workers", type=int, nargs="+", default=[0, 2]
+    )
+    main(parser.parse_args())
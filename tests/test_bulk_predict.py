@@ -0,0 +1,126 @@
+import asyncio
+from typing import AsyncIterator
+
+import httpx
+import orjson
+import uvicorn
+from fastapi import FastAPI
+
+from src.ml.bulk import iter_lines, stream_predictions
+from src.schemas.ml import PredictionInput, PredictionResult
+from src.utils.streaming import BodyStreamingResponse
+
+ROWS = 500
+
+
+class EchoPredictor:
+    def predict_many(
+        self,
+        payloads: list[PredictionInput],
+        top_k: int = 3,
+        min_confidence: float | None = None,
+    ) -> list[PredictionResult]:
+        return [
+            PredictionResult(
+                category=payload.title, confidence=1.0, top_k=[]
+            )
+            for payload in payloads
+        ]
+
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/predict")
+    async def predict() -> BodyStreamingResponse:
+        return BodyStreamingResponse(
+            lambda chunks: stream_predictions(
+                chunks,
+                predictor=EchoPredictor(),  # type: ignore
+                fmt="ndjson",
+                batch_size=32,
+            ),
+            media_type="application/x-ndjson",
+        )
+
+    return app
+
+
+async def ndjson_body(rows: int) -> AsyncIterator[bytes]:
+    for i in range(rows):
+        yield orjson.dumps({"id": i, "title": f"news {i}"}) + b"\n"
+        # каждая строка уходит отдельным чанком
+        await asyncio.sleep(0)
+
+
+async def collect(chunks: list[bytes], **kwargs) -> list:
+    async def source() -> AsyncIterator[bytes]:
+        for chunk in chunks:
+            yield chunk
+
+    return [line async for line in iter_lines(source(), **kwargs)]
+
+
+async def test_iter_lines_joins_split_chunks():
+    lines = await collect([b"ab", b"c\r\nde", b"f\n", b"g"])
+    assert lines == [b"abc", b"def", b"g"]
+
+
+async def test_iter_lines_skips_too_long_line():
+    lines = await collect(
+        [b"ok\n", b"x" * 6, b"x" * 6, b"\nnext\n"],
+        max_line_bytes=8,
+    )
+    assert lines == [b"ok", None, b"next"]
+
+
+async def test_stream_predictions_reports_bad_rows():
+    async def source() -> AsyncIterator[bytes]:
+        yield b'{"id": 1, "title": "a"}\n[]\n{"summary": "b"}\n'
+
+    output = b"".join(
+        [
+            chunk
+            async for chunk in stream_predictions(
+                source(),
+                predictor=EchoPredictor(),  # type: ignore
+                fmt="ndjson",
+                batch_size=2,
+            )
+        ]
+    )
+    rows = [orjson.loads(line) for line in output.splitlines()]
+    errors = {row["line"] for row in rows if "error" in row}
+    assert errors == {2, 3}
+    assert [row["id"] for row in rows if "error" not in row] == [1]
+
+
+async def test_bulk_predict_reads_whole_chunked_body():
+    server = uvicorn.Server(
+        uvicorn.Config(
+            make_app(),
+            host="127.0.0.1",
+            port=0,
+            log_level="warning",
+        )
+    )
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    try:
+        async with httpx.AsyncClient(timeout=30) as client:
+            response = await client.post(
+                f"http://127.0.0.1:{port}/predict",
+                content=ndjson_body(ROWS),
+            )
+    finally:
+        server.should_exit = True
+        await serving
+
+    assert response.status_code == 200
+    rows = [
+        orjson.loads(line)
+        for line in response.content.splitlines()
+    ]
+    assert [row["id"] for row in rows] == list(range(ROWS))
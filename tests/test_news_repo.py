@@ -0,0 +1,363 @@
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import AsyncGenerator
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import func, select, update
+
+from src.db import sessionmaker_null_pool
+from src.models.news import News
+from src.repos.news import _proportional_quotas
+from src.schemas.channels import ChannelAddDTO
+from src.schemas.enums import NewsCategory
+from src.schemas.news import (
+    AddNewsDTO,
+    CategoryAssignmentDTO,
+    NewsDTO,
+    NewsUpdateDTO,
+)
+from src.schemas.samples import DenormalizedNewsAddDTO
+from src.utils.db_tools import DBManager
+
+MODEL_VERSION = "test-model"
+CLAIM = dict(
+    model_version=MODEL_VERSION, max_attempts=2, lease_sec=600
+)
+
+
+def new_session() -> DBManager:
+    return DBManager(session_factory=sessionmaker_null_pool)
+
+
+@pytest.fixture(autouse=True)
+async def clean_news(db) -> AsyncGenerator[None, None]:
+    # база общая на сессию тестов: очередь должна видеть только
+    # новости текущего теста
+    await db.news.delete_all()
+    await db.denorm_news.delete_all()
+    await db.commit()
+    yield
+
+
+async def add_news(db: DBManager, count: int) -> list[NewsDTO]:
+    channel = await db.channels.add(
+        ChannelAddDTO(
+            title="test", link=f"https://example.com/{uuid4().hex}"
+        )
+    )
+    news = await db.news.add_bulk_upsert(
+        [
+            AddNewsDTO(
+                image=None,
+                title=f"news {i}",
+                link=f"https://example.com/news/{i}",
+                summary="summary",
+                source="test",
+                channel_id=channel.id,
+                published=datetime.now(),
+                content_hash=uuid4().hex,
+            )
+            for i in range(count)
+        ]
+    )
+    await db.commit()
+    return news
+
+
+async def get_rows(ids: list[int]) -> dict[int, News]:
+    async with new_session() as fresh:
+        result = await fresh.session.execute(
+            select(News).filter(News.id.in_(ids))
+        )
+        return {row.id: row for row in result.scalars().all()}
+
+
+async def expire_leases(db: DBManager) -> None:
+    await db.session.execute(
+        update(News).values(
+            classify_claimed_at=func.now() - timedelta(days=1)
+        )
+    )
+    await db.commit()
+
+
+def ids_of(news: list[NewsDTO]) -> set[int]:
+    return {item.id for item in news}
+
+
+async def test_concurrent_claims_do_not_overlap(db):
+    news = await add_news(db, 6)
+
+    async with new_session() as first, new_session() as second:
+        # первая транзакция держит блокировки строк, вторая их
+        # пропускает (SKIP LOCKED) и берёт оставшиеся
+        claimed_first = await first.news.claim_uncategorized(
+            limit=4, **CLAIM
+        )
+        claimed_second = await second.news.claim_uncategorized(
+            limit=4, **CLAIM
+        )
+        await first.commit()
+        await second.commit()
+
+    assert len(claimed_first) == 4
+    assert len(claimed_second) == 2
+    assert not ids_of(claimed_first) & ids_of(claimed_second)
+    claimed = ids_of(claimed_first) | ids_of(claimed_second)
+    assert claimed == ids_of(news)
+
+
+async def test_active_lease_is_not_claimed_again(db):
+    await add_news(db, 3)
+    claimed = await db.news.claim_uncategorized(limit=10, **CLAIM)
+    await db.commit()
+
+    async with new_session() as other:
+        assert not await other.news.has_claimable(**CLAIM)
+        assert await other.news.claim_uncategorized(
+            limit=10, **CLAIM
+        ) == []
+    assert len(claimed) == 3
+
+
+async def test_expired_lease_is_reclaimed(db):
+    news = await add_news(db, 3)
+    await db.news.claim_uncategorized(limit=10, **CLAIM)
+    await db.commit()
+    # воркер упал, не сняв аренду
+    await expire_leases(db)
+
+    async with new_session() as other:
+        reclaimed = await other.news.claim_uncategorized(
+            limit=10, **CLAIM
+        )
+        await other.commit()
+
+    assert ids_of(reclaimed) == ids_of(news)
+    rows = await get_rows(list(ids_of(news)))
+    assert all(row.classify_attempts == 2 for row in rows.values())
+
+
+async def test_attempts_limit_is_per_model_version(db):
+    await add_news(db, 2)
+    for _ in range(CLAIM["max_attempts"]):
+        assert await db.news.claim_uncategorized(limit=10, **CLAIM)
+        await db.commit()
+        await expire_leases(db)
+
+    assert not await db.news.has_claimable(**CLAIM)
+    other_version = {**CLAIM, "model_version": "test-model-2"}
+    assert len(
+        await db.news.claim_uncategorized(limit=10, **other_version)
+    ) == 2
+
+
+async def test_finished_news_is_not_claimed_by_same_version(db):
+    news = await add_news(db, 2)
+    claimed = await db.news.claim_uncategorized(limit=10, **CLAIM)
+    # модель отказалась от всех новостей
+    await db.news.finish_classification(
+        list(ids_of(claimed)), MODEL_VERSION
+    )
+    await db.commit()
+    await expire_leases(db)
+
+    assert not await db.news.has_claimable(**CLAIM)
+    rows = await get_rows(list(ids_of(news)))
+    assert all(row.category is None for row in rows.values())
+
+
+async def test_assign_skips_category_set_manually(db):
+    manual, auto = await add_news(db, 2)
+    await db.news.claim_uncategorized(limit=10, **CLAIM)
+    await db.commit()
+    # категория выставлена вручную, пока модель считала
+    await db.news.edit(
+        NewsUpdateDTO(category=NewsCategory.SPORT),
+        ensure_existence=False,
+        id=manual.id,
+    )
+    await db.commit()
+
+    updated = await db.news.bulk_assign_categories(
+        [
+            CategoryAssignmentDTO(
+                news_id=item.id,
+                category=NewsCategory.CULTURE,
+                confidence=0.9,
+            )
+            for item in (manual, auto)
+        ],
+        model_version=MODEL_VERSION,
+    )
+    await db.commit()
+
+    assert updated == [auto.id]
+    rows = await get_rows([manual.id, auto.id])
+    assert rows[manual.id].category == NewsCategory.SPORT
+    assert rows[auto.id].category == NewsCategory.CULTURE
+
+
+async def test_reclassify_keeps_manual_category(db):
+    manual, auto = await add_news(db, 2)
+    await db.news.bulk_assign_categories(
+        [
+            CategoryAssignmentDTO(
+                news_id=item.id,
+                category=NewsCategory.CULTURE,
+                confidence=0.8,
+            )
+            for item in (manual, auto)
+        ],
+        model_version=MODEL_VERSION,
+    )
+    await db.news.edit(
+        NewsUpdateDTO(
+            category=NewsCategory.SPORT,
+            category_confidence=None,
+            category_top_k=None,
+        ),
+        ensure_existence=False,
+        id=manual.id,
+    )
+    await db.commit()
+
+    updated = await db.news.bulk_assign_categories(
+        [
+            CategoryAssignmentDTO(
+                news_id=item.id,
+                category=NewsCategory.ECONOMICS,
+                confidence=0.7,
+            )
+            for item in (manual, auto)
+        ],
+        model_version="test-model-2",
+        reclassify=True,
+    )
+    await db.commit()
+
+    assert updated == [auto.id]
+    rows = await get_rows([manual.id, auto.id])
+    assert rows[manual.id].category == NewsCategory.SPORT
+    assert rows[manual.id].category_confidence is None
+    assert rows[auto.id].category == NewsCategory.ECONOMICS
+
+
+def test_proportional_quotas_follow_shares():
+    counts = {
+        NewsCategory.SPORT: 60,
+        NewsCategory.CULTURE: 30,
+        NewsCategory.MEDICINE: 10,
+    }
+    assert _proportional_quotas(counts, 10) == {
+        NewsCategory.SPORT: 6,
+        NewsCategory.CULTURE: 3,
+        NewsCategory.MEDICINE: 1,
+    }
+
+
+def test_proportional_quotas_largest_remainder():
+    counts = {
+        NewsCategory.SPORT: 5,
+        NewsCategory.CULTURE: 3,
+        NewsCategory.MEDICINE: 2,
+    }
+    quotas = _proportional_quotas(counts, 5)
+    assert sum(quotas.values()) == 5
+    # 2.5, 1.5, 1.0: остаток уходит категориям с наибольшей дробью
+    assert quotas[NewsCategory.MEDICINE] == 1
+    assert quotas[NewsCategory.SPORT] + quotas[
+        NewsCategory.CULTURE
+    ] == 4
+
+
+def test_proportional_quotas_edge_cases():
+    counts = {NewsCategory.SPORT: 3, NewsCategory.CULTURE: 1}
+    assert _proportional_quotas(counts, 100) == counts
+    assert _proportional_quotas(counts, 0) == {}
+    assert _proportional_quotas({}, 10) == {}
+    # нулевые квоты не попадают в результат
+    assert _proportional_quotas(
+        {NewsCategory.SPORT: 99, NewsCategory.CULTURE: 1}, 1
+    ) == {NewsCategory.SPORT: 1}
+
+
+def sample(title: str, category: NewsCategory, summary=None):
+    return DenormalizedNewsAddDTO(
+        title=title, summary=summary, category=category
+    )
+
+
+async def test_add_bulk_skip_duplicates_counts_inserted(db):
+    assert await db.denorm_news.add_bulk_skip_duplicates(
+        [sample("First  news", NewsCategory.SPORT, "text")]
+    ) == 1
+    await db.commit()
+
+    inserted = await db.denorm_news.add_bulk_skip_duplicates(
+        [
+            # тот же текст с другим регистром и пробелами
+            sample(" first news ", NewsCategory.CULTURE, "TEXT"),
+            sample("Second news", NewsCategory.SPORT),
+            sample("second   NEWS", NewsCategory.SPORT),
+            sample("Third news", NewsCategory.MEDICINE),
+        ],
+        chunk_size=2,
+    )
+    await db.commit()
+
+    assert inserted == 2
+    samples = await db.denorm_news.get_all()
+    assert len(samples) == 3
+
+
+async def test_upsert_by_text_replaces_category(db):
+    added = await db.denorm_news.upsert_by_text(
+        sample("Match report", NewsCategory.CULTURE)
+    )
+    await db.denorm_news.mark_used_in_training([added.id])
+    await db.commit()
+
+    replaced = await db.denorm_news.upsert_by_text(
+        sample("match  REPORT", NewsCategory.SPORT)
+    )
+    await db.commit()
+
+    assert replaced.id == added.id
+    assert replaced.category == NewsCategory.SPORT
+    assert replaced.used_in_training is False
+    assert len(await db.denorm_news.get_all()) == 1
+
+
+async def test_replay_samples_respect_quotas(db):
+    categories = (
+        [NewsCategory.SPORT] * 20
+        + [NewsCategory.CULTURE] * 10
+        + [NewsCategory.ECONOMICS] * 5
+    )
+    await db.denorm_news.add_bulk_skip_duplicates(
+        [
+            sample(f"sample {i}", category)
+            for i, category in enumerate(categories)
+        ]
+    )
+    samples = await db.denorm_news.get_all()
+    # в replay идут только примеры, на которых уже обучались
+    await db.denorm_news.mark_used_in_training(
+        [
+            item.id
+            for item in samples
+            if item.category != NewsCategory.ECONOMICS
+        ]
+    )
+    await db.commit()
+
+    replay = await db.denorm_news.get_stratified_replay_samples(15)
+
+    assert len({item.id for item in replay}) == 15
+    assert Counter(item.category for item in replay) == {
+        NewsCategory.SPORT: 10,
+        NewsCategory.CULTURE: 5,
+    }
+    assert not await db.denorm_news.get_stratified_replay_samples(0)